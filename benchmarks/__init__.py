@@ -0,0 +1 @@
+"""Benchmarks of the IB helper hot paths."""
@@ -0,0 +1,86 @@
+"""Benchmarks of the options chain and market data requests."""
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.conftest import InterfaceFactory, Runner
+from src.ib_helper.simulated_gateway import SimulatedIB
+
+# Chains of 100 to 20k contracts, 10 expirations and 2 rights
+CHAIN_SIZES = [100, 1000, 5000, 20000]
+
+
+@pytest.mark.parametrize("size", CHAIN_SIZES)
+def bench_get_options_chain(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+  size: int,
+) -> None:
+  """Qualify a whole options chain."""
+  interface = ib_interface(SimulatedIB(expirations=10, strikes=size // 20))
+
+  result = benchmark.pedantic(
+    run, args=(lambda: interface.get_options_chain("SPX", "IND", 416904),), rounds=3,
+  )
+
+  assert result.count("conId") == size
+
+
+@pytest.mark.parametrize("size", [10, 100, 1000])
+def bench_get_tickers(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+  size: int,
+) -> None:
+  """Get tickers with greeks of qualified options."""
+  ib = SimulatedIB(expirations=1, strikes=size // 2)
+  interface = ib_interface(ib)
+  run(lambda: interface.get_options_chain("SPX", "IND", 416904))
+  con_ids = list(ib._contracts)
+
+  result = benchmark.pedantic(
+    run, args=(lambda: interface.get_tickers(con_ids),), rounds=5,
+  )
+
+  assert result.count("delta") == size
+
+
+@pytest.mark.parametrize("size", [100, 1000])
+def bench_get_and_filter_options(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+  size: int,
+) -> None:
+  """Get an options chain with market data and filter it on delta."""
+  interface = ib_interface(SimulatedIB(expirations=5, strikes=size // 10))
+  criteria = {"min_delta": 0.2, "max_delta": 0.4}
+
+  result = benchmark.pedantic(
+    run,
+    args=(
+      lambda: interface.get_and_filter_options("SPX", "IND", 416904, None, criteria),
+    ),
+    rounds=3,
+  )
+
+  assert 0 < len(result) < size
+
+
+def bench_pacing_limited_chain(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+) -> None:
+  """Qualify a chain above the gateway pacing limit, with request latency."""
+  ib = SimulatedIB(
+    expirations=2, strikes=30, latency=0.005, max_messages_per_second=100,
+  )
+  interface = ib_interface(ib)
+
+  benchmark.pedantic(
+    run, args=(lambda: interface.get_options_chain("SPX", "IND", 416904),), rounds=2,
+  )
+
+  assert ib.pacing_violations > 0
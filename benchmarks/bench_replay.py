@@ -0,0 +1,64 @@
+"""Benchmarks of the client pipeline, replaying recorded executions."""
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from anthropic import AsyncAnthropic
+from mcp.types import CallToolResult, ListToolsResult, TextContent
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.conftest import Runner
+from mcp_client import MCPClient
+from src.loadtest.replay import replay
+from src.loadtest.stub_server import create_stub_app
+from src.utilities.recording import Recorder
+from src.utilities.settings import Settings
+
+# Recordings of production executions kept as regression cases, if any
+RECORDINGS = sorted(Path(__file__).parent.glob("recordings/*.jsonl.gz"))
+
+
+@pytest.fixture
+def scripted_recording(tmp_path: Path, run: Runner) -> Path:
+  """Record a query of the load test model, with the results of a small portfolio."""
+  recorder = Recorder()
+  client = MCPClient(Settings(), recorder=recorder)
+  client.anthropic = AsyncAnthropic(
+    api_key="benchmark",
+    base_url="http://stub",
+    http_client=httpx.AsyncClient(transport=httpx.ASGITransport(create_stub_app(0))),
+  )
+  client.session = AsyncMock()
+  client.session.list_tools.return_value = ListToolsResult(tools=[])
+  client.session.call_tool.return_value = CallToolResult(
+    content=[TextContent(type="text", text='{"SPY": 500.0, "QQQ": 420.0}' * 50)],
+    isError=False,
+  )
+  run(lambda: client.process_query("Review the portfolio"))
+  return recorder.save(tmp_path / "scripted.jsonl.gz")
+
+
+def bench_replay_scripted(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  scripted_recording: Path,
+) -> None:
+  """Replay the scripted query without waiting for the recorded durations."""
+  report = benchmark(run, lambda: replay(scripted_recording, 0, Settings()))
+
+  assert report["matches"]
+
+
+@pytest.mark.parametrize(
+  "recording", RECORDINGS, ids=[path.name for path in RECORDINGS],
+)
+def bench_replay_recorded(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  recording: Path,
+) -> None:
+  """Replay a recorded execution without waiting for the recorded durations."""
+  report = benchmark(run, lambda: replay(recording, 0, Settings()))
+
+  assert report["matches"]
@@ -0,0 +1,76 @@
+"""Benchmarks of the scanner parameters and results."""
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.conftest import InterfaceFactory, Runner
+from src.ib_helper.simulated_gateway import SimulatedIB, scanner_parameters_xml
+from src.ib_helper.scanner_catalog import ScannerCatalog
+from src.ib_helper.scanners import ScannerClient
+
+
+
+@pytest.mark.parametrize("filters", [100, 1000])
+def bench_parse_scanner_parameters(
+  benchmark: BenchmarkFixture,
+  tmp_path: Path,
+  filters: int,
+) -> None:
+  """Parse the scanner parameters XML into the catalog indexes."""
+  catalog = ScannerCatalog(str(tmp_path / "scanner_params.xml"), max_age=0)
+  xml_parameters = scanner_parameters_xml(instruments=20, filters=filters)
+
+  benchmark(catalog.parse, xml_parameters)
+
+  assert len(catalog.filters) == 2 * filters
+  assert len(catalog.filters_for("INS0")) == 2 * filters
+
+
+def bench_search_scanner_codes(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+) -> None:
+  """Search the loaded catalog."""
+  interface = ib_interface(SimulatedIB(scanner_xml=scanner_parameters_xml(20, 1000)))
+  run(interface.get_scanner_filter_codes)
+
+  result = benchmark(
+    run, lambda: interface.search_scanner_codes("filter", "99", "INS1"),
+  )
+
+  assert result
+
+
+def bench_multi_scanner_results(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+) -> None:
+  """Run and merge several scans."""
+  interface = ib_interface(SimulatedIB(latency=0.001))
+  scan_codes = ["TOP_PERC_GAIN", "MOST_ACTIVE", "HOT_BY_VOLUME"]
+
+  result = benchmark(
+    run,
+    lambda: interface.get_multi_scanner_results(
+      "STK", "STK.US", scan_codes, ["priceAbove=10"],
+    ),
+  )
+
+  assert result
+
+
+def bench_merge_scans(benchmark: BenchmarkFixture, run: Runner) -> None:
+  """Merge large scans on conId."""
+  ib = SimulatedIB()
+  subscription = type("Subscription", (), {"numberOfRows": 1000})
+  scans = {
+    code: run(lambda: ib.reqScannerDataAsync(subscription))
+    for code in ("A", "B", "C")
+  }
+
+  ranked = benchmark(ScannerClient._merge_scans, scans)
+
+  assert len(ranked) == 1000
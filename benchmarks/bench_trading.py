@@ -0,0 +1,24 @@
+"""Benchmarks of order execution."""
+from ib_async.contract import Contract
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from benchmarks.conftest import InterfaceFactory, Runner
+from src.ib_helper.simulated_gateway import SimulatedIB
+from src.ib_helper.trading import OrderSpec
+
+
+def bench_execute_order(
+  benchmark: BenchmarkFixture,
+  run: Runner,
+  ib_interface: InterfaceFactory,
+) -> None:
+  """Approve, check, place and fill an order."""
+  interface = ib_interface(SimulatedIB())
+  contract = Contract(
+    conId=265598, symbol="AAPL", secType="STK", exchange="SMART", currency="USD",
+  )
+  spec = OrderSpec("BUY", 10, "LMT", 150.0)
+
+  result = benchmark(run, lambda: interface._execute_order(contract, spec))
+
+  assert '"Filled"' in result
@@ -0,0 +1,64 @@
+"""Fixtures running the IB helper against the simulated gateway."""
+import asyncio
+from collections.abc import Awaitable, Callable, Coroutine, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.ib_helper.simulated_gateway import SimulatedIB
+from src.ib_helper import IBInterface
+from src.ib_helper.order_journal import OrderJournal
+
+
+# Runs the coroutine of a factory on the benchmark event loop
+Runner = Callable[[Callable[[], Coroutine]], Any]
+# Creates an IB interface connected to a simulated gateway
+InterfaceFactory = Callable[[SimulatedIB], IBInterface]
+
+
+class AutoApprovalBot:
+  """Approval bot approving every order once its what-if check is done."""
+
+  async def start(self) -> None:
+    """Start the bot, nothing to do."""
+
+  async def request_approval(
+    self,
+    message: dict,  # noqa: ARG002
+    details: Awaitable[dict] | None = None,
+  ) -> bool:
+    """Approve an order."""
+    if details is not None:
+      await details
+    return True
+
+  async def send_trade_confirmation(self, message: str) -> None:
+    """Confirm a trade, nothing to do."""
+
+
+@pytest.fixture
+def run() -> Iterator[Runner]:
+  """Run coroutines on one event loop, so benchmarks do not time its creation."""
+  loop = asyncio.new_event_loop()
+  yield lambda factory: loop.run_until_complete(factory())
+  loop.close()
+
+
+@pytest.fixture
+def ib_interface(tmp_path: Path) -> InterfaceFactory:
+  """Create IB interfaces connected to a simulated gateway."""
+  def create(ib: SimulatedIB) -> IBInterface:
+    interface = IBInterface()
+    interface.ib = ib
+    interface.contract_client.ib = ib
+    # Measure the request instrumentation like in production
+    interface._trace_requests()
+    ib.errorEvent += interface._on_error
+    interface._is_market_open = lambda: True
+    interface.notification_bot = AutoApprovalBot()
+    interface.order_journal = OrderJournal(str(tmp_path / "orders.jsonl"))
+    interface.scanner_catalog.cache_file = tmp_path / "scanner_params.xml"
+    interface.config.what_if_cache_ttl = 0
+    return interface
+  return create
@@ -23,6 +23,33 @@ async def main() -> None:
     "--web",
     action="store_true",
     help="Run scheduled prompts in the web interface")
+  parser.add_argument(
+    "--worker",
+    action="store_true",
+    help="Run queued prompt executions (execution_queue_backend=postgres)")
+  parser.add_argument(
+    "--loadtest",
+    action="store_true",
+    help="Run scheduled prompts against a scripted model and simulated IB gateway")
+  parser.add_argument(
+    "--count",
+    type=int,
+    default=20,
+    help="Number of executions of the load test")
+  parser.add_argument(
+    "--rate",
+    type=float,
+    default=1.0,
+    help="Executions scheduled per second by the load test")
+  parser.add_argument(
+    "--replay",
+    type=str,
+    help="Replay a recorded execution offline, given its ID or recording archive")
+  parser.add_argument(
+    "--time-scale",
+    type=float,
+    default=1.0,
+    help="Factor of the recorded durations in a replay, 0 to replay without waiting")
 
   args = parser.parse_args()
 
@@ -43,7 +70,31 @@ async def main() -> None:
     app = RichApp(mcp_client)
     await app.run()
     await mcp_client.cleanup()
+  elif args.worker:
+    from src.web.executions import execute_prompt_sync
+    from src.web.scheduler import durable_queue
+    from src.utilities.metrics import setup_metrics
+    from src.utilities.tracing import setup_tracing
+
+    setup_metrics()
+    setup_tracing("worker")
+
+    await durable_queue.run(execute_prompt_sync, settings.max_concurrent_executions)
+  elif args.loadtest:
+    from src.loadtest.runner import LoadTest, print_report
+
+    print_report(await LoadTest(args.count, args.rate, settings).run())
+  elif args.replay:
+    from src.loadtest.replay import print_replay_report, recording_path, replay
+
+    path = await recording_path(args.replay)
+    print_replay_report(await replay(path, args.time_scale, settings))
   elif args.web:
+    from src.utilities.metrics import reset_metrics_dir, setup_metrics
+
+    # The reloaded web process inherits the metrics directory
+    setup_metrics()
+    reset_metrics_dir()
     uvicorn.run(
       "src.web.app:app",
       host="127.0.0.1",
@@ -1,38 +1,312 @@
 """IBKR MCP client."""
+import asyncio
 import os
-from anthropic import Anthropic
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import asdict, dataclass
+from anthropic import AsyncAnthropic
+from anthropic.types import Message, ToolUseBlock, Usage
 from loguru import logger
-from contextlib import AsyncExitStack
+from contextlib import AsyncExitStack, nullcontext
 
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
+from mcp.types import CallToolResult
 
 from src.utilities import Settings, setup_logging
+from src.utilities.metrics import CACHE_REQUESTS, LLM_TOKENS, TOOL_DURATION, timed
+from src.utilities.recording import Recorder
+from src.utilities.response_cache import ORDER_TOOLS, UNCACHEABLE_TOOLS, ResponseCache
+from src.utilities.tracing import span, trace_environment
 
 setup_logging()
 
+
+@dataclass(slots=True)
+class QueryBudget:
+  """Limits stopping the tool loop of a query, None for no limit."""
+
+  max_tokens: int | None = None
+  max_iterations: int | None = None
+  max_seconds: float | None = None
+
+
+class BudgetExceededError(Exception):
+  """Raised when a query exceeds its budget."""
+
+  def __init__(self, limit: str, partial_result: str) -> None:
+    """Initialize the BudgetExceededError class.
+
+    Args:
+      limit: Description of the exceeded limit.
+      partial_result: Result of the query up to the point it was stopped.
+
+    """
+    self.limit = limit
+    self.partial_result = partial_result
+    super().__init__(f"Query budget exceeded: {limit}")
+
+
+def new_usage() -> dict[str, int]:
+  """Create empty usage counters of a query."""
+  return {
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "tool_calls": 0,
+    "iterations": 0,
+  }
+
+
 class MCPClient:
   """IBKR MCP client."""
 
-  def __init__(self, settings: Settings) -> None:
-    """Initialize the MCP client."""
+  def __init__(
+    self,
+    settings: Settings,
+    resource_limits: dict[str, asyncio.Semaphore] | None = None,
+    on_event: Callable[[dict], Awaitable[None]] | None = None,
+    response_cache: ResponseCache | None = None,
+    recorder: Recorder | None = None,
+  ) -> None:
+    """Initialize the MCP client.
+
+    Args:
+      settings: Application settings.
+      resource_limits: Semaphores shared between clients, keyed by MCP server
+        name (the tool name prefix, e.g. "ibkr") or "llm" for the LLM API.
+        Order tools, which wait for approval, are not limited.
+      on_event: Called with the progress of a query: "text" events with the
+        model text deltas, "tool_start" and "tool_end" events around tool calls.
+      response_cache: Cache reusing the answers of repeated queries and the
+        results of read-only tools, shared between clients.
+      recorder: Records the model responses and tool results of the queries,
+        and the IB and HTTP responses of the stdio server process, for replay.
+
+    """
     self.settings = settings
     self.session: ClientSession | None = None
     self.exit_stack = AsyncExitStack()
-    self.anthropic = Anthropic(api_key=settings.anthropic_api_key)
+    self.anthropic = AsyncAnthropic(
+      api_key=settings.anthropic_api_key,
+      base_url=settings.anthropic_base_url,
+    )
     self.message_history = []
+    self.resource_limits = resource_limits or {}
+    self.on_event = on_event
+    self.response_cache = response_cache
+    self.recorder = recorder
+    # Usage of the last query
+    self.usage = new_usage()
+    # Whether the last query called a tool that may have placed an order
+    self.called_order_tool = False
+    # Tool latency is observed here for the stdio servers, which keep their
+    # metrics in memory and exit with the client
+    self.time_tools = False
+
+  async def _emit(self, event: dict) -> None:
+    """Report the progress of a query, if anyone listens."""
+    if self.on_event is not None:
+      await self.on_event(event)
+
+  async def _emit_text(self, text_stream: AsyncIterator[str]) -> None:
+    """Report the streamed model text, coalescing the deltas.
 
-  async def connect_to_server(self) -> None:
-    """Connect to an MCP server."""
-    server_params = StdioServerParameters(
-      command="python",
-      args=[self.settings.mcp_server_script],
-      env=os.environ,
+    Every event is published to all processes, so the deltas are sent at
+    most once per chat_stream_flush_interval instead of one by one.
+    """
+    pending = []
+    flushed = time.monotonic()
+    async for text in text_stream:
+      pending.append(text)
+      if time.monotonic() - flushed >= self.settings.chat_stream_flush_interval:
+        await self._emit({"type": "text", "text": "".join(pending)})
+        pending.clear()
+        flushed = time.monotonic()
+    if pending:
+      await self._emit({"type": "text", "text": "".join(pending)})
+
+  def _record_usage(self, usage: Usage, llm_span: object | None) -> None:
+    """Account the tokens of an LLM call."""
+    for key in (
+      "input_tokens",
+      "output_tokens",
+      "cache_creation_input_tokens",
+      "cache_read_input_tokens",
+    ):
+      tokens = getattr(usage, key) or 0
+      self.usage[key] += tokens
+      if llm_span is not None:
+        llm_span.set_attribute(f"llm.{key}", tokens)
+    for direction in ("input", "output"):
+      LLM_TOKENS.labels(model=self.settings.chat_model, direction=direction).inc(
+        getattr(usage, f"{direction}_tokens"),
+      )
+
+  def total_tokens(self) -> int:
+    """Get the tokens used by the last query, including prompt cache tokens."""
+    return (
+      self.usage["input_tokens"]
+      + self.usage["output_tokens"]
+      + self.usage["cache_creation_input_tokens"]
+      + self.usage["cache_read_input_tokens"]
+    )
+
+  def _check_budget(self, budget: QueryBudget, final_text: list[str]) -> None:
+    """Stop the query if it reached its token or iteration limit."""
+    limit = None
+    if budget.max_tokens is not None and self.total_tokens() >= budget.max_tokens:
+      limit = f"{budget.max_tokens} tokens"
+    elif (
+      budget.max_iterations is not None
+      and self.usage["iterations"] >= budget.max_iterations
+    ):
+      limit = f"{budget.max_iterations} iterations"
+    if limit is not None:
+      raise BudgetExceededError(limit, "\n".join(final_text))
+
+  def _record(self, kind: str, started: float, **data: object) -> None:
+    """Record an event of a query, if recording."""
+    if self.recorder is not None:
+      self.recorder.record(kind, started, **data)
+
+  def _record_tool(
+    self,
+    started: float,
+    tool_name: str,
+    tool_args: dict,
+    result: CallToolResult | None = None,
+    error: str | None = None,
+  ) -> None:
+    """Record a tool call and its result or error, if recording."""
+    if self.recorder is None:
+      return
+    outcome = (
+      {"error": error} if error is not None
+      else {"result": result.model_dump(mode="json")}
+    )
+    self.recorder.record(
+      "tool",
+      started,
+      tool=tool_name,
+      arguments=tool_args,
+      duration=round(time.time() - started, 6),
+      **outcome,
     )
 
-    stdio_transport =\
-      await self.exit_stack.enter_async_context(stdio_client(server_params))
-    self.stdio, self.write = stdio_transport
+  def _limit(self, resource: str) -> asyncio.Semaphore | nullcontext:
+    """Get the concurrency limit of a resource, if any."""
+    return self.resource_limits.get(resource, nullcontext())
+
+  async def _call_tool(self, tool_name: str, tool_args: dict) -> CallToolResult:
+    """Call a tool, reusing a recent result of a read-only tool."""
+    started = time.time()
+    if self.response_cache is not None:
+      result = self.response_cache.cached_tool_result(tool_name, tool_args)
+      CACHE_REQUESTS.labels(
+        cache="tool_result",
+        result="miss" if result is None else "hit",
+      ).inc()
+      if result is not None:
+        self._record_tool(started, tool_name, tool_args, result)
+        return result
+
+    # Order tools wait for a human approval, holding a server slot for that
+    # long would stall the other executions
+    limit = (
+      nullcontext() if tool_name in ORDER_TOOLS
+      else self._limit(tool_name.split("_", 1)[0])
+    )
+    if tool_name in ORDER_TOOLS:
+      self.called_order_tool = True
+    timer = (
+      timed(TOOL_DURATION, tool=tool_name) if self.time_tools else nullcontext()
+    )
+    try:
+      async with limit:
+        with span("mcp.call_tool", tool=tool_name), timer:
+          result = await self.session.call_tool(tool_name, tool_args)
+    except Exception as e:
+      self._record_tool(started, tool_name, tool_args, error=str(e))
+      raise
+    finally:
+      if self.response_cache is not None:
+        self.response_cache.forget_tool_results(tool_name)
+    self._record_tool(started, tool_name, tool_args, result)
+    if self.response_cache is not None:
+      self.response_cache.remember_tool_result(tool_name, tool_args, result)
+    return result
+
+  async def _cached_answer(self, query: str) -> str | None:
+    """Get the stored answer of a query, if the tool results it used are unchanged."""
+    entry = self.response_cache.lookup(self.settings.chat_model, query)
+    if entry is None:
+      CACHE_REQUESTS.labels(cache="response", result="miss").inc()
+      return None
+
+    with span("response_cache.validate", dependencies=len(entry["dependencies"])):
+      for dependency in entry["dependencies"]:
+        tool_name = dependency["tool"]
+        fingerprint = self.response_cache.fingerprint(tool_name)
+        if fingerprint is None:
+          self.usage["tool_calls"] += 1
+          try:
+            result = await self._call_tool(tool_name, dependency["arguments"])
+          except Exception as e:
+            logger.debug(
+              "Error validating cached answer with {}: {}", tool_name, str(e),
+            )
+            result = None
+          if result is None or result.isError:
+            fingerprint = None
+          else:
+            fingerprint = self.response_cache.fingerprint(
+              tool_name,
+              _result_text(result),
+            )
+        if fingerprint != dependency["fingerprint"]:
+          logger.debug("Cached answer is stale, {} changed", tool_name)
+          CACHE_REQUESTS.labels(cache="response", result="miss").inc()
+          return None
+
+    logger.debug("Reusing cached answer of query: {}", query)
+    CACHE_REQUESTS.labels(cache="response", result="hit").inc()
+    await self._emit({"type": "text", "text": entry["result"]})
+    return entry["result"]
+
+  async def connect_to_server(self, url: str | None = None) -> None:
+    """Connect to an MCP server.
+
+    Args:
+      url: SSE endpoint of a running server, e.g. "http://127.0.0.1:8001/sse",
+        the mcp_server_url setting by default. Without a URL a dedicated
+        stdio server process is started.
+
+    """
+    url = url or self.settings.mcp_server_url
+    self.time_tools = not url
+    if url:
+      transport = sse_client(url)
+    else:
+      # The server continues the current trace, if any. It is not a process
+      # sharing metrics, its files would pile up in the metrics directory.
+      environment = {
+        key: value for key, value in os.environ.items()
+        if key != "PROMETHEUS_MULTIPROC_DIR"
+      }
+      transport = stdio_client(StdioServerParameters(
+        command="python",
+        args=[self.settings.mcp_server_script],
+        env={
+          **environment,
+          **trace_environment(),
+          **(self.recorder.environment() if self.recorder is not None else {}),
+        },
+      ))
+
+    self.stdio, self.write = await self.exit_stack.enter_async_context(transport)
     self.session =\
       await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
 
@@ -43,9 +317,147 @@ class MCPClient:
     tools = response.tools
     logger.debug("Connected to server with tools: {}", [tool.name for tool in tools])
 
-  async def process_query(self, query: str) -> str:
-    """Process a query using Claude and available tools."""
+  async def process_query(self, query: str, budget: QueryBudget | None = None) -> str:
+    """Process a query using Claude and available tools.
+
+    Args:
+      query: Query to process.
+      budget: Limits of the query, the query_max_* settings by default.
+
+    Raises:
+      BudgetExceededError: The query reached a limit of its budget.
+
+    """
+    if budget is None:
+      budget = QueryBudget(
+        self.settings.query_max_tokens,
+        self.settings.query_max_iterations,
+        self.settings.query_max_seconds,
+      )
+    self.usage = new_usage()
+    self.called_order_tool = False
+    final_text = []
+    self._record(
+      "query",
+      time.time(),
+      query=query,
+      model=self.settings.chat_model,
+      budget=asdict(budget),
+    )
+    with span("mcp_client.process_query") as query_span:
+      try:
+        async with asyncio.timeout(budget.max_seconds) as deadline:
+          result = await self._process_query(query, budget, final_text)
+          self._record("result", time.time(), result=result)
+          return result
+      except TimeoutError:
+        if not deadline.expired():
+          raise
+        limit = f"{budget.max_seconds} seconds"
+        raise BudgetExceededError(limit, "\n".join(final_text)) from None
+      finally:
+        if query_span is not None:
+          query_span.set_attributes({
+            f"query.{key}": value for key, value in self.usage.items()
+          })
+
+  async def _request_message(self, messages: list[dict], tools: list[dict]) -> Message:
+    """Stream one LLM response, reporting its text as it arrives."""
+    self.usage["iterations"] += 1
+    async with self._limit("llm"):
+      started = time.time()
+      with span(
+        "llm.messages",
+        model=self.settings.chat_model,
+        iteration=self.usage["iterations"],
+      ) as llm_span:
+        async with self.anthropic.messages.stream(
+          model=self.settings.chat_model,
+          max_tokens=self.settings.chat_model_max_tokens,
+          messages=messages,
+          tools=tools,
+        ) as stream:
+          await self._emit_text(stream.text_stream)
+          response = await stream.get_final_message()
+        self._record_usage(response.usage, llm_span)
+    if self.recorder is not None:
+      self.recorder.record(
+        "llm",
+        started,
+        duration=round(time.time() - started, 6),
+        response=response.model_dump(mode="json"),
+      )
+    return response
+
+  async def _run_tool(
+    self,
+    content: ToolUseBlock,
+    final_text: list[str],
+  ) -> CallToolResult | None:
+    """Run a tool call of the model, None if it failed."""
+    self.usage["tool_calls"] += 1
+    tool_name = content.name
+    logger.debug("Calling tool {}", tool_name)
+    await self._emit({"type": "tool_start", "tool": tool_name})
+    try:
+      result = await self._call_tool(tool_name, content.input)
+    except Exception as e:
+      error_msg = f"[error]Error executing tool {tool_name}: {e!s}[/error]"
+      logger.error(error_msg)
+      final_text.append(error_msg)
+      await self._emit({"type": "tool_end", "tool": tool_name, "is_error": True})
+      return None
+
+    logger.debug("Tool result: {}", result)
+    await self._emit({
+      "type": "tool_end",
+      "tool": tool_name,
+      "is_error": result.isError,
+    })
+    final_text.append(f"[tool][yellow]{result.content}[/yellow][/tool]")
+    return result
+
+  def _add_dependency(
+    self,
+    dependencies: list[dict] | None,
+    content: ToolUseBlock,
+    result: CallToolResult | None,
+  ) -> list[dict] | None:
+    """Add a tool result the answer depends on, None once it can't be cached."""
+    if (
+      dependencies is None
+      or result is None
+      or result.isError
+      or content.name in UNCACHEABLE_TOOLS
+    ):
+      return None
+    dependencies.append({
+      "tool": content.name,
+      "arguments": content.input,
+      "fingerprint": self.response_cache.fingerprint(
+        content.name,
+        _result_text(result),
+      ),
+    })
+    return dependencies
+
+  async def _process_query(
+    self,
+    query: str,
+    budget: QueryBudget,
+    final_text: list[str],
+  ) -> str:
+    """Process a query, one LLM call and its tool calls per iteration."""
     logger.debug("Processing query: {}", query)
+    # Only answers of a query without prior conversation are reused, the
+    # dependencies are None otherwise
+    dependencies = None
+    if self.response_cache is not None and not self.message_history:
+      answer = await self._cached_answer(query)
+      if answer is not None:
+        return answer
+      dependencies = []
+
     self.message_history.append({
       "role": "user",
       "content": query,
@@ -60,15 +472,10 @@ class MCPClient:
       "input_schema": tool.inputSchema,
     } for tool in response.tools]
 
-    final_text = []
     while True:
-      # Get response from Claude
-      response = self.anthropic.messages.create(
-        model=self.settings.chat_model,
-        max_tokens=self.settings.chat_model_max_tokens,
-        messages=messages,
-        tools=available_tools,
-      )
+      # Stop a runaway tool loop before the next LLM call
+      self._check_budget(budget, final_text)
+      response = await self._request_message(messages, available_tools)
 
       # Process all content from the response
       assistant_message_content = []
@@ -80,35 +487,26 @@ class MCPClient:
           assistant_message_content.append(content)
         elif content.type == "tool_use":
           has_tool_calls = True
-          tool_name = content.name
-          tool_args = content.input
-          logger.debug("Calling tool {}", tool_name)
+          result = await self._run_tool(content, final_text)
+          dependencies = self._add_dependency(dependencies, content, result)
+          if result is None:
+            continue
 
-          try:
-            # Execute tool call
-            result = await self.session.call_tool(tool_name, tool_args)
-            logger.debug("Tool result: {}", result)
-            final_text.append(f"[tool][yellow]{result.content}[/yellow][/tool]")
-
-            assistant_message_content.append(content)
-            messages.append({
-              "role": "assistant",
-              "content": assistant_message_content,
-            })
-            messages.append({
-              "role": "user",
-              "content": [
-                {
-                  "type": "tool_result",
-                  "tool_use_id": content.id,
-                  "content": result.content,
-                },
-              ],
-            })
-          except Exception as e:
-            error_msg = f"[error]Error executing tool {tool_name}: {str(e)!s}[/error]"
-            logger.error(error_msg)
-            final_text.append(error_msg)
+          assistant_message_content.append(content)
+          messages.append({
+            "role": "assistant",
+            "content": assistant_message_content,
+          })
+          messages.append({
+            "role": "user",
+            "content": [
+              {
+                "type": "tool_result",
+                "tool_use_id": content.id,
+                "content": result.content,
+              },
+            ],
+          })
 
       # If no tool calls were made, we're done
       if not has_tool_calls:
@@ -118,8 +516,17 @@ class MCPClient:
         })
         self.message_history = messages
         break
-    return "\n".join(final_text)
+
+    result = "\n".join(final_text)
+    if dependencies is not None:
+      self.response_cache.store(self.settings.chat_model, query, dependencies, result)
+    return result
 
   async def cleanup(self) -> None:
     """Cleanup resources."""
     await self.exit_stack.aclose()
+
+
+def _result_text(result: CallToolResult) -> str:
+  """Get the text content of a tool result."""
+  return "".join(getattr(content, "text", "") for content in result.content)
@@ -2,10 +2,38 @@
 
 from loguru import logger
 from fastmcp import FastMCP
+from mcp.types import EmbeddedResource, ImageContent, TextContent
 
 from src.mcp_servers import ibkr, fmp, calendar
+from src.mcp_servers.sessions import sessions
+from src.utilities import Settings
+from src.utilities.metrics import (
+  TOOL_DURATION,
+  setup_metrics,
+  start_metrics_server,
+  timed,
+)
+from src.utilities.tracing import setup_tracing, span
+
+
+class InstrumentedFastMCP(FastMCP):
+  """MCP server limiting, tracing and timing every tool call of all mounted servers."""
+
+  async def _mcp_call_tool(
+    self,
+    key: str,
+    arguments: dict,
+  ) -> list[TextContent | ImageContent | EmbeddedResource]:
+    """Call a tool within the session limits and a span."""
+    async with sessions.limit():
+      with (
+        span(f"tool.{key}", tool=key, session=sessions.current()),
+        timed(TOOL_DURATION, tool=key),
+      ):
+        return await super()._mcp_call_tool(key, arguments)
+
 
-main_mcp = FastMCP(
+main_mcp = InstrumentedFastMCP(
   name="main_mcp",
   log_level="WARNING",
 )
@@ -15,8 +43,23 @@ main_mcp.mount("fmp", fmp)
 main_mcp.mount("calendar", calendar)
 
 if __name__ == "__main__":
+  settings = Settings()
+  # Stdio servers live as long as one execution, their client times the tools
+  if settings.mcp_server_transport == "sse":
+    setup_metrics()
+  setup_tracing("mcp-server")
+  if settings.mcp_metrics_port:
+    start_metrics_server(settings.mcp_metrics_port)
   try:
-    main_mcp.run(transport="stdio")
+    if settings.mcp_server_transport == "sse":
+      # One long running server shared by all clients
+      main_mcp.run(
+        transport="sse",
+        host=settings.mcp_server_host,
+        port=settings.mcp_server_port,
+      )
+    else:
+      main_mcp.run(transport="stdio")
   except Exception as e:
     logger.error("MCP server error: {}", str(e))
     raise
@@ -5,6 +5,7 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 from loguru import logger
 from src.utilities import setup_logging, Settings
+from src.utilities.tracing import TracedTransport
 
 setup_logging()
 
@@ -24,7 +25,7 @@ class FMPEventsFetcher:
     """Initialize the FMPEventsFetcher class."""
     self.settings = Settings()
     self.api_key = self.settings.quotes_api_key
-    self.base_url = "https://financialmodelingprep.com/api/v3"
+    self.base_url = self.settings.fmp_base_url
     self.server_tz = ZoneInfo(self.settings.server_timezone)
 
   def _convert_to_server_timezone(self, date_str: str) -> str:
@@ -72,7 +73,7 @@ class FMPEventsFetcher:
     url = f"{self.base_url}/economic_calendar"
     params = {"from": from_date, "to": to_date, "apikey": self.api_key}
 
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(transport=TracedTransport()) as client:
       response = await client.get(
         url,
         params=params,
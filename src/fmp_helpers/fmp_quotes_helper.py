@@ -5,6 +5,7 @@ import httpx
 from loguru import logger
 
 from src.utilities import setup_logging, Settings
+from src.utilities.tracing import TracedTransport
 
 setup_logging()
 
@@ -24,7 +25,7 @@ class FMPQuoteFetcher:
     """Initialize the FMPQuoteFetcher class."""
     self.settings = Settings()
     self.api_key = self.settings.quotes_api_key
-    self.base_url = "https://financialmodelingprep.com/api/v3"
+    self.base_url = self.settings.fmp_base_url
 
   async def get_spot_quote(self, symbol: str, price_type: str) -> float:
     """Fetch spot quote for symbol asynchronously.
@@ -37,7 +38,7 @@ class FMPQuoteFetcher:
     url = f"{self.base_url}/quote/{symbol}"
     params = {"apikey": self.api_key}
 
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(transport=TracedTransport()) as client:
       response = await client.get(
         url,
         params=params,
@@ -1,42 +1,129 @@
 """Base IB client connection handling."""
 import asyncio
 import datetime as dt
+import functools
+import inspect
+import exchange_calendars as ecals
+from collections.abc import Awaitable, Callable
 from loguru import logger
-from ib_async import IB
+from ib_async import IB, util
 from src.utilities import Settings, setup_logging
+from src.utilities.metrics import IB_PACING_VIOLATIONS, IB_REQUEST_DURATION, timed
+from src.utilities.recording import recorded
+from src.utilities.tracing import span
+
+from .position_book import PositionBook
+from .simulated_gateway import SimulatedIB
 
 setup_logging()
 
+# Error codes of requests rejected for exceeding the gateway pacing limits
+PACING_ERROR_CODES = {100, 162, 420}
+
 class IBClient:
   """Base IB client connection handling. No public methods."""
 
   def __init__(self) -> None:
     """Initialize IB interface."""
     self.config = Settings()
-    self.ib = IB()
+    # The simulated gateway serves load tests without an IB account
+    self.ib = (
+      SimulatedIB(latency=self.config.ib_simulated_latency)
+      if self.config.ib_simulated
+      else IB()
+    )
+    self.position_book = PositionBook()
+    # Sessions of a shared MCP server connect the same client
+    self._connect_lock = asyncio.Lock()
+    self._trace_requests()
+    self.ib.errorEvent += self._on_error
+
+  def _trace_requests(self) -> None:
+    """Record a span and the latency of every asynchronous gateway request."""
+    for name in dir(self.ib):
+      method = getattr(self.ib, name)
+      if name.endswith("Async") and not inspect.isasyncgenfunction(method):
+        setattr(self.ib, name, self._traced(name, method))
+
+  @staticmethod
+  def _traced(name: str, method: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """Wrap a gateway request in a span, recording it when the execution is recorded."""
+    @functools.wraps(method)
+    async def traced(*args: object, **kwargs: object) -> object:
+      request = name.removesuffix("Async")
+      with (
+        span(f"ib.{request}"),
+        timed(IB_REQUEST_DURATION, request=request),
+        recorded("ib", request=request) as event,
+      ):
+        # Arguments before the request, some requests update them in place
+        if event is not None:
+          event["arguments"] = util.tree([args, kwargs])
+        result = await method(*args, **kwargs)
+        if event is not None:
+          event["response"] = util.tree(result)
+        return result
+    return traced
+
+  @staticmethod
+  def _on_error(
+    _req_id: int,
+    error_code: int,
+    error_string: str,
+    _contract: object,
+  ) -> None:
+    """Count the pacing violations reported by the gateway."""
+    # 162 is also used for other historical data errors
+    if error_code in PACING_ERROR_CODES and (
+      error_code != 162 or "pacing" in error_string.lower()
+    ):
+      IB_PACING_VIOLATIONS.labels(code=str(error_code)).inc()
 
   async def _connect(self) -> None:
-    """Create and connect IB client."""
+    """Create and connect IB client, once for concurrent callers."""
     if self.ib.isConnected():
       return
 
-    host = self.config.ib_gateway_host
-    port = self.config.ib_gateway_port
+    async with self._connect_lock:
+      # Connected by a caller waiting before this one
+      if self.ib.isConnected():
+        return
 
-    try:
-      logger.debug("Connecting to IB on {}:{}", host, port)
-      await self.ib.connectAsync(
-        host=host,
-        port=port,
-        clientId=dt.datetime.now(dt.UTC).strftime("%H%M%S"),
-        timeout=20,
-        readonly=False,
-      )
-      self.ib.RequestTimeout = 20
-      logger.debug("Connected to IB on {}:{}", host, port)
-    except Exception as e:
-      logger.error("Error connecting to IB: {}", e)
-      raise
+      host = self.config.ib_gateway_host
+      port = self.config.ib_gateway_port
+
+      try:
+        logger.debug("Connecting to IB on {}:{}", host, port)
+        await self.ib.connectAsync(
+          host=host,
+          port=port,
+          clientId=dt.datetime.now(dt.UTC).strftime("%H%M%S"),
+          timeout=20,
+          readonly=False,
+        )
+        self.ib.RequestTimeout = 20
+        logger.debug("Connected to IB on {}:{}", host, port)
+
+        # Keep the position book current from the account streams
+        self.position_book.attach(self.ib)
+        self.position_book.sync()
+      except Exception as e:
+        logger.error("Error connecting to IB: {}", e)
+        raise
+
+  def _is_market_open(self) -> bool:
+    """Check if the market is open."""
+    nyse = ecals.get_calendar("NYSE")
+    return nyse.is_trading_minute(dt.datetime.now(dt.UTC))
+
+  def _request_market_data_type(self) -> None:
+    """Request live data while the market is open, frozen data otherwise."""
+    if self._is_market_open():
+      logger.debug("Market is open, requesting live market data")
+      self.ib.reqMarketDataType(1)
+    else:
+      logger.debug("Market is closed, requesting delayed market data")
+      self.ib.reqMarketDataType(2)
 
   async def send_command_to_ibc(self, command: str) -> None:
     """Send a command to the IBC Command Server.
@@ -1,8 +1,6 @@
 """Market data operations."""
 import asyncio
 import pandas as pd
-import exchange_calendars as ecals
-import datetime as dt
 from loguru import logger
 from ib_async import util
 from ib_async.contract import Contract
@@ -19,11 +17,6 @@ class MarketDataClient(IBClient):
     self.contract_client = ContractClient()
     self.contract_client.ib = self.ib
 
-  def _is_market_open(self) -> bool:
-      """Check if the market is open."""
-      nyse = ecals.get_calendar("NYSE")
-      return nyse.is_trading_minute(dt.datetime.now(dt.UTC))
-
   async def get_tickers(
       self,
       contract_ids: list[int],
@@ -43,12 +36,7 @@ class MarketDataClient(IBClient):
       qualified_contracts = await self.ib.qualifyContractsAsync(*contracts)
 
       # First attempt to get tickers
-      if self._is_market_open():
-        logger.debug("Market is open, requesting live market data")
-        self.ib.reqMarketDataType(1)
-      else:
-        logger.debug("Market is closed, requesting delayed market data")
-        self.ib.reqMarketDataType(2)
+      self._request_market_data_type()
       tickers = await self.ib.reqTickersAsync(*qualified_contracts)
 
       # Process tickers
@@ -83,10 +71,7 @@ class MarketDataClient(IBClient):
         await self._connect()
 
         # Second attempt
-        if self._is_market_open():
-          self.ib.reqMarketDataType(1)
-        else:
-          self.ib.reqMarketDataType(2)
+        self._request_market_data_type()
         tickers = await self.ib.reqTickersAsync(*qualified_contracts)
 
         # Process tickers again
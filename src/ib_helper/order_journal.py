@@ -0,0 +1,86 @@
+"""Persistent journal of order lifecycle events."""
+import datetime as dt
+import json
+from pathlib import Path
+from loguru import logger
+from ib_async.objects import Fill
+from ib_async.order import Trade
+
+
+class OrderJournal:
+  """Append-only JSON lines journal of order lifecycle events.
+
+  Every tracked trade writes a record on submission, on each status change
+  and on each fill, so orders that keep working after the tool call returns
+  are still journaled.
+
+  Available public methods:
+    - track: start journaling a trade
+    - record: write a single journal record
+  """
+
+  def __init__(self, path: str) -> None:
+    """Initialize the journal.
+
+    Args:
+      path: Path of the JSON lines file.
+
+    """
+    self.path = Path(path)
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+
+  def track(self, trade: Trade) -> None:
+    """Journal the submission and subsequent lifecycle events of a trade."""
+    self.record(trade, "submitted")
+    trade.statusEvent += self._on_status
+    trade.fillEvent += self._on_fill
+
+  def record(self, trade: Trade, event: str, **extra: object) -> None:
+    """Write a single journal record.
+
+    Args:
+      trade: Trade the event belongs to.
+      event: Name of the lifecycle event.
+      extra: Additional fields to store with the record.
+
+    """
+    entry = {
+      "time": dt.datetime.now(dt.UTC).isoformat(),
+      "event": event,
+      "orderId": trade.order.orderId,
+      "permId": trade.order.permId,
+      "conId": trade.contract.conId,
+      "symbol": trade.contract.symbol,
+      "action": trade.order.action,
+      "totalQuantity": trade.order.totalQuantity,
+      "orderType": trade.order.orderType,
+      "lmtPrice": trade.order.lmtPrice,
+      "tif": trade.order.tif,
+      "status": trade.orderStatus.status,
+      "filled": trade.orderStatus.filled,
+      "remaining": trade.orderStatus.remaining,
+      "avgFillPrice": trade.orderStatus.avgFillPrice,
+      **extra,
+    }
+    try:
+      with self.path.open("a") as journal:
+        journal.write(json.dumps(entry, default=str) + "\n")
+    except OSError as e:
+      logger.error("Error writing order journal: {}", str(e))
+
+  def _on_status(self, trade: Trade) -> None:
+    """Journal a status change and stop tracking finished trades."""
+    self.record(trade, "status")
+    if trade.isDone():
+      trade.statusEvent -= self._on_status
+      trade.fillEvent -= self._on_fill
+
+  def _on_fill(self, trade: Trade, fill: Fill) -> None:
+    """Journal a (partial) fill."""
+    self.record(
+      trade,
+      "fill",
+      execId=fill.execution.execId,
+      shares=fill.execution.shares,
+      price=fill.execution.price,
+    )
@@ -0,0 +1,218 @@
+"""In-memory position book fed by IB account streams."""
+import math
+import time
+from dataclasses import dataclass
+from loguru import logger
+from ib_async import IB
+from ib_async.objects import Fill, PnLSingle, Position
+from ib_async.order import Trade
+from ib_async.util import UNSET_DOUBLE
+
+
+def _clean(value: float | None) -> float | None:
+  """Map IB placeholders (NaN, UNSET_DOUBLE) to None."""
+  if value is None or math.isnan(value) or value == UNSET_DOUBLE:
+    return None
+  return value
+
+
+@dataclass(slots=True)
+class PositionEntry:
+  """Position in a single contract for a single account."""
+
+  account: str
+  con_id: int
+  local_symbol: str
+  position: float
+  avg_cost: float
+  daily_pnl: float | None = None
+  unrealized_pnl: float | None = None
+  realized_pnl: float | None = None
+  market_value: float | None = None
+  updated_at: float = 0.0
+  stale: bool = False
+
+  def to_record(self, now: float) -> dict:
+    """Serialize the entry without the account identifier."""
+    return {
+      "contract": self.local_symbol,
+      "position": self.position,
+      "avgCost": self.avg_cost,
+      "contractId": self.con_id,
+      "dailyPnL": self.daily_pnl,
+      "unrealizedPnL": self.unrealized_pnl,
+      "realizedPnL": self.realized_pnl,
+      "marketValue": self.market_value,
+      "ageSeconds": round(now - self.updated_at, 1),
+      "stale": self.stale,
+    }
+
+
+class PositionBook:
+  """Always-current portfolio keyed by conId.
+
+  The book subscribes to ``positionEvent``, ``pnlSingleEvent`` and
+  ``execDetailsEvent`` of a connected IB instance, so reads never hit
+  the gateway.
+
+  Available public methods:
+    - attach: subscribe to the account streams of an IB instance
+    - sync: seed the book from the positions cached by ib_async
+    - get: get the entries for a conId
+    - net_position: get the net quantity for a conId across accounts
+    - records: get all entries as serializable records
+  """
+
+  def __init__(self) -> None:
+    """Initialize an empty book."""
+    self.ib: IB | None = None
+    self.version = 0
+    self._entries: dict[int, dict[str, PositionEntry]] = {}
+    self._pnl_subscriptions: set[tuple[str, int]] = set()
+
+  def attach(self, ib: IB) -> None:
+    """Subscribe to the account streams of the given IB instance."""
+    if self.ib is ib:
+      return
+
+    self.ib = ib
+    ib.positionEvent += self.on_position
+    ib.pnlSingleEvent += self.on_pnl_single
+    ib.execDetailsEvent += self.on_exec_details
+    ib.disconnectedEvent += self.on_disconnected
+
+  def sync(self) -> None:
+    """Seed the book from ib_async state and start PnL subscriptions.
+
+    ib_async requests all positions during connect, so this does not cost an
+    extra gateway round-trip. Entries missing from these positions were
+    closed while disconnected and are dropped.
+    """
+    if self.ib is None:
+      return
+
+    positions = self.ib.positions()
+    held = {(position.account, position.contract.conId) for position in positions}
+    closed = [
+      (account, con_id)
+      for con_id, accounts in self._entries.items()
+      for account in accounts
+      if (account, con_id) not in held
+    ]
+    for account, con_id in closed:
+      self._remove(account, con_id)
+    if closed:
+      self.version += 1
+
+    for position in positions:
+      self.on_position(position)
+
+  def on_position(self, position: Position) -> None:
+    """Handle a position update."""
+    con_id = position.contract.conId
+    accounts = self._entries.setdefault(con_id, {})
+
+    if position.position == 0:
+      self._remove(position.account, con_id)
+    else:
+      entry = accounts.get(position.account)
+      if entry is None:
+        entry = PositionEntry(
+          account=position.account,
+          con_id=con_id,
+          local_symbol=position.contract.localSymbol,
+          position=position.position,
+          avg_cost=self._unit_cost(position),
+        )
+        accounts[position.account] = entry
+      else:
+        entry.position = position.position
+        entry.avg_cost = self._unit_cost(position)
+      entry.updated_at = time.time()
+      entry.stale = False
+      self._request_pnl(position.account, con_id)
+
+    self.version += 1
+
+  def on_pnl_single(self, pnl: PnLSingle) -> None:
+    """Handle a single-position PnL update."""
+    entry = self._entries.get(pnl.conId, {}).get(pnl.account)
+    if entry is None:
+      return
+
+    entry.daily_pnl = _clean(pnl.dailyPnL)
+    entry.unrealized_pnl = _clean(pnl.unrealizedPnL)
+    entry.realized_pnl = _clean(pnl.realizedPnL)
+    entry.market_value = _clean(pnl.value)
+    entry.updated_at = time.time()
+
+  def on_exec_details(self, _: Trade, fill: Fill) -> None:
+    """Mark the position as stale until the gateway sends the new size."""
+    entry = self._entries.get(fill.contract.conId, {}).get(fill.execution.acctNumber)
+    if entry is not None:
+      entry.stale = True
+    self.version += 1
+    logger.debug("Execution received for {}", fill.contract.localSymbol)
+
+  def on_disconnected(self) -> None:
+    """Mark all entries stale, subscriptions are dropped by the gateway."""
+    self._pnl_subscriptions.clear()
+    for accounts in self._entries.values():
+      for entry in accounts.values():
+        entry.stale = True
+
+  def get(self, con_id: int) -> list[PositionEntry]:
+    """Get the entries for a conId, one per account."""
+    return list(self._entries.get(con_id, {}).values())
+
+  def net_position(self, con_id: int) -> float:
+    """Get the net quantity held for a conId across accounts."""
+    return sum(entry.position for entry in self._entries.get(con_id, {}).values())
+
+  def records(self) -> list[dict]:
+    """Get all entries as serializable records."""
+    now = time.time()
+    return [
+      entry.to_record(now)
+      for accounts in self._entries.values()
+      for entry in accounts.values()
+    ]
+
+  def _remove(self, account: str, con_id: int) -> None:
+    """Remove the entry of a closed position and its PnL subscription."""
+    accounts = self._entries.get(con_id, {})
+    accounts.pop(account, None)
+    if not accounts:
+      self._entries.pop(con_id, None)
+    self._cancel_pnl_single(account, con_id)
+
+  def _request_pnl(self, account: str, con_id: int) -> None:
+    """Start the PnL subscription of the position."""
+    if self.ib is None or not self.ib.isConnected():
+      return
+
+    if (account, con_id) not in self._pnl_subscriptions:
+      self.ib.reqPnLSingle(account, "", con_id)
+      self._pnl_subscriptions.add((account, con_id))
+
+  def _cancel_pnl_single(self, account: str, con_id: int) -> None:
+    """Cancel the PnL subscription of a closed position."""
+    if (account, con_id) not in self._pnl_subscriptions:
+      return
+
+    self._pnl_subscriptions.discard((account, con_id))
+    if self.ib is not None and self.ib.isConnected():
+      self.ib.cancelPnLSingle(account, "", con_id)
+
+  @staticmethod
+  def _unit_cost(position: Position) -> float:
+    """Get the average cost per unit, IB reports it per contract."""
+    try:
+      multiplier = float(position.contract.multiplier or 1)
+      return position.avgCost / multiplier
+    except (ValueError, TypeError, ZeroDivisionError):
+      logger.warning(
+        "Invalid multiplier {}, using 1",
+        position.contract.localSymbol,
+      )
+      return position.avgCost
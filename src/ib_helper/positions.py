@@ -1,7 +1,6 @@
 """Position operations."""
-import pandas as pd
+import json
 from loguru import logger
-from ib_async import util
 
 from .client import IBClient
 
@@ -14,30 +13,19 @@ class PositionClient(IBClient):
   """
 
   async def get_positions(self) -> str:
-    """Get account positions."""
+    """Get account positions from the position book.
+
+    Each position carries its PnL and the age of the last update in seconds,
+    positions with a fill that was not yet confirmed by the gateway are
+    marked as stale.
+    """
     try:
       await self._connect()
-      positions = util.df(self.ib.positions())
-      if positions.empty:
+      positions = self.position_book.records()
+      if not positions:
         return "No open positions found."
-
-      # Safely handle multiplier conversion with error checking
-      def safe_cost_calculation(row: pd.Series) -> float:
-        try:
-          multiplier = float(row["contract"].multiplier or 1)
-          return row["avgCost"] / multiplier
-        except (ValueError, TypeError, AttributeError):
-          logger.warning(f"Invalid multiplier {row['contract'].localSymbol}, using 1")
-          return row["avgCost"]
-
-      positions["contractId"] = positions["contract"].apply(lambda x: x.conId)
-      positions["avgCost"] = positions.apply(safe_cost_calculation, axis=1)
-      positions["contract"] = positions["contract"].apply(lambda x: x.localSymbol)
-
-      # Remove sensitive information
-      del positions["account"]
     except Exception as e:
       logger.error("Error getting positions: {}", str(e))
       raise
     else:
-      return positions.to_json(orient="records")
+      return json.dumps(positions)
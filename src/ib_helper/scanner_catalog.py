@@ -0,0 +1,211 @@
+"""Indexed catalog of the IB scanner parameters."""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from xml.etree.ElementTree import Element
+from defusedxml import ElementTree
+from loguru import logger
+
+from src.utilities.metrics import CACHE_REQUESTS
+
+SEARCH_KINDS = ("instrument", "location", "filter", "scan_code")
+
+
+class ScannerCatalog:
+  """Scanner parameters parsed once into in-memory indexes.
+
+  The scanner parameters XML is several megabytes, so it is downloaded at
+  most once per ``max_age`` seconds, kept on disk and parsed a single time.
+
+  Available public methods:
+    - load: load the catalog from disk or from the gateway
+    - search: substring search over codes and display names
+    - filters_for: filter codes compatible with an instrument
+  """
+
+  def __init__(self, cache_file: str, max_age: int) -> None:
+    """Initialize an empty catalog.
+
+    Args:
+      cache_file: Path of the on-disk copy of the scanner parameters XML.
+      max_age: Maximum age of the catalog in seconds before it is refreshed.
+
+    """
+    self.cache_file = Path(cache_file)
+    self.max_age = max_age
+    self.loaded_at: float | None = None
+    self.instruments: dict[str, dict] = {}
+    self.locations: dict[str, dict] = {}
+    self.filters: dict[str, dict] = {}
+    self.scan_codes: dict[str, dict] = {}
+    self._instrument_filters: dict[str, set[str]] = {}
+    self._lock = asyncio.Lock()
+
+  async def load(self, fetch: Callable[[], Awaitable[str]]) -> None:
+    """Load the catalog, refreshing it when it is older than max_age.
+
+    Args:
+      fetch: Coroutine function returning the scanner parameters XML.
+
+    """
+    async with self._lock:
+      if self.loaded_at and time.time() - self.loaded_at < self.max_age:
+        CACHE_REQUESTS.labels(cache="scanner_params", result="hit").inc()
+        return
+      CACHE_REQUESTS.labels(cache="scanner_params", result="miss").inc()
+
+      if (
+        self.cache_file.exists()
+        and time.time() - self.cache_file.stat().st_mtime < self.max_age
+      ):
+        logger.debug("Loading scanner parameters from {}", self.cache_file)
+        xml_parameters = self.cache_file.read_text()
+        loaded_at = self.cache_file.stat().st_mtime
+      else:
+        logger.debug("Downloading scanner parameters")
+        xml_parameters = await fetch()
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_file.write_text(xml_parameters)
+        loaded_at = time.time()
+
+      await asyncio.to_thread(self.parse, xml_parameters)
+      self.loaded_at = loaded_at
+
+  def parse(self, xml_parameters: str) -> None:
+    """Build the indexes from the scanner parameters XML."""
+    tree = ElementTree.fromstring(xml_parameters)
+
+    instruments = {}
+    for elem in tree.iter("Instrument"):
+      code = elem.findtext("type")
+      if code:
+        instruments[code] = {
+          "code": code,
+          "name": elem.findtext("name", ""),
+          "filters": self._split(elem.findtext("filters")),
+        }
+
+    locations = {}
+    for elem in tree.iter("Location"):
+      code = elem.findtext("locationCode")
+      if code:
+        locations[code] = {
+          "code": code,
+          "name": elem.findtext("displayName", ""),
+          "instruments": self._split(elem.findtext("instruments")),
+        }
+
+    scan_codes = {}
+    for elem in tree.iter("ScanType"):
+      code = elem.findtext("scanCode")
+      if code:
+        scan_codes[code] = {
+          "code": code,
+          "name": elem.findtext("displayName", ""),
+          "instruments": self._split(elem.findtext("instruments")),
+        }
+
+    filters = {}
+    codes_by_filter_id: dict[str, list[str]] = {}
+    filter_list = tree.find(".//FilterList")
+    for filter_elem in filter_list if filter_list is not None else []:
+      filter_id = filter_elem.findtext("id", "")
+      codes_by_filter_id[filter_id] = []
+      for field in filter_elem.iter("AbstractField"):
+        self._add_filter(filters, field, filter_id, filter_elem.findtext("category"))
+        codes_by_filter_id[filter_id].append(field.findtext("code"))
+
+    # Fields outside the filter list, kept for parity with the raw XML
+    for field in tree.iter("AbstractField"):
+      if field.findtext("code") not in filters:
+        self._add_filter(filters, field, None, None)
+
+    self.instruments = instruments
+    self.locations = locations
+    self.scan_codes = scan_codes
+    self.filters = filters
+    self._instrument_filters = {
+      code: {
+        field_code
+        for filter_id in instrument["filters"]
+        for field_code in codes_by_filter_id.get(filter_id, [])
+      }
+      for code, instrument in instruments.items()
+    }
+
+  def filters_for(self, instrument_code: str) -> set[str]:
+    """Get the filter codes compatible with an instrument."""
+    return self._instrument_filters.get(instrument_code, set())
+
+  def search(
+    self,
+    kind: str,
+    query: str = "",
+    instrument_code: str | None = None,
+    limit: int = 50,
+  ) -> list[dict]:
+    """Search codes and display names by substring.
+
+    Args:
+      kind: One of "instrument", "location", "filter" or "scan_code".
+      query: Case-insensitive substring to match, empty matches everything.
+      instrument_code: Only return entries compatible with this instrument.
+      limit: Maximum number of entries to return.
+
+    Returns:
+      List of matching entries with their code and display name.
+
+    """
+    if kind not in SEARCH_KINDS:
+      msg = f"Unknown scanner code kind {kind}, expected one of {SEARCH_KINDS}"
+      raise ValueError(msg)
+
+    index = {
+      "instrument": self.instruments,
+      "location": self.locations,
+      "filter": self.filters,
+      "scan_code": self.scan_codes,
+    }[kind]
+    query = query.lower()
+
+    matches = []
+    for code, entry in index.items():
+      if query not in code.lower() and query not in entry["name"].lower():
+        continue
+      if instrument_code and not self._compatible(kind, entry, instrument_code):
+        continue
+      matches.append({"code": code, "name": entry["name"]})
+      if len(matches) >= limit:
+        break
+    return matches
+
+  def _compatible(self, kind: str, entry: dict, instrument_code: str) -> bool:
+    """Check if an entry can be used with the given instrument."""
+    if kind == "instrument":
+      return entry["code"] == instrument_code
+    if kind == "filter":
+      return entry["code"] in self.filters_for(instrument_code)
+    return instrument_code in entry["instruments"]
+
+  @staticmethod
+  def _add_filter(
+    filters: dict[str, dict],
+    field: Element,
+    filter_id: str | None,
+    category: str | None,
+  ) -> None:
+    """Add an abstract field to the filter index."""
+    code = field.findtext("code")
+    if code and code not in filters:
+      filters[code] = {
+        "code": code,
+        "name": field.findtext("displayName", ""),
+        "filterId": filter_id,
+        "category": category,
+      }
+
+  @staticmethod
+  def _split(value: str | None) -> list[str]:
+    """Split a comma separated XML value."""
+    return [item for item in (value or "").split(",") if item]
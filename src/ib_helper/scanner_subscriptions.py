@@ -0,0 +1,207 @@
+"""Persistent scanner subscriptions with delta updates."""
+import asyncio
+import time
+from loguru import logger
+from ib_async import IB
+from ib_async.objects import ScanDataList, ScannerSubscription, TagValue
+
+
+def scan_rows(data_list: ScanDataList) -> dict[int, dict]:
+  """Convert scan data into rows keyed by conId."""
+  rows = {}
+  for row in data_list:
+    contract = row.contractDetails.contract
+    rows[contract.conId] = {
+      "conId": contract.conId,
+      "symbol": contract.symbol,
+      "secType": contract.secType,
+      "rank": row.rank,
+      "distance": row.distance,
+      "benchmark": row.benchmark,
+      "projection": row.projection,
+    }
+  return rows
+
+
+def diff_scan_rows(previous: dict[int, dict], current: dict[int, dict]) -> dict:
+  """Compare two scan results.
+
+  Args:
+    previous: Rows returned by the previous call, keyed by conId.
+    current: Current rows, keyed by conId.
+
+  Returns:
+    Dictionary with the added and removed rows, the re-ranked rows with
+    their previous rank and the number of unchanged rows.
+
+  """
+  added = [row for con_id, row in current.items() if con_id not in previous]
+  removed = [row for con_id, row in previous.items() if con_id not in current]
+  moved = [
+    {**row, "previousRank": previous[con_id]["rank"]}
+    for con_id, row in current.items()
+    if con_id in previous and previous[con_id]["rank"] != row["rank"]
+  ]
+  return {
+    "added": sorted(added, key=lambda row: row["rank"]),
+    "removed": sorted(removed, key=lambda row: row["rank"]),
+    "moved": sorted(moved, key=lambda row: row["rank"]),
+    "unchanged": len(current) - len(added) - len(moved),
+  }
+
+
+class ScanSubscription:
+  """A running scanner subscription and its latest complete result."""
+
+  def __init__(
+    self,
+    data_list: ScanDataList,
+    key: tuple,
+  ) -> None:
+    """Initialize the subscription.
+
+    Args:
+      data_list: Live scan data list returned by reqScannerSubscription.
+      key: Parameters of the scan, used to detect changed requests.
+
+    """
+    self.data_list = data_list
+    self.key = key
+    self.latest: dict[int, dict] | None = None
+    self.updated_at: float | None = None
+    self.ready = asyncio.Event()
+    data_list.updateEvent += self.on_update
+
+  def on_update(self, data_list: ScanDataList) -> None:
+    """Store the complete result after each scanner update."""
+    self.latest = scan_rows(data_list)
+    self.updated_at = time.time()
+    self.ready.set()
+
+
+class ScannerSubscriptionManager:
+  """Named scanner subscriptions that keep running between calls.
+
+  The manager owns the gateway scanner slots: every running named scan holds
+  one, and one-shot scans acquire one from ``slots`` while they run, so all
+  callers of a shared client stay within the gateway limit together.
+
+  Available public methods:
+    - attach: subscribe to the connection events of an IB instance
+    - updates: get the changes of a named scan since the previous call
+    - stop: cancel a named scan
+    - names: list the running scans
+  """
+
+  def __init__(self, max_subscriptions: int) -> None:
+    """Initialize the manager.
+
+    Args:
+      max_subscriptions: Maximum number of concurrent scans, IB allows 10.
+
+    """
+    self.max_subscriptions = max_subscriptions
+    self.slots = asyncio.Semaphore(max_subscriptions)
+    self.ib: IB | None = None
+    self.subscriptions: dict[str, ScanSubscription] = {}
+    self._previous: dict[str, dict[int, dict]] = {}
+
+  def attach(self, ib: IB) -> None:
+    """Drop the subscriptions when the gateway connection is lost."""
+    if self.ib is ib:
+      return
+    self.ib = ib
+    ib.disconnectedEvent += self.on_disconnected
+
+  def on_disconnected(self) -> None:
+    """Drop the subscriptions, the gateway cancels them with the connection."""
+    for scan in self.subscriptions.values():
+      scan.data_list.updateEvent -= scan.on_update
+      self.slots.release()
+    self.subscriptions.clear()
+
+  async def updates(
+    self,
+    name: str,
+    subscription: ScannerSubscription,
+    filter_tags: list[TagValue],
+    timeout: float,
+  ) -> dict:
+    """Get the changes of a named scan since the previous call.
+
+    The scan is started on the first call and restarted if its parameters
+    change, the first call reports all rows as added.
+
+    Args:
+      name: Name of the scan.
+      subscription: Scanner subscription parameters.
+      filter_tags: Scanner filter options.
+      timeout: Seconds to wait for the first result of a new scan, a scan
+        without a result is stopped when the wait fails.
+
+    Returns:
+      Dictionary with the delta, see diff_scan_rows, and the result age.
+
+    """
+    key = (
+      subscription.instrument,
+      subscription.locationCode,
+      subscription.scanCode,
+      subscription.numberOfRows,
+      tuple((tag.tag, tag.value) for tag in filter_tags),
+    )
+    scan = self.subscriptions.get(name)
+    if scan is not None and scan.key != key:
+      logger.debug("Scan {} parameters changed, restarting", name)
+      self.stop(name)
+      scan = None
+
+    if scan is None:
+      if len(self.subscriptions) >= self.max_subscriptions:
+        msg = (
+          f"Too many running scans ({len(self.subscriptions)}), "
+          f"stop one of {self.names()} first"
+        )
+        raise RuntimeError(msg)
+      logger.debug("Starting scan {}", name)
+      await self.slots.acquire()
+      data_list = self.ib.reqScannerSubscription(subscription, [], filter_tags)
+      scan = ScanSubscription(data_list, key)
+      self.subscriptions[name] = scan
+
+    try:
+      await asyncio.wait_for(scan.ready.wait(), timeout=timeout)
+    except BaseException:
+      # Free the slot of a scan that never delivered a result
+      if scan.latest is None and self.subscriptions.get(name) is scan:
+        self.stop(name)
+      raise
+
+    previous = self._previous.get(name, {})
+    self._previous[name] = scan.latest
+    return {
+      **diff_scan_rows(previous, scan.latest),
+      "ageSeconds": round(time.time() - scan.updated_at, 1),
+    }
+
+  def stop(self, name: str) -> bool:
+    """Cancel a named scan.
+
+    Returns:
+      True if the scan was running.
+
+    """
+    scan = self.subscriptions.pop(name, None)
+    self._previous.pop(name, None)
+    if scan is None:
+      return False
+
+    scan.data_list.updateEvent -= scan.on_update
+    self.slots.release()
+    if self.ib is not None and self.ib.isConnected():
+      self.ib.cancelScannerSubscription(scan.data_list)
+    return True
+
+  def names(self) -> list[str]:
+    """List the running scans."""
+    return list(self.subscriptions)
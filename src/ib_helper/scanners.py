@@ -1,10 +1,46 @@
 """Scanner operations."""
+import asyncio
+import contextlib
+import math
+from dataclasses import dataclass
 from loguru import logger
 
-from defusedxml import ElementTree
-from ib_async.objects import ScannerSubscription, TagValue
+from ib_async.contract import Contract
+from ib_async.objects import ScanDataList, ScannerSubscription, TagValue
+from ib_async.ticker import Ticker
 
+from src.utilities.tracing import span
 from .client import IBClient
+from .scanner_catalog import ScannerCatalog
+from .scanner_subscriptions import ScannerSubscriptionManager
+
+@dataclass(frozen=True, slots=True)
+class ScanSpec:
+  """Parameters of a scan.
+
+  Attributes:
+    instrument_code: Instrument code to scan.
+    location_code: Location code to scan.
+    tags: Filter tags in 'parameter=value' format.
+    scan_code: Scan code to run.
+    number_of_rows: Number of rows to return.
+
+  """
+
+  instrument_code: str
+  location_code: str
+  tags: list[str]
+  scan_code: str | None = "TOP_PERC_GAIN"
+  number_of_rows: int | None = 50
+
+  def subscription(self) -> ScannerSubscription:
+    """Create the scanner subscription of the scan."""
+    return ScannerSubscription(
+      numberOfRows=self.number_of_rows,
+      instrument=self.instrument_code,
+      locationCode=self.location_code,
+      scanCode=self.scan_code,
+    )
 
 class ScannerClient(IBClient):
   """Scanner operations.
@@ -13,16 +49,40 @@ class ScannerClient(IBClient):
     - get_scanner_instrument_codes: get scanner instrument codes
     - get_scanner_location_codes: get scanner location codes
     - get_scanner_filter_codes: get scanner filter codes
+    - search_scanner_codes: search scanner codes by substring
     - get_scanner_results: get scanner results
+    - get_scanner_market_data: get scanner results with market data
+    - get_multi_scanner_results: run several scans concurrently and rank them
+    - get_scanner_updates: get changes of a named scan since the last call
+    - stop_scanner_subscription: stop a named scan
   """
 
+  def __init__(self) -> None:
+    """Initialize the ScannerClient."""
+    super().__init__()
+    self.scanner_catalog = ScannerCatalog(
+      self.config.scanner_params_file,
+      self.config.scanner_params_max_age,
+    )
+    self.scanner_subscriptions = ScannerSubscriptionManager(
+      self.config.scanner_max_subscriptions,
+    )
+
+  @staticmethod
+  def _parse_tags(tags: list[str]) -> list[TagValue]:
+    """Convert 'parameter=value' strings into scanner filter tags."""
+    return [TagValue(*tag.split("=", 1)) for tag in tags]
+
+  async def _fetch_scanner_parameters(self) -> str:
+    """Download the scanner parameters XML from the gateway."""
+    await self._connect()
+    return await self.ib.reqScannerParametersAsync()
+
   async def get_scanner_instrument_codes(self) -> list[str]:
     """Get scanner instrument codes."""
     try:
-      await self._connect()
-      xml_parameters = await self.ib.reqScannerParametersAsync()
-      tree = ElementTree.fromstring(xml_parameters)
-      tags = [elem.text for elem in tree.findall(".//Instrument/type")]
+      await self.scanner_catalog.load(self._fetch_scanner_parameters)
+      tags = list(self.scanner_catalog.instruments)
     except Exception as e:
       logger.error("Error getting scanner instrument codes: {}", str(e))
       raise
@@ -32,10 +92,8 @@ class ScannerClient(IBClient):
   async def get_scanner_location_codes(self) -> list[str]:
     """Get scanner location codes."""
     try:
-      await self._connect()
-      xml_parameters = await self.ib.reqScannerParametersAsync()
-      tree = ElementTree.fromstring(xml_parameters)
-      tags = [elem.text for elem in tree.findall(".//Location/locationCode")]
+      await self.scanner_catalog.load(self._fetch_scanner_parameters)
+      tags = list(self.scanner_catalog.locations)
     except Exception as e:
       logger.error("Error getting scanner location codes: {}", str(e))
       raise
@@ -45,16 +103,57 @@ class ScannerClient(IBClient):
   async def get_scanner_filter_codes(self) -> list[str]:
     """Get scanner filter codes."""
     try:
-      await self._connect()
-      xml_parameters = await self.ib.reqScannerParametersAsync()
-      tree = ElementTree.fromstring(xml_parameters)
-      tags = [elem.text for elem in tree.findall(".//AbstractField/code")]
+      await self.scanner_catalog.load(self._fetch_scanner_parameters)
+      tags = list(self.scanner_catalog.filters)
     except Exception as e:
       logger.error("Error getting scanner filter codes: {}", str(e))
       raise
     else:
       return tags
 
+  async def search_scanner_codes(
+      self,
+      kind: str,
+      query: str = "",
+      instrument_code: str | None = None,
+      limit: int = 50,
+    ) -> list[dict]:
+    """Search scanner codes by substring.
+
+    Args:
+      kind: Kind of code to search, one of:
+        - instrument: instrument codes, e.g. STK
+        - location: location codes, e.g. STK.US.MAJOR
+        - filter: filter codes, e.g. priceAbove
+        - scan_code: scan codes, e.g. TOP_PERC_GAIN
+      query: Case-insensitive substring of the code or display name.
+      instrument_code: Only return codes compatible with this instrument.
+      limit: Maximum number of codes to return.
+
+    Returns:
+      List of matching codes with their display names.
+
+    """
+    try:
+      await self.scanner_catalog.load(self._fetch_scanner_parameters)
+      matches = self.scanner_catalog.search(kind, query, instrument_code, limit)
+    except Exception as e:
+      logger.error("Error searching scanner codes: {}", str(e))
+      raise
+    else:
+      return matches
+
+  async def _run_scan(self, spec: ScanSpec) -> ScanDataList:
+    """Run a single scan and return its rows."""
+    logger.debug("Getting scanner results with tags: {}", spec.tags)
+    await self._connect()
+    async with self.scanner_subscriptions.slots:
+      return await self.ib.reqScannerDataAsync(
+        spec.subscription(),
+        [],
+        self._parse_tags(spec.tags),
+      )
+
   async def get_scanner_results(
       self,
       instrument_code: str,
@@ -77,23 +176,273 @@ class ScannerClient(IBClient):
 
     """
     try:
-      logger.debug("Getting scanner results with tags: {}", tags)
-      cleaned_tags = [TagValue(tag.split("=")[0], tag.split("=")[1]) for tag in tags]
+      scanner_data = await self._run_scan(ScanSpec(
+        instrument_code,
+        location_code,
+        tags,
+        scan_code,
+        number_of_rows,
+      ))
+      symbols = [row.contractDetails.contract.symbol for row in scanner_data]
+    except Exception as e:
+      logger.error("Error getting scanner results: {}", str(e))
+      raise
+    else:
+      return symbols
+
+  async def _stream_tickers(
+      self,
+      contracts: list[Contract],
+      generic_ticks: str,
+      tickers: list[Ticker],
+    ) -> None:
+    """Stream market data until every ticker has a price and implied volatility.
+
+    Generic ticks are not available for snapshots, so the data is streamed
+    for all contracts at once and cancelled as soon as it is complete. Callers
+    bound the wait with ``asyncio.timeout`` and keep the partial data.
+
+    Args:
+      contracts: Contracts to get market data for.
+      generic_ticks: Comma separated generic tick types, e.g. "106".
+      tickers: Receives the tickers in the order of the contracts.
+
+    """
+    def complete(ticker: Ticker) -> bool:
+      price = ticker.marketPrice()
+      if math.isnan(price):
+        price = ticker.close
+      return not math.isnan(price) and not math.isnan(ticker.impliedVolatility)
+
+    updated = asyncio.Event()
+
+    def on_pending(_: set[Ticker]) -> None:
+      updated.set()
+
+    self.ib.pendingTickersEvent += on_pending
+    tickers.extend(
+      self.ib.reqMktData(contract, generic_ticks) for contract in contracts
+    )
+    try:
+      with span("ib.streamTickers", contracts=len(contracts)):
+        while not all(complete(ticker) for ticker in tickers):
+          updated.clear()
+          await updated.wait()
+    finally:
+      self.ib.pendingTickersEvent -= on_pending
+      for contract in contracts:
+        self.ib.cancelMktData(contract)
+
+  @staticmethod
+  def _market_data_row(rank: int, ticker: Ticker) -> dict:
+    """Build a compact market data row for a scanned contract."""
+    def number(value: float, digits: int = 2) -> float | None:
+      return None if value is None or math.isnan(value) else round(value, digits)
+
+    price = ticker.marketPrice()
+    if math.isnan(price):
+      price = ticker.close
+    change = (
+      (price - ticker.close) / ticker.close * 100
+      if ticker.close and not math.isnan(ticker.close)
+      else math.nan
+    )
+    return {
+      "rank": rank,
+      "conId": ticker.contract.conId,
+      "symbol": ticker.contract.symbol,
+      "price": number(price),
+      "changePercent": number(change),
+      "volume": number(ticker.volume, 0),
+      "impliedVol": number(ticker.impliedVolatility, 4),
+    }
+
+  async def get_scanner_market_data(
+      self,
+      spec: ScanSpec,
+      *,
+      implied_vol: bool = False,
+    ) -> list[dict]:
+    """Get scanner results with market data for every row.
+
+    The contracts in the scan rows are already qualified, so the market data
+    is requested for all of them in a single batch.
+
+    Args:
+      spec: Parameters of the scan.
+      implied_vol: Also get the implied volatility, which needs streaming data
+        and takes up to scanner_market_data_timeout seconds.
+
+    Returns:
+      List of rows with rank, conId, symbol, price, change, volume and
+      implied volatility.
 
+    """
+    try:
+      scanner_data = await self._run_scan(spec)
+      contracts = [row.contractDetails.contract for row in scanner_data]
+
+      self._request_market_data_type()
+      if implied_vol:
+        tickers = []
+        timeout = self.config.scanner_market_data_timeout
+        with contextlib.suppress(TimeoutError):
+          async with asyncio.timeout(timeout) as deadline:
+            await self._stream_tickers(contracts, "106", tickers)
+        if deadline.expired():
+          logger.debug("Market data incomplete after {} seconds", timeout)
+      else:
+        tickers = await self.ib.reqTickersAsync(*contracts)
+
+      rows = [
+        self._market_data_row(row.rank, ticker)
+        for row, ticker in zip(scanner_data, tickers, strict=True)
+      ]
+    except Exception as e:
+      logger.error("Error getting scanner market data: {}", str(e))
+      raise
+    else:
+      return rows
+
+  @staticmethod
+  def _merge_scans(scans: dict[str, ScanDataList]) -> list[dict]:
+    """Merge scan results on conId and rank them across scans.
+
+    Each scan gives a row a score between 1 (first) and 1/n (last of n
+    rows), the combined score is the sum over the scans, so contracts that
+    rank high in several scans come first.
+    """
+    merged: dict[int, dict] = {}
+    for scan_code, rows in scans.items():
+      for row in rows:
+        contract = row.contractDetails.contract
+        entry = merged.setdefault(contract.conId, {
+          "conId": contract.conId,
+          "symbol": contract.symbol,
+          "score": 0.0,
+          "ranks": {},
+        })
+        entry["score"] += (len(rows) - row.rank) / len(rows)
+        entry["ranks"][scan_code] = row.rank
+
+    ranked = sorted(merged.values(), key=lambda entry: -entry["score"])
+    for rank, entry in enumerate(ranked):
+      entry["rank"] = rank
+      entry["score"] = round(entry["score"], 3)
+    return ranked
+
+  @staticmethod
+  def _split_scan_results(
+    scan_codes: list[str],
+    results: list[ScanDataList | BaseException],
+  ) -> tuple[dict[str, ScanDataList], dict[str, str]]:
+    """Split the results of concurrent scans into rows and errors.
+
+    Raises:
+      RuntimeError: If every scan failed.
+
+    """
+    scans = {}
+    errors = {}
+    for scan_code, result in zip(scan_codes, results, strict=True):
+      if isinstance(result, Exception):
+        logger.error("Error running scan {}: {}", scan_code, str(result))
+        errors[scan_code] = str(result)
+      else:
+        scans[scan_code] = result
+    if not scans:
+      msg = f"All scans failed: {errors}"
+      raise RuntimeError(msg)
+    return scans, errors
+
+  async def get_multi_scanner_results(
+      self,
+      instrument_code: str,
+      location_code: str,
+      scan_codes: list[str],
+      tags: list[str],
+      number_of_rows: int | None = 50,
+    ) -> dict:
+    """Run several scans concurrently and merge them into one ranking.
+
+    Scans run in parallel within the gateway limit on concurrent scanners,
+    which is shared with all other scans of the client, named or not.
+
+    Args:
+      instrument_code: Instrument code to scan.
+      location_code: Location code to scan.
+      scan_codes: Scan codes to run, e.g. ["TOP_PERC_GAIN", "MOST_ACTIVE"].
+      tags: Filter tags in 'parameter=value' format, applied to every scan.
+      number_of_rows: Number of rows per scan.
+
+    Returns:
+      Dictionary with the merged rows, each with its combined rank, score
+      and rank in every scan it appeared in, and the errors of failed scans.
+
+    """
+    try:
       await self._connect()
-      sub_object = ScannerSubscription(
-        numberOfRows=number_of_rows,
-        instrument=instrument_code,
-        locationCode=location_code,
-        scanCode=scan_code,
+      scan_codes = list(dict.fromkeys(scan_codes))
+      results = await asyncio.gather(
+        *(
+          self._run_scan(ScanSpec(
+            instrument_code,
+            location_code,
+            tags,
+            scan_code,
+            number_of_rows,
+          ))
+          for scan_code in scan_codes
+        ),
+        return_exceptions=True,
       )
-      active_sub = self.ib.reqScannerSubscription(sub_object, [], cleaned_tags)
-      scanner_data = await self.ib.reqScannerDataAsync(sub_object, [], cleaned_tags)
-      self.ib.cancelScannerSubscription(active_sub)
 
-      symbols = [row.contractDetails.contract.symbol for row in scanner_data]
+      scans, errors = self._split_scan_results(scan_codes, results)
     except Exception as e:
-      logger.error("Error getting scanner results: {}", str(e))
+      logger.error("Error getting multi scanner results: {}", str(e))
       raise
     else:
-      return symbols
+      return {"results": self._merge_scans(scans), "errors": errors}
+
+  async def get_scanner_updates(self, name: str, spec: ScanSpec) -> dict:
+    """Get the changes of a named scan since the previous call.
+
+    The scan keeps running on the gateway between calls, so repeated calls
+    only read the latest result instead of starting a new scan.
+
+    Args:
+      name: Name of the scan, reused across calls.
+      spec: Parameters of the scan.
+
+    Returns:
+      Dictionary with the added, removed and re-ranked rows, the number of
+      unchanged rows and the age of the result in seconds.
+
+    """
+    try:
+      logger.debug("Getting updates for scan {} with tags: {}", name, spec.tags)
+      await self._connect()
+      self.scanner_subscriptions.attach(self.ib)
+      updates = await self.scanner_subscriptions.updates(
+        name,
+        spec.subscription(),
+        self._parse_tags(spec.tags),
+        self.ib.RequestTimeout,
+      )
+    except Exception as e:
+      logger.error("Error getting scanner updates: {}", str(e))
+      raise
+    else:
+      return updates
+
+  def stop_scanner_subscription(self, name: str) -> bool:
+    """Stop a named scan.
+
+    Args:
+      name: Name of the scan.
+
+    Returns:
+      True if the scan was running.
+
+    """
+    return self.scanner_subscriptions.stop(name)
@@ -0,0 +1,261 @@
+"""Simulated IB gateway for benchmarks and load tests.
+
+Implements the requests of ``ib_async.IB`` used by ``src.ib_helper`` against
+generated data, with a configurable latency per request and the gateway
+pacing limit of messages per second. Enabled in the MCP server with the
+ib_simulated setting.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+
+from eventkit import Event
+from ib_async.contract import Contract, ContractDetails
+from ib_async.objects import OptionChain, OptionComputation, ScanData, ScanDataList
+from ib_async.order import Order, OrderState, OrderStatus, Trade
+from ib_async.ticker import Ticker
+
+# Error of requests sent faster than the pacing limit
+PACING_ERROR = (100, "Max rate of messages per second has been exceeded")
+
+
+def scanner_parameters_xml(instruments: int, filters: int) -> str:
+  """Generate a scanner parameters XML of the given size."""
+  instrument_codes = [f"INS{i}" for i in range(instruments)]
+  filter_ids = [f"FILTER{i}" for i in range(filters)]
+  return "".join([
+    '<?xml version="1.0" encoding="UTF-8"?><ScanParameterResponse>',
+    "<InstrumentList>",
+    *(
+      f"<Instrument><name>Instrument {code}</name><type>{code}</type>"
+      f"<filters>{','.join(filter_ids)}</filters></Instrument>"
+      for code in instrument_codes
+    ),
+    "</InstrumentList><LocationTree>",
+    *(
+      f"<Location><displayName>Location {code}</displayName>"
+      f"<locationCode>{code}.US</locationCode>"
+      f"<instruments>{code}</instruments></Location>"
+      for code in instrument_codes
+    ),
+    "</LocationTree><ScanTypeList>",
+    *(
+      f"<ScanType><displayName>Scan {i}</displayName>"
+      f"<scanCode>SCAN{i}</scanCode>"
+      f"<instruments>{','.join(instrument_codes)}</instruments></ScanType>"
+      for i in range(filters)
+    ),
+    "</ScanTypeList><FilterList>",
+    *(
+      f"<RangeFilter><id>{filter_id}</id><category>Category</category>"
+      f"<AbstractField><code>{filter_id.lower()}Above</code>"
+      f"<displayName>{filter_id} Above</displayName></AbstractField>"
+      f"<AbstractField><code>{filter_id.lower()}Below</code>"
+      f"<displayName>{filter_id} Below</displayName></AbstractField></RangeFilter>"
+      for filter_id in filter_ids
+    ),
+    "</FilterList></ScanParameterResponse>",
+  ])
+
+
+class SimulatedIB:
+  """In-process stand-in for ``ib_async.IB`` connected to a gateway.
+
+  Options chains have ``expirations`` x ``strikes`` x 2 rights contracts,
+  every qualified option gets a ticker with model greeks. Orders fill after
+  one request latency.
+
+  Available public methods:
+    - isConnected, connectAsync, disconnect: connection state
+    - qualifyContractsAsync: qualify contracts of the chains or by conId
+    - reqSecDefOptParamsAsync: get the options chain parameters
+    - reqTickersAsync: get snapshot tickers with greeks
+    - reqScannerDataAsync, reqScannerParametersAsync: run scans
+    - placeOrder, cancelOrder, whatIfOrderAsync: trade
+  """
+
+  def __init__(
+    self,
+    expirations: int = 10,
+    strikes: int = 50,
+    latency: float = 0.0,
+    max_messages_per_second: int | None = None,
+    scanner_xml: str | None = None,
+  ) -> None:
+    """Initialize the simulated gateway.
+
+    Args:
+      expirations: Number of expirations of every options chain.
+      strikes: Number of strikes of every options chain.
+      latency: Seconds every request takes.
+      max_messages_per_second: Pacing limit, requests above it get error
+        100 and wait for the next second. None for no limit.
+      scanner_xml: Scanner parameters XML, a small generated one by default.
+
+    """
+    self.expirations = [f"2026{month:02d}{day:02d}" for month, day in itertools.islice(
+      ((month, day) for month in range(1, 13) for day in (7, 14, 21, 28)), expirations,
+    )]
+    self.strikes = [100.0 + 5 * i for i in range(strikes)]
+    self.latency = latency
+    self.max_messages_per_second = max_messages_per_second
+    self.scanner_xml = scanner_xml or scanner_parameters_xml(instruments=5, filters=20)
+    self.RequestTimeout = 0
+    self.errorEvent = Event("errorEvent")
+    self.pendingTickersEvent = Event("pendingTickersEvent")
+    # Account streams followed by the position book, never emitted
+    self.positionEvent = Event("positionEvent")
+    self.pnlEvent = Event("pnlEvent")
+    self.pnlSingleEvent = Event("pnlSingleEvent")
+    self.execDetailsEvent = Event("execDetailsEvent")
+    self.disconnectedEvent = Event("disconnectedEvent")
+    self.pacing_violations = 0
+    self._sent: deque[float] = deque()
+    self._contracts: dict[int, Contract] = {}
+    self._con_ids: dict[tuple, int] = {}
+    self._order_ids = itertools.count(1)
+
+  def isConnected(self) -> bool:
+    """Report a connected gateway."""
+    return True
+
+  async def connectAsync(self, *args: object, **kwargs: object) -> None:
+    """Connect, nothing to do."""
+
+  def disconnect(self) -> None:
+    """Disconnect, nothing to do."""
+
+  def reqMarketDataType(self, market_data_type: int) -> None:
+    """Set the market data type, nothing to do."""
+
+  async def _request(self, messages: int = 1) -> None:
+    """Wait for the pacing limit and the latency of a request."""
+    if self.max_messages_per_second is not None:
+      for _ in range(messages):
+        now = time.monotonic()
+        while self._sent and now - self._sent[0] >= 1:
+          self._sent.popleft()
+        if len(self._sent) >= self.max_messages_per_second:
+          self.pacing_violations += 1
+          self.errorEvent.emit(-1, *PACING_ERROR, None)
+          await asyncio.sleep(1 - (now - self._sent[0]))
+          self._sent.popleft()
+        self._sent.append(time.monotonic())
+    if self.latency:
+      await asyncio.sleep(self.latency)
+
+  def _con_id(self, contract: Contract) -> int:
+    """Get the conId of a contract, assigning one on first use."""
+    key = (
+      contract.symbol, contract.secType or "OPT", contract.lastTradeDateOrContractMonth,
+      contract.strike, contract.right, contract.tradingClass,
+    )
+    if key not in self._con_ids:
+      self._con_ids[key] = 1000 + len(self._con_ids)
+    return self._con_ids[key]
+
+  async def qualifyContractsAsync(self, *contracts: Contract) -> list[Contract]:
+    """Fill in the conId, local symbol and currency of contracts."""
+    await self._request(len(contracts))
+    qualified = []
+    for contract in contracts:
+      if contract.conId:
+        if contract.conId in self._contracts:
+          qualified.append(self._contracts[contract.conId])
+        continue
+      contract.conId = self._con_id(contract)
+      contract.currency = contract.currency or "USD"
+      contract.multiplier = contract.multiplier or (
+        "100" if contract.secType == "OPT" else ""
+      )
+      if contract.secType == "OPT":
+        contract.localSymbol = (
+          f"{contract.symbol:<6}{contract.lastTradeDateOrContractMonth[2:]}"
+          f"{contract.right}{int(contract.strike * 1000):08d}"
+        )
+      else:
+        contract.localSymbol = contract.symbol
+      self._contracts[contract.conId] = contract
+      qualified.append(contract)
+    return qualified
+
+  async def reqSecDefOptParamsAsync(
+    self, symbol: str, _exchange: str, _sec_type: str, con_id: int,
+  ) -> list[OptionChain]:
+    """Get the options chain parameters of an underlying."""
+    await self._request()
+    return [OptionChain("SMART", con_id, symbol, "100", self.expirations, self.strikes)]
+
+  async def reqTickersAsync(self, *contracts: Contract) -> list[Ticker]:
+    """Get snapshot tickers, options with model greeks."""
+    await self._request(len(contracts))
+    tickers = []
+    for contract in contracts:
+      price = 1 + contract.conId % 97 / 10
+      greeks = None
+      if contract.secType == "OPT":
+        middle = self.strikes[len(self.strikes) // 2]
+        moneyness = (contract.strike - middle) / contract.strike
+        delta = max(-1.0, min(1.0, 0.5 - moneyness * 5))
+        greeks = OptionComputation(
+          0, 0.25, delta if contract.right == "C" else delta - 1, price,
+          0.0, 0.02, 0.1, -0.05, 150.0,
+        )
+      tickers.append(Ticker(
+        contract=contract, bid=price - 0.05, ask=price + 0.05, last=price, close=price,
+        volume=1000, modelGreeks=greeks,
+      ))
+    return tickers
+
+  async def reqScannerDataAsync(
+    self, subscription: object, *_args: object,
+  ) -> ScanDataList:
+    """Run a scan, ranking generated stocks."""
+    await self._request()
+    rows = ScanDataList()
+    for rank in range(subscription.numberOfRows or 50):
+      contract = Contract(conId=500 + rank, symbol=f"STK{rank}", secType="STK")
+      rows.append(ScanData(rank, ContractDetails(contract=contract), "", "", "", ""))
+    return rows
+
+  async def reqScannerParametersAsync(self) -> str:
+    """Get the scanner parameters XML."""
+    await self._request()
+    return self.scanner_xml
+
+  async def whatIfOrderAsync(self, _contract: Contract, _order: Order) -> OrderState:
+    """Get the margin impact of an order."""
+    await self._request()
+    return OrderState(
+      initMarginChange="1000", maintMarginChange="800", initMarginAfter="5000",
+      equityWithLoanAfter="100000", commission=1.0, commissionCurrency="USD",
+    )
+
+  def placeOrder(self, contract: Contract, order: Order) -> Trade:
+    """Place an order, filled after the request latency."""
+    order.orderId = order.orderId or next(self._order_ids)
+    trade = Trade(contract, order, OrderStatus(
+      orderId=order.orderId,
+      status=OrderStatus.Submitted,
+      remaining=order.totalQuantity,
+    ))
+
+    def fill() -> None:
+      trade.orderStatus.status = OrderStatus.Filled
+      trade.orderStatus.filled = order.totalQuantity
+      trade.orderStatus.remaining = 0
+      trade.orderStatus.avgFillPrice = (
+        order.lmtPrice if order.orderType == "LMT" else 100.0
+      )
+      trade.statusEvent.emit(trade)
+
+    asyncio.get_running_loop().call_later(self.latency, fill)
+    return trade
+
+  def cancelOrder(self, order: Order) -> None:
+    """Cancel an order, nothing to do."""
+
+  def positions(self) -> list:
+    """Get the positions, none are held."""
+    return []
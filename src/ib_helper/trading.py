@@ -1,11 +1,54 @@
 """Trading operations."""
 import asyncio
+import contextlib
 import json
+import math
+import time
+from dataclasses import dataclass
 from loguru import logger
 from ib_async.contract import Contract, ComboLeg
-from ib_async.order import Order
+from ib_async.order import Order, OrderState, OrderStatus, Trade
+from ib_async.util import UNSET_DOUBLE
 from .client import IBClient
+from .order_journal import OrderJournal
 from src.utilities import TelegramApprovalBot
+from src.utilities.metrics import CACHE_REQUESTS
+from src.utilities.tracing import span
+
+# Inactive orders are rejected or held by the gateway, treat them as final
+TERMINAL_STATES = OrderStatus.DoneStates | {OrderStatus.Inactive}
+
+
+@dataclass(frozen=True, slots=True)
+class OrderSpec:
+  """Parameters of an order, independent of its contract.
+
+  Attributes:
+    action: BUY or SELL.
+    quantity: Quantity to trade.
+    order_type: Market (MKT) or limit (LMT).
+    price: Limit price of the order.
+    time_in_force: Time in force, e.g. DAY or GTC, order_time_in_force by default.
+
+  """
+
+  action: str
+  quantity: int
+  order_type: str
+  price: float | None = None
+  time_in_force: str | None = None
+
+  @classmethod
+  def from_dict(cls, spec: dict) -> "OrderSpec":
+    """Create the order parameters of a batch order specification."""
+    return cls(
+      spec["action"],
+      spec["quantity"],
+      spec["order_type"],
+      spec.get("price"),
+      spec.get("time_in_force"),
+    )
+
 
 class TradingClient(IBClient):
   """Trading operations.
@@ -13,12 +56,16 @@ class TradingClient(IBClient):
   Public methods:
     - trade_simple_contract: Trade a simple non-combo contract.
     - trade_combo_contract: Trade a combo contract.
+    - trade_batch: Trade a batch of orders with a single approval round.
   """
 
   def __init__(self) -> None:
     """Initialize OrderClient."""
     super().__init__()
     self.notification_bot = TelegramApprovalBot()
+    self.order_journal = OrderJournal(self.config.order_journal_file)
+    self._what_if_cache: dict[tuple, tuple[float, dict]] = {}
+    self._leg_contracts: dict[int, Contract] = {}
     self._bot_started = False
 
   async def _ensure_bot_running(self) -> None:
@@ -46,10 +93,19 @@ class TradingClient(IBClient):
     }
 
     if contract.secType == "BAG" and contract.comboLegs:
+      # Legs are usually cached by _create_combo_contract, qualify the rest at once
+      missing = [
+        Contract(conId=leg.conId)
+        for leg in contract.comboLegs
+        if leg.conId not in self._leg_contracts
+      ]
+      if missing:
+        qualified = await self.ib.qualifyContractsAsync(*missing)
+        self._leg_contracts.update({leg.conId: leg for leg in qualified})
+
       base_info["legs"] = []
       for leg in contract.comboLegs:
-        leg_contract = Contract(conId=leg.conId)
-        await self.ib.qualifyContractsAsync(leg_contract)
+        leg_contract = self._leg_contracts.get(leg.conId, Contract(conId=leg.conId))
         base_info["legs"].append({
           "conId": leg_contract.conId,
           "symbol": leg_contract.localSymbol.replace(" ", ""),
@@ -59,59 +115,268 @@ class TradingClient(IBClient):
 
     return base_info
 
-  async def _execute_order(
-    self,
-    contract: Contract,
-    action: str,
-    quantity: int,
-    order_type: str,
-    price: float | None = None,
-  ) -> str:
-    """Place an order and wait for confirmation.
+  def _current_positions(self, contract: Contract) -> dict[int, float]:
+    """Get the held quantity of the contract or its legs from the position book.
+
+    Args:
+      contract: Contract object to look up.
+
+    Returns:
+      Dictionary of conId to net quantity held across accounts.
+
+    """
+    con_ids = (
+      [leg.conId for leg in contract.comboLegs]
+      if contract.secType == "BAG" and contract.comboLegs
+      else [contract.conId]
+    )
+    return {
+      con_id: self.position_book.net_position(con_id)
+      for con_id in con_ids
+    }
+
+  def _serialize_trade(self, trade: Trade, contract_info: dict) -> dict:
+    """Serialize a Trade object including its (partial) fills.
+
+    Args:
+      trade: Trade object to serialize.
+      contract_info: Serialized contract of the trade.
+
+    Returns:
+      Dictionary containing relevant trade information.
+
+    """
+    return {
+      "contract": contract_info,
+      "order": {
+        "orderId": trade.order.orderId,
+        "action": trade.order.action,
+        "totalQuantity": trade.order.totalQuantity,
+        "orderType": trade.order.orderType,
+        "lmtPrice": trade.order.lmtPrice,
+        "tif": trade.order.tif,
+      },
+      "orderStatus": {
+        "status": trade.orderStatus.status,
+        "filled": trade.orderStatus.filled,
+        "remaining": trade.orderStatus.remaining,
+        "avgFillPrice": trade.orderStatus.avgFillPrice,
+      },
+      "fills": [
+        {
+          "time": fill.time.isoformat(),
+          "shares": fill.execution.shares,
+          "price": fill.execution.price,
+        }
+        for fill in trade.fills
+      ],
+    }
+
+  async def _wait_for_completion(self, trade: Trade) -> None:
+    """Wait for the trade to reach a terminal state.
+
+    Uses the trade status events, so a fill is seen as soon as the gateway
+    reports it. Callers bound the wait with ``asyncio.timeout``.
+
+    Args:
+      trade: Trade object to wait for.
+
+    """
+    if trade.orderStatus.status in TERMINAL_STATES:
+      return
+
+    done = asyncio.Event()
+
+    def on_status(trade: Trade) -> None:
+      if trade.orderStatus.status in TERMINAL_STATES:
+        done.set()
+
+    trade.statusEvent += on_status
+    try:
+      await done.wait()
+    finally:
+      trade.statusEvent -= on_status
+
+  def _create_order(self, spec: OrderSpec) -> Order:
+    """Create an order object.
+
+    Args:
+      spec: Parameters of the order.
+
+    Returns:
+      Order object.
+
+    """
+    order_type = spec.order_type.upper()
+    order = Order(
+      action=spec.action,
+      totalQuantity=spec.quantity,
+      orderType=order_type,
+      tif=(spec.time_in_force or self.config.order_time_in_force).upper(),
+    )
+    if order_type == "LMT":
+      order.lmtPrice = spec.price
+    return order
+
+  async def _approval_message(self, contract: Contract, order: Order) -> dict:
+    """Build the approval request message for an order.
+
+    Args:
+      contract: Contract object of the order.
+      order: Order object to approve.
+
+    Returns:
+      Dictionary with the contract, order and currently held positions.
+
+    """
+    return {
+      "contract": await self._serialize_contract(contract),
+      "order": {
+        "action": order.action,
+        "totalQuantity": order.totalQuantity,
+        "orderType": order.orderType,
+        "lmtPrice": order.lmtPrice,
+        "tif": order.tif,
+      },
+      "positions": self._current_positions(contract),
+    }
+
+  @staticmethod
+  def _order_key(contract: Contract, order: Order) -> tuple:
+    """Build a hashable key identifying an order on a contract."""
+    contract_key = (
+      tuple((leg.conId, leg.action, leg.ratio) for leg in contract.comboLegs)
+      if contract.secType == "BAG" and contract.comboLegs
+      else contract.conId
+    )
+    return (
+      contract_key,
+      order.action,
+      order.totalQuantity,
+      order.orderType,
+      order.lmtPrice,
+      order.tif,
+    )
+
+  @staticmethod
+  def _margin_value(value: str | float) -> float | None:
+    """Parse a what-if value, IB reports unknown values as UNSET_DOUBLE."""
+    try:
+      number = float(value)
+    except (TypeError, ValueError):
+      return None
+    if math.isnan(number) or number == UNSET_DOUBLE:
+      return None
+    return number
+
+  def _summarize_what_if(self, state: OrderState | None) -> dict:
+    """Summarize the margin and commission impact of a what-if order.
+
+    Args:
+      state: Order state returned by the what-if request, None if the
+        gateway rejected the order.
+
+    Returns:
+      Dictionary with the margin and commission impact and a blocked flag.
+
+    """
+    if state is None:
+      return {
+        "blocked": True,
+        "reason": "Order rejected by the gateway what-if check",
+      }
+
+    init_margin_after = self._margin_value(state.initMarginAfter)
+    equity_with_loan_after = self._margin_value(state.equityWithLoanAfter)
+    blocked = (
+      init_margin_after is not None
+      and equity_with_loan_after is not None
+      and equity_with_loan_after < init_margin_after
+    )
+    return {
+      "initMarginChange": self._margin_value(state.initMarginChange),
+      "maintMarginChange": self._margin_value(state.maintMarginChange),
+      "initMarginAfter": init_margin_after,
+      "equityWithLoanAfter": equity_with_loan_after,
+      "commission": self._margin_value(state.commission),
+      "minCommission": self._margin_value(state.minCommission),
+      "maxCommission": self._margin_value(state.maxCommission),
+      "commissionCurrency": state.commissionCurrency,
+      "warningText": state.warningText,
+      "blocked": blocked,
+      "reason": "Insufficient margin" if blocked else None,
+    }
+
+  async def _what_if(self, contract: Contract, order: Order) -> dict:
+    """Get the margin and commission impact of an order.
+
+    Results are cached for ``what_if_cache_ttl`` seconds, so a repeated
+    identical order does not trigger another what-if request.
+
+    Args:
+      contract: Contract object of the order.
+      order: Order object to check.
+
+    Returns:
+      Dictionary with the margin and commission impact, see
+      _summarize_what_if. Failed requests are reported as unavailable and
+      do not block the order.
+
+    """
+    key = self._order_key(contract, order)
+    cached = self._what_if_cache.get(key)
+    if cached and time.monotonic() - cached[0] < self.config.what_if_cache_ttl:
+      logger.debug("Using cached what-if result for {}", key)
+      CACHE_REQUESTS.labels(cache="what_if", result="hit").inc()
+      return cached[1]
+    CACHE_REQUESTS.labels(cache="what_if", result="miss").inc()
+
+    try:
+      state = await asyncio.wait_for(
+        self.ib.whatIfOrderAsync(contract, order),
+        timeout=self.config.timeout_seconds,
+      )
+    except Exception as e:
+      logger.warning("What-if check unavailable: {}", str(e))
+      return {"blocked": False, "reason": "What-if check unavailable"}
+
+    result = self._summarize_what_if(state)
+    self._what_if_cache[key] = (time.monotonic(), result)
+    return result
+
+  async def _execute_order(self, contract: Contract, spec: OrderSpec) -> str:
+    """Request approval for an order, place it and wait for confirmation.
 
     Args:
       contract: Contract object to place order for.
-      action: Action to place order for, supported actions are:
-        - BUY: Buy
-        - SELL: Sell
-      quantity: Quantity to place order for.
-      order_type: Order type to place order for, supported order types:
-        - market (MKT)
-        - limit (LMT)
-      price: Desired price to place order for.
+      spec: Parameters of the order.
 
     Returns:
       JSON string containing trade information or error message.
 
     """
-    timeout = 10
-    order_type = order_type.upper()
-
     try:
       # Create the order
-      order = Order(
-        action=action,
-        totalQuantity=quantity,
-        orderType=order_type,
-      )
-      if order_type == "LMT":
-        order.lmtPrice = price
+      order = self._create_order(spec)
 
-      # Request approval
+      # Request approval while the what-if check runs
       await self._ensure_bot_running()
       logger.debug("Requesting approval for order: {}", contract)
 
-      approved = await self.notification_bot.request_approval(
-        message={
-          "contract": await self._serialize_contract(contract),
-          "order": {
-            "action": order.action,
-            "totalQuantity": order.totalQuantity,
-            "orderType": order.orderType,
-            "lmtPrice": order.lmtPrice,
-          },
-        },
-      )
+      what_if = asyncio.create_task(self._what_if(contract, order))
+      message = await self._approval_message(contract, order)
+      with span("telegram.approval", orders=1):
+        approved = await self.notification_bot.request_approval(
+          message=message,
+          details=what_if,
+        )
+
+      if what_if.done() and what_if.result()["blocked"]:
+        logger.debug("Order blocked by what-if check, skipping")
+        return json.dumps({
+          "trade": None,
+          "error": f"Order blocked: {what_if.result()['reason']}",
+        })
 
       if not approved:
         logger.debug("Order not approved, skipping")
@@ -120,54 +385,85 @@ class TradingClient(IBClient):
           "error": "Order not approved",
         })
 
-      # Place the order
+      check = await what_if
+      if check["blocked"]:
+        logger.debug("Order blocked by what-if check, skipping")
+        return json.dumps({
+          "trade": None,
+          "error": f"Order blocked: {check['reason']}",
+        })
+    except Exception as e:
+      logger.error("Error placing order: {}", str(e))
+      return json.dumps({
+        "trade": None,
+        "error": str(e),
+      })
+    else:
+      return await self._place_order(contract, order, message["contract"])
+
+  async def _place_order(
+    self,
+    contract: Contract,
+    order: Order,
+    contract_info: dict | None = None,
+  ) -> str:
+    """Place an approved order and wait for confirmation.
+
+    Orders that are not filled within ``order_fill_timeout`` are handled by the
+    unfilled policy of their order type: "cancel" cancels the remainder,
+    "keep" leaves the order working and returns its current status.
+
+    Args:
+      contract: Contract object to place order for.
+      order: Approved order object.
+      contract_info: Serialized contract from the approval message, reused
+        in the result instead of serializing the contract again.
+
+    Returns:
+      JSON string containing trade information or error message.
+
+    """
+    try:
       logger.debug("Placing order: {}", order)
       trade = self.ib.placeOrder(contract, order)
+      self.order_journal.track(trade)
       logger.debug("Order placed: {}", trade)
-      filled = False
-
-      while timeout > 0 and not filled:
-        status = trade.orderStatus.status
-        if status == "Filled":
-          logger.debug("Order filled at {}", trade.orderStatus.avgFillPrice)
-          successful_trade = json.dumps({
-            "trade": {
-              "contract": await self._serialize_contract(trade.contract),
-              "order": {
-                "orderId": trade.order.orderId,
-                "action": trade.order.action,
-                "totalQuantity": trade.order.totalQuantity,
-                "orderType": trade.order.orderType,
-                "lmtPrice": trade.order.lmtPrice,
-              },
-              "orderStatus": {
-                "status": trade.orderStatus.status,
-                "filled": trade.orderStatus.filled,
-                "remaining": trade.orderStatus.remaining,
-                "avgFillPrice": trade.orderStatus.avgFillPrice,
-              },
-            },
-            "error": None,
-          })
-          await self.notification_bot.send_trade_confirmation(successful_trade)
-          return successful_trade
-        if status in ["Cancelled", "Error", "Inactive"]:
-          logger.debug("{} with status {}", trade.orderStatus.orderId, status)
-          return json.dumps({
-            "trade": None,
-            "error": f"Order {status.lower()}",
-          })
-
-        await asyncio.sleep(1)
-        timeout -= 1
-
-      if not filled:
-        logger.debug("{} not filled, cancelling", trade.order)
-        self.ib.cancelOrder(trade.order)
+
+      with contextlib.suppress(TimeoutError):
+        async with asyncio.timeout(self.config.order_fill_timeout):
+          await self._wait_for_completion(trade)
+      status = trade.orderStatus.status
+      if contract_info is None:
+        contract_info = await self._serialize_contract(trade.contract)
+
+      if status == "Filled":
+        logger.debug("Order filled at {}", trade.orderStatus.avgFillPrice)
+        successful_trade = json.dumps({
+          "trade": self._serialize_trade(trade, contract_info),
+          "error": None,
+        })
+        await self.notification_bot.send_trade_confirmation(successful_trade)
+        return successful_trade
+
+      if status in TERMINAL_STATES:
+        logger.debug("{} with status {}", trade.order.orderId, status)
+        return self._unfilled_result(trade, f"Order {status.lower()}")
+
+      policy = (
+        self.config.order_limit_unfilled_policy
+        if order.orderType == "LMT"
+        else self.config.order_market_unfilled_policy
+      )
+      if policy == "keep":
+        logger.debug("{} not filled yet, keeping it working", trade.order)
         return json.dumps({
-          "trade": None,
-          "error": "Order not filled",
+          "trade": self._serialize_trade(trade, contract_info),
+          "error": None,
         })
+
+      logger.debug("{} not filled, cancelling", trade.order)
+      self.ib.cancelOrder(trade.order)
+      return self._unfilled_result(trade, "Order not filled")
     except Exception as e:
       logger.error("Error placing order: {}", str(e))
       return json.dumps({
@@ -175,6 +471,28 @@ class TradingClient(IBClient):
         "error": str(e),
       })
 
+  def _unfilled_result(self, trade: Trade, error: str) -> str:
+    """Build the result of an order that did not fill completely.
+
+    Args:
+      trade: Trade object of the order.
+      error: Error message to report.
+
+    Returns:
+      JSON string containing the error message including any partial fill.
+
+    """
+    filled = trade.orderStatus.filled
+    if filled:
+      error = (
+        f"{error}, partially filled {filled:g} of {trade.order.totalQuantity:g} "
+        f"at {trade.orderStatus.avgFillPrice:.2f}"
+      )
+    return json.dumps({
+      "trade": None,
+      "error": error,
+    })
+
   async def _create_combo_contract(
     self,
     con_ids: list[int],
@@ -206,6 +524,7 @@ class TradingClient(IBClient):
       leg_contracts = [Contract(conId=con_id) for con_id in con_ids]
       await self.ib.qualifyContractsAsync(*leg_contracts)
       logger.debug("Leg contracts qualified: {}", leg_contracts)
+      self._leg_contracts.update({leg.conId: leg for leg in leg_contracts})
 
       # Create the combo contract
       combo_contract = Contract(
@@ -231,27 +550,13 @@ class TradingClient(IBClient):
     else:
       return combo_contract
 
-  async def trade_combo_contract(
-    self,
-    legs: dict[int, str],
-    action: str,
-    quantity: int,
-    order_type: str,
-    price: float | None = None,
-  ) -> str:
+  async def trade_combo_contract(self, legs: dict[int, str], spec: OrderSpec) -> str:
     """Trade a combo contract.
 
     Args:
       legs: Dictionary of conIds to trade combo contract for, with action as value.
         Example: {123456: "BUY", 123457: "SELL"}
-      action: Action to trade combo contract for, supported actions are:
-        - BUY: Buy
-        - SELL: Sell
-      quantity: Quantity to trade combo contract for.
-      order_type: Order type to trade combo contract for, supported order types:
-        - market (MKT)
-        - limit (LMT)
-      price: Price to trade combo contract for.
+      spec: Parameters of the order on the combo contract.
 
     Returns:
       JSON string containing trade information or error message.
@@ -268,13 +573,7 @@ class TradingClient(IBClient):
 
       # Open the order
       logger.debug("Placing order for combo contract: {}", contract)
-      result = await self._execute_order(
-        contract,
-        action,
-        quantity,
-        order_type,
-        price,
-      )
+      result = await self._execute_order(contract, spec)
     except Exception as e:
       logger.error("Error trading combo contract: {}", str(e))
       return json.dumps({
@@ -284,26 +583,12 @@ class TradingClient(IBClient):
     else:
       return result
 
-  async def trade_simple_contract(
-    self,
-    con_id: int,
-    action: str,
-    quantity: int,
-    order_type: str,
-    price: float | None = None,
-  ) -> str:
+  async def trade_simple_contract(self, con_id: int, spec: OrderSpec) -> str:
     """Trade a simple non-combo contract.
 
     Args:
       con_id: Contract ID to trade.
-      action: Action to trade, supported actions are:
-        - BUY: Buy
-        - SELL: Sell
-      quantity: Quantity to trade.
-      order_type: Order type to trade, supported order types:
-        - market (MKT)
-        - limit (LMT)
-      price: Price to trade.
+      spec: Parameters of the order.
 
     Returns:
       JSON string containing trade information or error message.
@@ -314,13 +599,7 @@ class TradingClient(IBClient):
       contract = Contract(conId=con_id)
       await self.ib.qualifyContractsAsync(contract)
       logger.debug("Placing order for contract: {}", contract)
-      result = await self._execute_order(
-        contract,
-        action,
-        quantity,
-        order_type,
-        price,
-      )
+      result = await self._execute_order(contract, spec)
     except Exception as e:
       logger.error("Error trading simple contract: {}", str(e))
       return json.dumps({
@@ -329,3 +608,181 @@ class TradingClient(IBClient):
       })
     else:
       return result
+
+  async def _qualify_batch_contracts(self, orders: list[dict]) -> list[Contract]:
+    """Qualify the contracts of a batch of orders concurrently.
+
+    Simple contracts are qualified in a single request, combo contracts are
+    created in parallel.
+
+    Args:
+      orders: List of order specifications, see trade_batch.
+
+    Returns:
+      List of contracts in the order of the specifications, None for orders
+      whose contract could not be qualified.
+
+    """
+    simple = [
+      Contract(conId=spec["con_id"]) for spec in orders if "legs" not in spec
+    ]
+    combos = [
+      self._create_combo_contract(
+        [int(con_id) for con_id in spec["legs"]],
+        list(spec["legs"].values()),
+      )
+      for spec in orders if "legs" in spec
+    ]
+    results = await asyncio.gather(
+      self.ib.qualifyContractsAsync(*simple),
+      *combos,
+      return_exceptions=True,
+    )
+
+    qualified = {
+      contract.conId
+      for contract in (results[0] if isinstance(results[0], list) else [])
+    }
+    simple_iter = iter(simple)
+    combo_iter = iter(results[1:])
+    contracts = []
+    for spec in orders:
+      if "legs" in spec:
+        combo = next(combo_iter)
+        contracts.append(None if isinstance(combo, Exception) else combo)
+      else:
+        contract = next(simple_iter)
+        contracts.append(contract if contract.conId in qualified else None)
+    return contracts
+
+  async def _check_batch(
+    self,
+    pending: list[tuple[int, Contract, Order]],
+    results: list[dict],
+  ) -> list[tuple[int, Contract, Order, dict]]:
+    """Run the what-if checks of a batch, rejecting the blocked orders.
+
+    Args:
+      pending: Index, contract and order of the orders to check.
+      results: Results of the batch, updated for the blocked orders.
+
+    Returns:
+      The orders that passed their check, with the check.
+
+    """
+    checks = await asyncio.gather(*[
+      self._what_if(contract, order) for _, contract, order in pending
+    ])
+    checked = []
+    for (index, contract, order), check in zip(pending, checks, strict=True):
+      if check["blocked"]:
+        results[index]["error"] = f"Order blocked: {check['reason']}"
+      else:
+        checked.append((index, contract, order, check))
+    return checked
+
+  async def _approve_batch(
+    self,
+    checked: list[tuple[int, Contract, Order, dict]],
+    results: list[dict],
+  ) -> list[tuple[int, Contract, Order, dict]]:
+    """Ask for the approval of the checked orders of a batch in one round.
+
+    Args:
+      checked: Index, contract, order and what-if check of the orders.
+      results: Results of the batch, updated for the rejected orders.
+
+    Returns:
+      Index, contract, order and serialized contract of the approved orders.
+
+    """
+    await self._ensure_bot_running()
+    messages = await asyncio.gather(*[
+      self._approval_message(contract, order) for _, contract, order, _ in checked
+    ])
+    for message, (*_, check) in zip(messages, checked, strict=True):
+      message["what_if"] = check
+    with span("telegram.approval", orders=len(messages)):
+      decisions = await self.notification_bot.request_batch_approval(messages)
+
+    approved = []
+    for (index, contract, order, _), message, decision in zip(
+      checked,
+      messages,
+      decisions,
+      strict=True,
+    ):
+      if decision:
+        approved.append((index, contract, order, message["contract"]))
+      else:
+        results[index]["error"] = "Order not approved"
+    return approved
+
+  async def trade_batch(self, orders: list[dict]) -> str:
+    """Trade a batch of orders with a single approval round.
+
+    All contracts are qualified and checked with what-if orders concurrently,
+    orders blocked by their check are rejected, the others are presented with
+    their margin and commission impact in one approval message with
+    per-order accept/reject, and the approved orders are placed and tracked
+    in parallel.
+
+    Args:
+      orders: List of order specifications, each a dictionary with:
+        - con_id: Contract ID for a simple contract, or
+        - legs: Dictionary of conIds to leg actions for a combo contract
+        - action: BUY or SELL
+        - quantity: Quantity to trade
+        - order_type: market (MKT) or limit (LMT)
+        - price: Limit price (optional)
+        - time_in_force: Time in force, e.g. DAY or GTC (optional)
+
+    Returns:
+      JSON string containing a result per order and an aggregate summary.
+
+    """
+    results: list[dict] = [{"trade": None, "error": None} for _ in orders]
+    try:
+      await self._connect()
+      contracts = await self._qualify_batch_contracts(orders)
+
+      pending = []
+      for index, (spec, contract) in enumerate(zip(orders, contracts, strict=True)):
+        if contract is None:
+          results[index]["error"] = "Contract could not be qualified"
+        else:
+          order = self._create_order(OrderSpec.from_dict(spec))
+          pending.append((index, contract, order))
+
+      checked = await self._check_batch(pending, results)
+      approved = await self._approve_batch(checked, results) if checked else []
+      placed = await asyncio.gather(*[
+        self._place_order(contract, order, contract_info)
+        for _, contract, order, contract_info in approved
+      ])
+      for (index, *_), result in zip(approved, placed, strict=True):
+        results[index] = json.loads(result)
+    except Exception as e:
+      logger.error("Error trading batch: {}", str(e))
+      return json.dumps({
+        "results": [],
+        "summary": None,
+        "error": str(e),
+      })
+    else:
+      statuses = [
+        (result["trade"] or {}).get("orderStatus", {}).get("status")
+        for result in results
+      ]
+      return json.dumps({
+        "results": results,
+        "summary": {
+          "orders": len(orders),
+          "filled": statuses.count("Filled"),
+          "working": sum(
+            1 for status in statuses if status and status != "Filled"
+          ),
+          "failed": sum(1 for result in results if result["error"]),
+        },
+        "error": None,
+      })
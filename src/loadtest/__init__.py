@@ -0,0 +1,5 @@
+"""Load test and offline replay of prompt executions.
+
+The load test runs against stubbed model, FMP and IB services, the replay
+against the responses recorded by an execution.
+"""
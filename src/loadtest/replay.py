@@ -0,0 +1,248 @@
+"""Offline replay of recorded executions, for profiling and regression benchmarks.
+
+The recorded query runs through ``MCPClient`` like in production, with the
+model and the MCP server replaced by the responses of the recording. Every
+response is delayed by its recorded duration times ``time_scale``: 1
+reproduces the timing of the execution, 0 measures the client pipeline alone.
+"""
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import Message
+from mcp.types import CallToolResult, ListToolsResult
+from rich.console import Console
+from rich.table import Table
+
+from mcp_client import BudgetExceededError, MCPClient, QueryBudget
+from src.loadtest.runner import percentiles
+from src.utilities.recording import load_recording
+from src.utilities.settings import Settings
+
+
+class ReplayMismatchError(Exception):
+  """Raised when a replayed query diverges from its recording."""
+
+
+class ReplayToolError(Exception):
+  """Raised by a replayed tool call that failed when recorded."""
+
+
+class _ReplayStream:
+  """Message stream answering with a recorded message."""
+
+  def __init__(self, message: Message, delay: float) -> None:
+    self.message = message
+    self.delay = delay
+
+  async def __aenter__(self) -> "_ReplayStream":
+    await asyncio.sleep(self.delay)
+    return self
+
+  async def __aexit__(self, *exc_info: object) -> None:
+    return None
+
+  @property
+  async def text_stream(self) -> AsyncIterator[str]:
+    """Yield the text blocks of the message."""
+    for content in self.message.content:
+      if content.type == "text":
+        yield content.text
+
+  async def get_final_message(self) -> Message:
+    """Get the recorded message."""
+    return self.message
+
+
+class ReplayModel:
+  """Stands in for the Anthropic client, answering with the recorded model responses.
+
+  Available public methods:
+    - stream: answer the next model call, as ``messages.stream``
+  """
+
+  def __init__(self, events: list[dict[str, Any]], time_scale: float) -> None:
+    """Initialize the model.
+
+    Args:
+      events: Events of the recording.
+      time_scale: Factor of the recorded durations waited before answering.
+
+    """
+    self.messages = self
+    self.time_scale = time_scale
+    self._responses = deque(event for event in events if event["kind"] == "llm")
+
+  def stream(self, **_kwargs: object) -> _ReplayStream:
+    """Answer the next model call with the next recorded response."""
+    if not self._responses:
+      msg = "The query made more model calls than recorded"
+      raise ReplayMismatchError(msg)
+    event = self._responses.popleft()
+    return _ReplayStream(
+      Message.model_validate(event["response"]), event["duration"] * self.time_scale,
+    )
+
+
+class ReplaySession:
+  """Stands in for the MCP client session, answering with the recorded tool results.
+
+  Calls are matched to the first unused recorded call of the same tool with
+  the same arguments. Unmatched calls are kept in ``mismatches``, the client
+  reports tool errors to the model instead of raising them.
+
+  Available public methods:
+    - list_tools: list the tools, none are needed by the replayed model
+    - call_tool: answer a tool call with its recorded result
+  """
+
+  def __init__(self, events: list[dict[str, Any]], time_scale: float) -> None:
+    """Initialize the session.
+
+    Args:
+      events: Events of the recording.
+      time_scale: Factor of the recorded durations waited before answering.
+
+    """
+    self.time_scale = time_scale
+    self.mismatches: list[str] = []
+    self._calls = [event for event in events if event["kind"] == "tool"]
+
+  async def list_tools(self) -> ListToolsResult:
+    """List the tools."""
+    return ListToolsResult(tools=[])
+
+  async def call_tool(
+    self, name: str, arguments: dict[str, Any] | None = None,
+  ) -> CallToolResult:
+    """Answer a tool call with its recorded result."""
+    index = next((
+      index for index, event in enumerate(self._calls)
+      if event["tool"] == name and event["arguments"] == (arguments or {})
+    ), None)
+    if index is None:
+      msg = f"No recorded call of {name} with {arguments}"
+      self.mismatches.append(msg)
+      raise ReplayMismatchError(msg)
+
+    event = self._calls.pop(index)
+    await asyncio.sleep(event["duration"] * self.time_scale)
+    if "error" in event:
+      raise ReplayToolError(event["error"])
+    return CallToolResult.model_validate(event["result"])
+
+
+def _stage(event: dict[str, Any]) -> str:
+  """Get the stage name of a recorded event."""
+  if event["kind"] == "tool":
+    return f"tool {event['tool']}"
+  if event["kind"] == "ib":
+    return f"ib {event['request']}"
+  if event["kind"] == "http":
+    return f"http {event['method']} {event['url']}"
+  return event["kind"]
+
+
+async def replay(
+  path: str | Path, time_scale: float, settings: Settings,
+) -> dict[str, Any]:
+  """Replay a recorded execution offline.
+
+  Args:
+    path: Recording archive.
+    time_scale: Factor of the recorded durations, 0 to answer immediately.
+    settings: Application settings.
+
+  Returns:
+    Report with the recorded and replayed durations, whether the replayed
+    result matches the recorded one and the recorded duration percentiles of
+    every stage in seconds.
+
+  Raises:
+    ReplayMismatchError: The replayed query diverged from its recording.
+
+  """
+  events = load_recording(path)
+  query = next((event for event in events if event["kind"] == "query"), None)
+  if query is None:
+    msg = f"{path} has no recorded query"
+    raise ValueError(msg)
+  recorded_result = next((event for event in events if event["kind"] == "result"), None)
+
+  budget = QueryBudget(**query["budget"])
+  if budget.max_seconds is not None:
+    budget.max_seconds = budget.max_seconds * time_scale if time_scale > 0 else None
+  session = ReplaySession(events, time_scale)
+  client = MCPClient(settings)
+  client.anthropic = ReplayModel(events, time_scale)
+  client.session = session
+
+  started = time.monotonic()
+  try:
+    result = await client.process_query(query["query"], budget)
+  except BudgetExceededError as e:
+    result = e.partial_result
+  elapsed = time.monotonic() - started
+  if session.mismatches:
+    raise ReplayMismatchError(session.mismatches[0])
+
+  durations: dict[str, list[float]] = {}
+  for event in events:
+    if "duration" in event:
+      durations.setdefault(_stage(event), []).append(event["duration"])
+  return {
+    "query": query["query"],
+    "model": query["model"],
+    "recorded_elapsed": (
+      recorded_result["start"] if recorded_result else events[-1]["start"]
+    ),
+    "elapsed": elapsed,
+    "time_scale": time_scale,
+    "result": result,
+    "matches": recorded_result is not None and result == recorded_result["result"],
+    "usage": client.usage,
+    "stages": {
+      name: {**percentiles(values), "total": sum(values)}
+      for name, values in sorted(durations.items())
+    },
+  }
+
+
+async def recording_path(recording: str) -> Path:
+  """Get the archive of a recording, given as a path or an execution ID."""
+  if not recording.isdigit():
+    return Path(recording)
+
+  from src.web.database import DBScheduleExecution, async_session
+
+  async with async_session() as db:
+    execution = await db.get(DBScheduleExecution, int(recording))
+  if execution is None or not execution.recording:
+    msg = f"Execution {recording} has no recording"
+    raise ValueError(msg)
+  return Path(execution.recording)
+
+
+def print_replay_report(report: dict[str, Any]) -> None:
+  """Print a replay report."""
+  console = Console()
+  console.print(
+    f"Replayed {report['model']} query in {report['elapsed']:.3f}s "
+    f"at time scale {report['time_scale']}, "
+    f"recorded in {report['recorded_elapsed']:.3f}s, "
+    f"result {'matches' if report['matches'] else 'differs from'} the recording",
+  )
+
+  table = Table(title="Recorded duration per stage (seconds)")
+  for column in ("Stage", "Count", "Total", "p50", "p95", "Max"):
+    table.add_column(column, justify="left" if column == "Stage" else "right")
+  for stage, values in report["stages"].items():
+    table.add_row(
+      stage,
+      str(values["count"]),
+      *(f"{values[key]:.3f}" for key in ("total", "p50", "p95", "max")),
+    )
+  console.print(table)
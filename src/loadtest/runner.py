@@ -0,0 +1,358 @@
+"""End-to-end load test of the scheduler, executions and MCP servers.
+
+Prompts are scheduled, queued and executed like in production, against a
+scripted model and FMP stub served by this process and the simulated IB
+gateway in the MCP servers, so the measured costs are the ones of this box.
+"""
+import asyncio
+import os
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import uvicorn
+from apscheduler.triggers.date import DateTrigger
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.loadtest.stub_server import create_stub_app
+from src.utilities.settings import Settings
+
+# Connections of this database, and the ones waiting for a lock
+CONTENTION_QUERY = text("""
+  SELECT count(*) AS connections,
+         count(*) FILTER (WHERE wait_event_type = 'Lock') AS lock_waits
+  FROM pg_stat_activity
+  WHERE datname = current_database()
+""")
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+  """Get the p50, p95, p99 and maximum of values."""
+  if not values:
+    return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+  ordered = sorted(values)
+
+  def rank(q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+  return {
+    "count": len(ordered),
+    "p50": rank(0.5),
+    "p95": rank(0.95),
+    "p99": rank(0.99),
+    "max": ordered[-1],
+  }
+
+
+class ResourceSampler:
+  """Sample the memory of the MCP servers and the database contention.
+
+  Available public methods:
+    - start: start sampling
+    - stop: stop sampling
+    - report: get the peaks of the samples
+  """
+
+  def __init__(self, engine: AsyncEngine, server_script: str, interval: float) -> None:
+    """Initialize the sampler.
+
+    Args:
+      engine: Database engine of the executions.
+      server_script: Script of the MCP server processes started by this process.
+      interval: Seconds between samples.
+
+    """
+    self.engine = engine
+    self.server_name = Path(server_script).name
+    self.interval = interval
+    self.peak_rss: dict[int, int] = {}
+    self.max_connections = 0
+    self.max_lock_waits = 0
+    self.max_pool_checked_out = 0
+    self._task: asyncio.Task | None = None
+
+  def start(self) -> None:
+    """Start sampling."""
+    self._task = asyncio.create_task(self._run(), name="loadtest-sampler")
+
+  async def stop(self) -> None:
+    """Stop sampling."""
+    if self._task is not None:
+      self._task.cancel()
+      await asyncio.gather(self._task, return_exceptions=True)
+
+  def report(self) -> dict:
+    """Get the peaks of the samples, memory in MB."""
+    return {
+      "mcp_servers": len(self.peak_rss),
+      "mcp_server_rss_mb": percentiles([rss / 1024 for rss in self.peak_rss.values()]),
+      "max_connections": self.max_connections,
+      "max_lock_waits": self.max_lock_waits,
+      "max_pool_checked_out": self.max_pool_checked_out,
+    }
+
+  async def _run(self) -> None:
+    """Sample until stopped."""
+    while True:
+      self._sample_memory()
+      try:
+        await self._sample_database()
+      except Exception as e:
+        logger.debug("Error sampling database contention: {}", str(e))
+      await asyncio.sleep(self.interval)
+
+  def _sample_memory(self) -> None:
+    """Record the resident memory of the MCP server child processes, in kB."""
+    parent = str(os.getpid())
+    for proc in Path("/proc").iterdir():
+      if not proc.name.isdigit():
+        continue
+      try:
+        # The parent PID follows the parenthesized command name
+        if (proc / "stat").read_text().rsplit(")", 1)[1].split()[1] != parent:
+          continue
+        if self.server_name not in (proc / "cmdline").read_text():
+          continue
+        status = (proc / "status").read_text()
+      except (OSError, IndexError):
+        continue
+      for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+          rss = int(line.split()[1])
+          self.peak_rss[int(proc.name)] = max(self.peak_rss.get(int(proc.name), 0), rss)
+
+  async def _sample_database(self) -> None:
+    """Record the connections, lock waits and pool usage of the database."""
+    self.max_pool_checked_out = max(
+      self.max_pool_checked_out, self.engine.sync_engine.pool.checkedout(),
+    )
+    async with self.engine.connect() as connection:
+      row = (await connection.execute(CONTENTION_QUERY)).one()
+    self.max_connections = max(self.max_connections, row.connections)
+    self.max_lock_waits = max(self.max_lock_waits, row.lock_waits)
+
+
+class _StubServer(uvicorn.Server):
+  """Uvicorn server signalling when it accepts connections."""
+
+  def __init__(self, config: uvicorn.Config) -> None:
+    super().__init__(config)
+    self.ready = asyncio.Event()
+
+  async def startup(self, sockets: list | None = None) -> None:
+    """Start listening and signal readiness."""
+    await super().startup(sockets)
+    if not self.should_exit:
+      self.ready.set()
+
+
+class LoadTest:
+  """Fire scheduled prompt executions at a fixed rate and measure them.
+
+  Available public methods:
+    - run: run the load test and get its report
+  """
+
+  def __init__(self, count: int, rate: float, settings: Settings) -> None:
+    """Initialize the load test.
+
+    Args:
+      count: Number of executions to schedule.
+      rate: Executions scheduled per second.
+      settings: Application settings.
+
+    """
+    self.count = count
+    self.rate = rate
+    self.settings = settings
+    self.prompt_id: int | None = None
+    self.lag: list[float] = []
+    self.queue_wait: list[float] = []
+    self.latency: list[float] = []
+    self.statuses: dict[str, int] = {}
+    self._done = asyncio.Event()
+
+  def _stub_environment(self) -> None:
+    """Point the model, FMP and IB clients of all processes at the stubs."""
+    url = f"http://127.0.0.1:{self.settings.loadtest_port}"
+    os.environ["ANTHROPIC_BASE_URL"] = url
+    os.environ["FMP_BASE_URL"] = f"{url}/fmp"
+    os.environ["IB_SIMULATED"] = "true"
+    # A shared MCP server would bypass the stubs, each execution starts its own
+    os.environ.pop("MCP_SERVER_URL", None)
+    # Each run starts fresh, the caches would skip the measured work
+    os.environ["RESPONSE_CACHE_TTL"] = "0"
+
+  def _finish(self, status: str) -> None:
+    """Count a finished execution."""
+    self.statuses[status] = self.statuses.get(status, 0) + 1
+    if sum(self.statuses.values()) == self.count:
+      self._done.set()
+
+  async def _start_stub(self) -> tuple[_StubServer, asyncio.Task]:
+    """Serve the model and FMP stubs until the returned task is stopped.
+
+    Raises:
+      RuntimeError: If the stub server stopped before accepting connections.
+
+    """
+    stub = _StubServer(uvicorn.Config(
+      create_stub_app(self.settings.loadtest_model_latency),
+      host="127.0.0.1",
+      port=self.settings.loadtest_port,
+      log_level="warning",
+    ))
+    stub_task = asyncio.create_task(stub.serve())
+    ready_task = asyncio.create_task(stub.ready.wait())
+    await asyncio.wait({stub_task, ready_task}, return_when=asyncio.FIRST_COMPLETED)
+    if not stub.ready.is_set():
+      ready_task.cancel()
+      msg = f"Stub server failed to start on port {self.settings.loadtest_port}"
+      raise RuntimeError(msg)
+    return stub, stub_task
+
+  async def _remove_executions(self) -> list:
+    """Remove the load test prompt and get the status and trace of its executions."""
+    from src.web.database import DBPrompt, DBScheduleExecution, async_session
+
+    async with async_session() as db:
+      of_prompt = DBScheduleExecution.prompt_id == self.prompt_id
+      executions = (await db.execute(
+        select(DBScheduleExecution.status, DBScheduleExecution.trace_id)
+        .where(of_prompt),
+      )).all()
+      # The load test leaves no prompt or executions behind
+      await db.execute(delete(DBScheduleExecution).where(of_prompt))
+      await db.execute(delete(DBPrompt).where(DBPrompt.id == self.prompt_id))
+      await db.commit()
+    return executions
+
+  async def run(self) -> dict:
+    """Run the load test.
+
+    Returns:
+      Report with the throughput, the latency percentiles of every stage in
+      seconds, the MCP server memory and the database contention.
+
+    """
+    self._stub_environment()
+    # Imported once the environment is set, these modules read the settings
+    from src.utilities.tracing import setup_tracing
+    from src.web.database import DBPrompt, async_session, engine, init_db
+    from src.web.execution_queue import PRIORITY_RECURRING
+    from src.web.executions import execute_prompt_sync
+    from src.web.scheduler import execution_queue, scheduler
+
+    setup_tracing("loadtest")
+    stub, stub_task = await self._start_stub()
+
+    await init_db()
+    async with async_session() as db:
+      prompt = DBPrompt(content=f"Load test {datetime.now(UTC):%Y-%m-%d %H:%M:%S}")
+      db.add(prompt)
+      await db.commit()
+      self.prompt_id = prompt.id
+
+    async def execute(queued_at: float) -> None:
+      started = time.monotonic()
+      self.queue_wait.append(started - queued_at)
+      try:
+        await execute_prompt_sync(self.prompt_id)
+      finally:
+        self.latency.append(time.monotonic() - queued_at)
+        self._finish("finished")
+
+    def fire(run_time: datetime) -> None:
+      self.lag.append((datetime.now(UTC) - run_time).total_seconds())
+      if not execution_queue.submit(PRIORITY_RECURRING, execute, time.monotonic()):
+        self._finish("rejected")
+
+    sampler = ResourceSampler(engine, self.settings.mcp_server_script, interval=0.5)
+    sampler.start()
+    execution_queue.start()
+    scheduler.start()
+    started = time.monotonic()
+    first_run = datetime.now(UTC) + timedelta(seconds=1)
+    for index in range(self.count):
+      run_time = first_run + timedelta(seconds=index / self.rate)
+      scheduler.add_job(
+        fire, DateTrigger(run_date=run_time), args=[run_time], misfire_grace_time=None,
+      )
+
+    try:
+      await self._done.wait()
+      elapsed = time.monotonic() - started - 1
+    finally:
+      scheduler.shutdown(wait=False)
+      await execution_queue.stop()
+      await sampler.stop()
+      stub.should_exit = True
+      await stub_task
+
+    executions = await self._remove_executions()
+    statuses = {}
+    for execution in executions:
+      statuses[execution.status] = statuses.get(execution.status, 0) + 1
+    return {
+      "count": self.count,
+      "rate": self.rate,
+      "elapsed": elapsed,
+      "throughput": statuses.get("success", 0) / elapsed if elapsed > 0 else 0.0,
+      "statuses": {**statuses, "rejected": self.statuses.get("rejected", 0)},
+      "stages": {
+        "scheduler lag": percentiles(self.lag),
+        "queue wait": percentiles(self.queue_wait),
+        "end to end": percentiles(self.latency),
+        **self._span_stages(
+          [execution.trace_id for execution in executions if execution.trace_id],
+        ),
+      },
+      **sampler.report(),
+    }
+
+  @staticmethod
+  def _span_stages(trace_ids: list[str]) -> dict[str, dict[str, float]]:
+    """Get the duration percentiles of the spans of the traced executions."""
+    from src.utilities.tracing import read_trace
+
+    durations: dict[str, list[float]] = {}
+    for trace_id in trace_ids:
+      for span in read_trace(trace_id):
+        durations.setdefault(span["name"], []).append(span["duration_ms"] / 1000)
+    return {name: percentiles(values) for name, values in sorted(durations.items())}
+
+
+def print_report(report: dict) -> None:
+  """Print a load test report."""
+  console = Console()
+  console.print(
+    f"{report['count']} executions at {report['rate']}/s in {report['elapsed']:.1f}s, "
+    f"throughput {report['throughput']:.2f} successful executions/s, "
+    f"{report['statuses']}",
+  )
+
+  table = Table(title="Latency per stage (seconds)")
+  for column in ("Stage", "Count", "p50", "p95", "p99", "Max"):
+    table.add_column(column, justify="left" if column == "Stage" else "right")
+  for stage, values in report["stages"].items():
+    table.add_row(
+      stage,
+      str(values["count"]),
+      *(f"{values[key]:.3f}" for key in ("p50", "p95", "p99", "max")),
+    )
+  console.print(table)
+
+  rss = report["mcp_server_rss_mb"]
+  console.print(
+    f"MCP servers: {report['mcp_servers']} processes, peak memory "
+    f"p50 {rss['p50']:.0f} MB, max {rss['max']:.0f} MB",
+  )
+  console.print(
+    f"Database: up to {report['max_connections']} connections, "
+    f"{report['max_lock_waits']} waiting for locks, "
+    f"{report['max_pool_checked_out']} pooled connections checked out",
+  )
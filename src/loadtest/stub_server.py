@@ -0,0 +1,142 @@
+"""Scripted stand-ins for the Anthropic and FMP APIs, used by load tests."""
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Tool calls of every load test query, in order, followed by a final answer
+SCRIPT = [
+  ("calendar_current_datetime", {}),
+  ("calendar_get_calendar", {"num_days": 5}),
+  ("fmp_get_stock_quote", {"symbol": "SPY"}),
+  ("fmp_get_events", {"from_date": "2026-01-05", "to_date": "2026-01-09"}),
+  ("ibkr_get_options_chain", {
+    "underlying_symbol": "SPX",
+    "underlying_sec_type": "IND",
+    "underlying_con_id": 416904,
+    "filters": {"expirations": ["20260107"], "rights": ["C"]},
+  }),
+  ("ibkr_get_positions", {}),
+]
+FINAL_ANSWER = "Load test run complete, no trades needed."
+
+
+def _sse(event: dict) -> str:
+  """Format a message stream event."""
+  return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _step(body: dict) -> int:
+  """Get the position in the script from the tool results sent so far."""
+  return sum(
+    1
+    for message in body["messages"]
+    if isinstance(message["content"], list)
+    for block in message["content"]
+    if block.get("type") == "tool_result"
+  )
+
+
+def _content(step: int) -> list[dict]:
+  """Get the content blocks answering a script step."""
+  if step >= len(SCRIPT):
+    return [{"type": "text", "text": FINAL_ANSWER}]
+  name, arguments = SCRIPT[step]
+  return [
+    {"type": "text", "text": f"Step {step + 1}: calling {name}."},
+    {"type": "tool_use", "id": f"toolu_{step:04d}", "name": name, "input": arguments},
+  ]
+
+
+def create_stub_app(model_latency: float) -> FastAPI:
+  """Create the stub API server.
+
+  The model answers every request after ``model_latency`` seconds with the
+  next tool call of the script, counting the tool results of the request,
+  and reports about 4 characters of the request per input token.
+
+  Args:
+    model_latency: Seconds every model response takes.
+
+  """
+  app = FastAPI()
+
+  @app.post("/v1/messages", response_model=None)
+  async def create_message(request: Request) -> StreamingResponse | JSONResponse:
+    raw = await request.body()
+    body = json.loads(raw)
+    content = _content(_step(body))
+    stop_reason = "tool_use" if content[-1]["type"] == "tool_use" else "end_turn"
+    usage = {"input_tokens": len(raw) // 4, "output_tokens": 20 * len(content)}
+    await asyncio.sleep(model_latency)
+
+    message = {
+      "id": "msg_loadtest",
+      "type": "message",
+      "role": "assistant",
+      "model": body["model"],
+      "content": content,
+      "stop_reason": stop_reason,
+      "stop_sequence": None,
+      "usage": usage,
+    }
+    if not body.get("stream"):
+      return JSONResponse(message)
+
+    async def events() -> AsyncIterator[str]:
+      yield _sse({
+        "type": "message_start",
+        "message": {
+          **message,
+          "content": [],
+          "stop_reason": None,
+          "usage": {**usage, "output_tokens": 1},
+        },
+      })
+      for index, block in enumerate(content):
+        # Blocks start empty and are completed by a single delta
+        if block["type"] == "text":
+          start = {"type": "text", "text": ""}
+          delta = {"type": "text_delta", "text": block["text"]}
+        else:
+          start = {**block, "input": {}}
+          delta = {
+            "type": "input_json_delta", "partial_json": json.dumps(block["input"]),
+          }
+        yield _sse({
+          "type": "content_block_start", "index": index, "content_block": start,
+        })
+        yield _sse({"type": "content_block_delta", "index": index, "delta": delta})
+        yield _sse({"type": "content_block_stop", "index": index})
+      yield _sse({
+        "type": "message_delta",
+        "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+        "usage": {"output_tokens": usage["output_tokens"]},
+      })
+      yield _sse({"type": "message_stop"})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+  @app.get("/fmp/quote/{symbol}")
+  async def quote(symbol: str) -> list[dict]:
+    return [{
+      "symbol": symbol, "price": 500.0, "open": 498.0, "high": 502.0, "low": 497.0,
+    }]
+
+  @app.get("/fmp/economic_calendar")
+  async def economic_calendar() -> list[dict]:
+    today = datetime.now(UTC).date().isoformat()
+    return [
+      {
+        "date": f"{today} 12:30:00", "event": "CPI", "impact": "High", "country": "US",
+      },
+      {
+        "date": f"{today} 14:00:00", "event": "Fed Minutes", "impact": "Medium",
+        "country": "US",
+      },
+    ]
+
+  return app
@@ -7,6 +7,7 @@ import exchange_calendars as xcals
 from datetime import datetime
 from fastmcp import FastMCP
 
+from src.mcp_servers.memoize import memoize, until_end_of_day
 from src.utilities import setup_logging, Settings
 
 setup_logging()
@@ -25,6 +26,7 @@ async def get_current_datetime() -> str:
   return datetime.now(pytz.timezone(server_timezone)).strftime("%Y-%m-%d %H:%M:%S")
 
 @calendar.tool(name="get_calendar")
+@memoize(ttl=until_end_of_day)
 async def get_calendar(num_days: int = 5) -> str:
   """Get the calendar for the exchange for the next num_days days.
 
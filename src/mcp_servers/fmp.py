@@ -6,6 +6,7 @@ import json
 from src.utilities import setup_logging
 from src.fmp_helpers.fmp_quotes_helper import FMPQuoteFetcher
 from src.fmp_helpers.fmp_events_helper import FMPEventsFetcher
+from src.mcp_servers.memoize import memoize
 
 setup_logging()
 
@@ -74,6 +75,7 @@ async def get_stock_quotes_batch(symbols: list[str]) -> str:
 
 
 @fmp.tool(name="get_events")
+@memoize(ttl=900)
 async def get_events(from_date: str, to_date: str) -> str:
   """Get economic events for a given date range in the server's timezone.
 
@@ -1,8 +1,10 @@
 """Contract and options-related tools."""
 from loguru import logger
 from src.mcp_servers.ibkr import ibkr, ib_interface
+from src.mcp_servers.memoize import memoize, until_end_of_day
 
 @ibkr.tool(name="get_contract_details")
+@memoize(ttl=until_end_of_day)
 async def get_contract_details(
   symbol: str,
   sec_type: str,
@@ -53,6 +55,7 @@ async def get_contract_details(
     return f"The contract details for the symbol are: {details}"
 
 @ibkr.tool(name="get_options_chain")
+@memoize(ttl=until_end_of_day)
 async def get_options_chain(
   underlying_symbol: str,
   underlying_sec_type: str,
@@ -6,12 +6,18 @@ from src.mcp_servers.ibkr import ibkr, ib_interface
 async def get_positions() -> str:
   """Get positions for all accounts.
 
+  Positions are served from a live position book, each position includes its
+  PnL, the age of the last update in seconds and a stale flag.
+
   Returns:
     str: A formatted string containing the positions for the accounts.
 
   Example:
     >>> await get_positions()
-    "Current Positions: {'AAPL': 100, 'MSFT': 200}"
+    "Current Positions: [{'contract': 'AAPL', 'position': 100, 'avgCost': 150.2,
+      'contractId': 265598, 'dailyPnL': 12.0, 'unrealizedPnL': 310.5,
+      'realizedPnL': 0.0, 'marketValue': 15330.5, 'ageSeconds': 2.1,
+      'stale': False}]"
 
   """
   logger.debug("Tool get_positions called")
@@ -1,8 +1,15 @@
 """Scanner-related tools."""
 from loguru import logger
+from src.ib_helper.scanners import ScanSpec
 from src.mcp_servers.ibkr import ibkr, ib_interface
+from src.mcp_servers.memoize import memoize
+from src.mcp_servers.sessions import sessions
+from src.utilities import Settings
+
+settings = Settings()
 
 @ibkr.tool(name="get_scanner_instrument_codes")
+@memoize(ttl=settings.scanner_params_max_age)
 async def get_scanner_instrument_codes() -> str:
   """Get scanner instrument codes from Interactive Brokers TWS.
 
@@ -27,6 +34,7 @@ async def get_scanner_instrument_codes() -> str:
     return f"The scanner instrument codes are: {tags}"
 
 @ibkr.tool(name="get_scanner_location_codes")
+@memoize(ttl=settings.scanner_params_max_age)
 async def get_scanner_location_codes() -> str:
   """Get scanner location codes from Interactive Brokers TWS.
 
@@ -51,6 +59,7 @@ async def get_scanner_location_codes() -> str:
     return f"The scanner location codes are: {tags}"
 
 @ibkr.tool(name="get_scanner_filter_codes")
+@memoize(ttl=settings.scanner_params_max_age)
 async def get_scanner_filter_codes() -> str:
   """Get scanner filter codes from Interactive Brokers TWS.
 
@@ -74,22 +83,74 @@ async def get_scanner_filter_codes() -> str:
   else:
     return f"The scanner filter codes are: {tags}"
 
+@ibkr.tool(name="search_scanner_codes")
+@memoize(ttl=settings.scanner_params_max_age)
+async def search_scanner_codes(
+  kind: str,
+  query: str = "",
+  instrument_code: str | None = None,
+) -> str:
+  """Search scanner codes by substring instead of listing all of them.
+
+  Args:
+    kind (str): Kind of code to search: 'instrument', 'location', 'filter'
+      or 'scan_code'
+    query (str): Case-insensitive substring of the code or its display name,
+      e.g. 'gain', 'volume', 'price'
+    instrument_code (str | None): Only return codes usable with this
+      instrument, e.g. 'STK'
+
+  Returns:
+    str: A formatted string containing the matching codes and display names
+
+  Example:
+      >>> await search_scanner_codes(
+      ...     kind="filter", query="price", instrument_code="STK"
+      ... )
+      "The matching scanner filter codes are: [{'code': 'priceAbove',
+        'name': 'Price Above'}, {'code': 'priceBelow', 'name': 'Price Below'}]"
+
+  """
+  logger.debug(
+    "Tool search_scanner_codes called with parameters: {!s}, {!s}, {!s}",
+    kind,
+    query,
+    instrument_code,
+  )
+  try:
+    matches = await ib_interface.search_scanner_codes(kind, query, instrument_code)
+    logger.debug("Matching scanner codes: {!s}", matches)
+  except Exception as e:
+    logger.error("Error in search_scanner_codes: {!s}", str(e))
+    return "Error searching scanner codes"
+  else:
+    return f"The matching scanner {kind} codes are: {matches}"
+
 @ibkr.tool(name="get_scanner_results")
 async def get_scanner_results(
   instrument_code: str,
   location_code: str,
   filter_codes: list[str],
+  *,
+  with_market_data: bool = False,
+  with_implied_vol: bool = False,
 ) -> str:
   """Get scanner results from Interactive Brokers TWS.
 
   This function queries the IB TWS scanner with specified parameters to find
-  instruments matching the given criteria.
+  instruments matching the given criteria. With market data, every row also
+  has its conId, price, change and volume, so there is no need to call
+  get_contract_details or get_tickers for the results.
 
   Args:
     instrument_code (str): Type of instrument to scan for (e.g., 'STK', 'FUT', 'OPT')
     location_code (str): Geographic location/market code (e.g., 'STK.US', 'STK.EU')
     filter_codes (list[str]): List of filter parameters in 'parameter=value' format,
       e.g. ['priceAbove=10', 'marketCapAbove=1000000000']
+    with_market_data (bool): Return a table with conId, price, change in percent
+      and volume instead of bare symbols
+    with_implied_vol (bool): Also return the implied volatility, slower, implies
+      with_market_data
 
   Returns:
     str: A formatted string containing the scanner results or error message
@@ -104,20 +165,165 @@ async def get_scanner_results(
 
   """
   logger.debug(
-    "Tool get_scanner_results called with parameters: {!s}, {!s}, {!s}",
+    "Tool get_scanner_results called with parameters: {!s}, {!s}, {!s}, {!s}, {!s}",
     instrument_code,
     location_code,
     filter_codes,
+    with_market_data,
+    with_implied_vol,
   )
   try:
-    results = await ib_interface.get_scanner_results(
-      instrument_code,
-      location_code,
-      filter_codes,
-    )
+    if with_market_data or with_implied_vol:
+      results = await ib_interface.get_scanner_market_data(
+        ScanSpec(instrument_code, location_code, filter_codes),
+        implied_vol=with_implied_vol,
+      )
+    else:
+      results = await ib_interface.get_scanner_results(
+        instrument_code,
+        location_code,
+        filter_codes,
+      )
     logger.debug("Scanner results: {!s}", results)
   except Exception as e:
     logger.error("Error in get_scanner_results: {!s}", str(e))
     return "Error getting scanner results"
   else:
     return f"I found {len(results)} stocks matching the scanner parameters: {results}"
+
+@ibkr.tool(name="get_scanner_updates")
+async def get_scanner_updates(
+  name: str,
+  instrument_code: str,
+  location_code: str,
+  filter_codes: list[str],
+  scan_code: str = "TOP_PERC_GAIN",
+) -> str:
+  """Get what changed in a named, continuously running scanner since the last call.
+
+  The first call starts the scan and reports every row as added. Later calls
+  with the same name only report rows that were added, removed or re-ranked.
+  Use this instead of get_scanner_results to watch the same scan repeatedly.
+
+  Args:
+    name (str): Name identifying the scan across calls, e.g. 'us_top_gainers'
+    instrument_code (str): Type of instrument to scan for (e.g., 'STK', 'FUT', 'OPT')
+    location_code (str): Geographic location/market code (e.g., 'STK.US', 'STK.EU')
+    filter_codes (list[str]): List of filter parameters in 'parameter=value' format,
+      e.g. ['priceAbove=10', 'marketCapAbove=1000000000']
+    scan_code (str): Scan code to run, e.g. 'TOP_PERC_GAIN', 'HOT_BY_VOLUME'
+
+  Returns:
+    str: A formatted string containing the scanner changes or error message
+
+  Example:
+      >>> await get_scanner_updates(
+      ...     name='us_top_gainers',
+      ...     instrument_code='STK',
+      ...     location_code='STK.US.MAJOR',
+      ...     filter_codes=['priceAbove=10'],
+      ... )
+      "Scan us_top_gainers changes: {'added': [{'symbol': 'AAPL', 'rank': 0, ...}],
+        'removed': [], 'moved': [], 'unchanged': 24, 'ageSeconds': 1.2}"
+
+  """
+  logger.debug(
+    "Tool get_scanner_updates called with parameters: {!s}, {!s}, {!s}, {!s}, {!s}",
+    name,
+    instrument_code,
+    location_code,
+    filter_codes,
+    scan_code,
+  )
+  try:
+    # Scans of other clients of a shared server are kept apart
+    updates = await ib_interface.get_scanner_updates(
+      sessions.scoped(name, release=ib_interface.stop_scanner_subscription),
+      ScanSpec(instrument_code, location_code, filter_codes, scan_code),
+    )
+    logger.debug("Scanner updates: {!s}", updates)
+  except Exception as e:
+    logger.error("Error in get_scanner_updates: {!s}", str(e))
+    return f"Error getting scanner updates: {e!s}"
+  else:
+    return f"Scan {name} changes: {updates}"
+
+@ibkr.tool(name="stop_scanner_subscription")
+async def stop_scanner_subscription(name: str) -> str:
+  """Stop a named scanner started with get_scanner_updates.
+
+  Args:
+    name (str): Name of the scan to stop
+
+  Returns:
+    str: A message confirming whether the scan was stopped
+
+  Example:
+      >>> await stop_scanner_subscription(name='us_top_gainers')
+      "Scan us_top_gainers stopped"
+
+  """
+  logger.debug("Tool stop_scanner_subscription called with parameters: {!s}", name)
+  if ib_interface.stop_scanner_subscription(sessions.scoped(name)):
+    return f"Scan {name} stopped"
+  return f"Scan {name} is not running"
+
+@ibkr.tool(name="get_multi_scanner_results")
+async def get_multi_scanner_results(
+  instrument_code: str,
+  location_code: str,
+  scan_codes: list[str],
+  filter_codes: list[str],
+) -> str:
+  """Run several scans at once and rank the contracts across all of them.
+
+  Use this instead of several get_scanner_results calls when a request
+  combines scans, e.g. top gainers and most active. The scans run in
+  parallel and the results are de-duplicated on conId.
+
+  Args:
+    instrument_code (str): Type of instrument to scan for (e.g., 'STK', 'FUT', 'OPT')
+    location_code (str): Geographic location/market code (e.g., 'STK.US', 'STK.EU')
+    scan_codes (list[str]): Scan codes to combine,
+      e.g. ['TOP_PERC_GAIN', 'MOST_ACTIVE', 'HIGH_OPT_IMP_VOLAT']
+    filter_codes (list[str]): List of filter parameters in 'parameter=value' format
+      applied to every scan, e.g. ['priceAbove=10']
+
+  Returns:
+    str: A formatted string containing the ranked contracts or error message
+
+  Example:
+      >>> await get_multi_scanner_results(
+      ...     instrument_code='STK',
+      ...     location_code='STK.US.MAJOR',
+      ...     scan_codes=['TOP_PERC_GAIN', 'MOST_ACTIVE'],
+      ...     filter_codes=['priceAbove=10'],
+      ... )
+      "I found 80 stocks across 2 scans: {'results': [{'conId': 265598,
+        'symbol': 'AAPL', 'score': 1.9, 'ranks': {'TOP_PERC_GAIN': 3,
+        'MOST_ACTIVE': 1}, 'rank': 0}, ...], 'errors': {}}"
+
+  """
+  logger.debug(
+    "Tool get_multi_scanner_results called with parameters: {!s}, {!s}, {!s}, {!s}",
+    instrument_code,
+    location_code,
+    scan_codes,
+    filter_codes,
+  )
+  try:
+    results = await ib_interface.get_multi_scanner_results(
+      instrument_code,
+      location_code,
+      scan_codes,
+      filter_codes,
+    )
+    logger.debug("Multi scanner results: {!s}", results)
+  except Exception as e:
+    logger.error("Error in get_multi_scanner_results: {!s}", str(e))
+    return "Error getting multi scanner results"
+  else:
+    return (
+      f"I found {len(results['results'])} stocks across "
+      f"{len(scan_codes)} scans: {results}"
+    )
@@ -1,15 +1,18 @@
 """Trading-related tools."""
 from loguru import logger
 import json
+from src.ib_helper.trading import OrderSpec
 from src.mcp_servers.ibkr import ibkr, ib_interface
 
+# The parameters are the tool schema given to the model
 @ibkr.tool(name="trade_simple_contract")
-async def trade_simple_contract(
+async def trade_simple_contract(  # noqa: PLR0913
   con_id: int,
   action: str,
   quantity: int,
   order_type: str,
   price: float | None = None,
+  time_in_force: str | None = None,
 ) -> str:
   """Trade a simple non-combo contract.
 
@@ -19,6 +22,7 @@ async def trade_simple_contract(
     quantity: Quantity to trade.
     order_type: Order type, supported order types are market (MKT) or limit (LMT)
     price: Price to trade.
+    time_in_force: Optional time in force, e.g. DAY or GTC, defaults to DAY.
 
   Returns:
     str: A formatted string containing the result of the order or error message
@@ -42,10 +46,7 @@ async def trade_simple_contract(
   try:
     result = await ib_interface.trade_simple_contract(
       con_id=con_id,
-      action=action,
-      quantity=quantity,
-      order_type=order_type,
-      price=price,
+      spec=OrderSpec(action, quantity, order_type, price, time_in_force),
     )
     logger.debug("Order result: {!s}", result)
 
@@ -63,16 +64,17 @@ async def trade_simple_contract(
   else:
     return (
       f"Order: {order} for contract: {contract} "
-      f"has been executed with status: {order_status}"
+      f"has status: {order_status}, fills: {trade_info.get('fills', [])}"
     )
 
 @ibkr.tool(name="trade_combo_contract")
-async def trade_combo_contract(
+async def trade_combo_contract(  # noqa: PLR0913
   legs: dict[int, str],
   action: str,
   quantity: int,
   order_type: str,
   price: float | None = None,
+  time_in_force: str | None = None,
 ) -> str:
   """Trade a combo contract.
 
@@ -85,6 +87,7 @@ async def trade_combo_contract(
     quantity: Quantity to trade combo contract for.
     order_type: Order type, supported order types are market (MKT) or limit (LMT)
     price: Price to trade combo contract for.
+    time_in_force: Optional time in force, e.g. DAY or GTC, defaults to DAY.
 
   Returns:
     str: A formatted string containing the result of the order or error message
@@ -110,10 +113,7 @@ async def trade_combo_contract(
   try:
     result = await ib_interface.trade_combo_contract(
       legs,
-      action,
-      quantity,
-      order_type,
-      price,
+      OrderSpec(action, quantity, order_type, price, time_in_force),
     )
     logger.debug("Order result: {!s}", result)
 
@@ -131,5 +131,55 @@ async def trade_combo_contract(
   else:
     return (
       f"Order: {order} for contract: {contract} "
-      f"has been executed with status: {order_status}"
+      f"has status: {order_status}, fills: {trade_info.get('fills', [])}"
+    )
+
+@ibkr.tool(name="trade_batch")
+async def trade_batch(orders: list[dict]) -> str:
+  """Trade several orders with a single approval round.
+
+  Use this instead of repeated trade_simple_contract or trade_combo_contract
+  calls when placing multiple orders, e.g. for a rebalance. All orders are
+  approved in one message and placed in parallel.
+
+  Args:
+    orders: List of orders, each a dictionary with:
+      - con_id: Contract ID for a simple contract, or
+      - legs: Dictionary of conIds to leg actions for a combo contract,
+        e.g. {123456: "BUY", 123457: "SELL"}
+      - action: BUY or SELL
+      - quantity: Quantity to trade
+      - order_type: market (MKT) or limit (LMT)
+      - price: Limit price (optional)
+      - time_in_force: Time in force, e.g. DAY or GTC (optional)
+
+  Returns:
+    str: A formatted string containing the result of each order and a summary
+
+  Example:
+    >>> await trade_batch(
+    ...     orders=[
+    ...       {"con_id": 265598, "action": "SELL", "quantity": 10, "order_type": "MKT"},
+    ...       {"legs": {123456: "BUY", 123457: "SELL"}, "action": "BUY",
+    ...        "quantity": 1, "order_type": "LMT", "price": -1.5},
+    ...     ],
+    ... )
+    "Batch summary: {'orders': 2, 'filled': 2, 'working': 0, 'failed': 0}, ..."
+
+  """
+  logger.debug("Tool trade_batch called with orders: {!s}", orders)
+  try:
+    result = await ib_interface.trade_batch(orders)
+    logger.debug("Batch result: {!s}", result)
+
+    batch_data = json.loads(result)
+    if batch_data.get("error"):
+      return f"Error executing batch: {batch_data['error']}"
+  except Exception as e:
+    logger.error("Error in trade_batch: {!s}", str(e))
+    return f"Error trading batch: {str(e)!s}"
+  else:
+    return (
+      f"Batch summary: {batch_data['summary']}, "
+      f"results per order: {batch_data['results']}"
     )
@@ -0,0 +1,181 @@
+"""Memoization of deterministic, read-only MCP tools."""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytz
+from loguru import logger
+
+from src.utilities.metrics import CACHE_REQUESTS
+from src.utilities.settings import Settings
+
+settings = Settings()
+
+# Tools with side effects or live state, they can never be memoized
+NEVER_MEMOIZED = {
+  "trade_simple_contract",
+  "trade_combo_contract",
+  "trade_batch",
+  "get_positions",
+  "get_tickers",
+  "get_scanner_updates",
+  "stop_scanner_subscription",
+}
+
+ToolFunction = Callable[..., Awaitable[str]]
+# Seconds a result stays valid, or a function computing them when it is stored
+TTLPolicy = float | Callable[[], float]
+
+
+def until_end_of_day() -> float:
+  """TTL policy of results valid until midnight in the server timezone."""
+  now = datetime.now(pytz.timezone(settings.server_timezone))
+  midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+  return (midnight - now).total_seconds()
+
+
+class MemoryBackend:
+  """Results kept in this process, least recently used evicted first."""
+
+  def __init__(self, max_entries: int) -> None:
+    """Initialize the backend.
+
+    Args:
+      max_entries: Maximum number of results kept.
+
+    """
+    self.max_entries = max_entries
+    self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+  def get(self, key: str) -> str | None:
+    """Get an unexpired result."""
+    entry = self._entries.get(key)
+    if entry is None:
+      return None
+    if entry[0] <= time.time():
+      del self._entries[key]
+      return None
+    self._entries.move_to_end(key)
+    return entry[1]
+
+  def set(self, key: str, result: str, ttl: float) -> None:
+    """Store a result for ttl seconds."""
+    self._entries[key] = (time.time() + ttl, result)
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+
+class FileBackend:
+  """Results kept in a directory, shared by the MCP servers of all executions.
+
+  Every execution starts its own MCP server process, so only a shared
+  backend reuses results across executions. The oldest files are evicted
+  first.
+  """
+
+  def __init__(self, directory: str, max_entries: int) -> None:
+    """Initialize the backend.
+
+    Args:
+      directory: Directory of the result files.
+      max_entries: Maximum number of results kept.
+
+    """
+    self.directory = Path(directory)
+    self.max_entries = max_entries
+
+  def get(self, key: str) -> str | None:
+    """Get an unexpired result."""
+    try:
+      entry = json.loads((self.directory / f"{key}.json").read_text())
+    except FileNotFoundError:
+      return None
+    except (OSError, ValueError) as e:
+      logger.warning("Error reading memoized tool result {}: {}", key, str(e))
+      return None
+    if entry["expires_at"] <= time.time():
+      return None
+    return entry["result"]
+
+  def set(self, key: str, result: str, ttl: float) -> None:
+    """Store a result for ttl seconds."""
+    self.directory.mkdir(parents=True, exist_ok=True)
+    path = self.directory / f"{key}.json"
+    # Replace atomically, another MCP server may read the entry meanwhile
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    temporary.write_text(json.dumps({"expires_at": time.time() + ttl, "result": result}))
+    temporary.replace(path)
+    self._evict()
+
+  def _evict(self) -> None:
+    """Remove the oldest results above max_entries."""
+    files = list(self.directory.glob("*.json"))
+    if len(files) <= self.max_entries:
+      return
+    files.sort(key=lambda file: file.stat().st_mtime)
+    for file in files[:len(files) - self.max_entries]:
+      file.unlink(missing_ok=True)
+
+
+def create_backend() -> MemoryBackend | FileBackend:
+  """Create the backend chosen by the tool_memo_backend setting."""
+  if settings.tool_memo_backend == "file":
+    return FileBackend(settings.tool_memo_dir, settings.tool_memo_max_entries)
+  if settings.tool_memo_backend != "memory":
+    logger.warning("Unknown tool memo backend {}, using memory", settings.tool_memo_backend)
+  return MemoryBackend(settings.tool_memo_max_entries)
+
+
+backend = create_backend()
+
+
+def memoize(ttl: TTLPolicy) -> Callable[[ToolFunction], ToolFunction]:
+  """Reuse the results of a tool called with the same arguments.
+
+  Apply it below the tool decorator. Arguments are normalized with their
+  defaults, so omitted and explicit default values share a result. Error
+  results are not stored.
+
+  Args:
+    ttl: Seconds a result stays valid, or a policy computing them.
+
+  Raises:
+    ValueError: The tool has side effects or live results.
+
+  """
+  def decorator(func: ToolFunction) -> ToolFunction:
+    name = func.__name__
+    if name in NEVER_MEMOIZED:
+      raise ValueError(f"Tool {name} can not be memoized")
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args: object, **kwargs: object) -> str:
+      arguments = signature.bind(*args, **kwargs)
+      arguments.apply_defaults()
+      key = hashlib.sha256(
+        json.dumps([name, arguments.arguments], sort_keys=True, default=str).encode(),
+      ).hexdigest()
+
+      result = backend.get(key)
+      CACHE_REQUESTS.labels(cache="tool_memo", result="miss" if result is None else "hit").inc()
+      if result is not None:
+        logger.debug("Tool {} result memoized", name)
+        return result
+
+      result = await func(*args, **kwargs)
+      if not result.startswith("Error"):
+        backend.set(key, result, ttl() if callable(ttl) else ttl)
+      return result
+
+    return wrapper
+
+  return decorator
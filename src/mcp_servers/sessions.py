@@ -0,0 +1,99 @@
+"""Isolation and concurrency limits of the client sessions of the MCP server."""
+import asyncio
+import itertools
+import weakref
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+from mcp.server.lowlevel.server import request_ctx
+
+from src.utilities.settings import Settings
+
+settings = Settings()
+
+
+class SessionRegistry:
+  """Client sessions served by this MCP server.
+
+  A stdio server serves a single client, an SSE server serves every
+  connected client from one process. Named server state, like scanner
+  subscriptions, is scoped to the session that created it and released when
+  the session ends, and tool calls are limited per session and in total so
+  one client can not starve the others.
+
+  Available public methods:
+    - current: get the key of the session of the current request
+    - scoped: scope a name to the current session
+    - limit: limit the concurrent tool calls of the current session
+  """
+
+  def __init__(self, max_calls: int, max_session_calls: int) -> None:
+    """Initialize the registry.
+
+    Args:
+      max_calls: Maximum concurrent tool calls of all sessions.
+      max_session_calls: Maximum concurrent tool calls of one session.
+
+    """
+    self.max_session_calls = max_session_calls
+    self._calls = asyncio.Semaphore(max_calls)
+    self._counter = itertools.count(1)
+    self._keys: weakref.WeakKeyDictionary[object, str] = weakref.WeakKeyDictionary()
+    self._session_calls: weakref.WeakKeyDictionary[object, asyncio.Semaphore] =\
+      weakref.WeakKeyDictionary()
+    self._scoped: set[str] = set()
+
+  @staticmethod
+  def _session() -> object | None:
+    """Get the session of the current request, None outside of requests."""
+    context = request_ctx.get(None)
+    return context.session if context is not None else None
+
+  def current(self) -> str:
+    """Get the key of the session of the current request."""
+    session = self._session()
+    if session is None:
+      return "local"
+    if session not in self._keys:
+      self._keys[session] = f"session{next(self._counter)}"
+    return self._keys[session]
+
+  def scoped(self, name: str, release: Callable[[str], object] | None = None) -> str:
+    """Scope a name to the current session.
+
+    Args:
+      name: Name given by the client, already scoped names are kept.
+      release: Called with the scoped name when the session ends.
+
+    Returns:
+      The name prefixed with the session key.
+
+    """
+    prefix = f"{self.current()}/"
+    scoped = name if name.startswith(prefix) else prefix + name
+    session = self._session()
+    if release is not None and session is not None and scoped not in self._scoped:
+      self._scoped.add(scoped)
+      weakref.finalize(session, self._release, release, scoped)
+    return scoped
+
+  def _release(self, release: Callable[[str], object], scoped: str) -> None:
+    """Release the state of an ended session."""
+    self._scoped.discard(scoped)
+    release(scoped)
+
+  @asynccontextmanager
+  async def limit(self) -> AsyncIterator[None]:
+    """Wait for a free slot of the current session and of the server."""
+    session = self._session()
+    if session is None:
+      async with self._calls:
+        yield
+      return
+    if session not in self._session_calls:
+      self._session_calls[session] = asyncio.Semaphore(self.max_session_calls)
+    async with self._session_calls[session], self._calls:
+      yield
+
+
+sessions = SessionRegistry(settings.mcp_max_concurrent_calls, settings.mcp_session_max_concurrent_calls)
@@ -0,0 +1,213 @@
+"""Prometheus metrics of the web, worker and MCP server processes.
+
+Metrics are shared between processes through prometheus_client's
+multiprocess mode: every process calling ``setup_metrics`` writes its values
+to ``metrics_dir`` and the web ``/metrics`` endpoint aggregates them,
+whichever gunicorn worker serves it. prometheus_client picks where values
+are kept when it is imported, so it is only imported when a metric is first
+used, and other processes keep their metrics in memory. Without
+prometheus_client every metric is a no-op.
+"""
+import importlib.util
+import os
+import shutil
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from src.utilities.settings import Settings
+
+settings = Settings()
+
+
+def setup_metrics() -> None:
+  """Share the metrics of this process with the other processes of the host.
+
+  Called by the process entry points before any metric is used, as
+  ``setup_tracing``.
+  """
+  if not settings.metrics_dir:
+    return
+  if "prometheus_client" in sys.modules and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    logger.warning("Metrics were used before setup, they are kept in memory")
+  os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.metrics_dir)
+  Path(os.environ["PROMETHEUS_MULTIPROC_DIR"]).mkdir(parents=True, exist_ok=True)
+
+
+class _NoopMetric:
+  """Metric used when prometheus_client is not installed."""
+
+  def __init__(self, *args: Any, **kwargs: Any) -> None:
+    """Accept the arguments of any prometheus_client metric."""
+
+  def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+    """Return the metric itself for any labels."""
+    return self
+
+  def inc(self, amount: float = 1) -> None:
+    """Ignore an increment."""
+
+  def set(self, value: float) -> None:
+    """Ignore a value."""
+
+  def observe(self, amount: float) -> None:
+    """Ignore an observation."""
+
+
+class _Metric:
+  """prometheus_client metric created on its first use, after setup_metrics."""
+
+  _lock = threading.Lock()
+
+  def __init__(self, kind: str, *args: Any, **kwargs: Any) -> None:
+    """Keep the arguments of the metric.
+
+    Args:
+      kind: "Counter", "Gauge" or "Histogram".
+      args: Arguments of the prometheus_client metric.
+      kwargs: Keyword arguments of the prometheus_client metric.
+
+    """
+    self.kind = kind
+    self.args = args
+    self.kwargs = kwargs
+    self._metric: Any = None
+
+  def _get(self) -> Any:
+    """Get the metric, creating it on first use."""
+    if self._metric is None:
+      with self._lock:
+        if self._metric is None:
+          if metrics_available():
+            import prometheus_client
+            self._metric = getattr(prometheus_client, self.kind)(*self.args, **self.kwargs)
+          else:
+            self._metric = _NoopMetric()
+    return self._metric
+
+  def labels(self, *args: Any, **kwargs: Any) -> Any:
+    """Get the metric of some labels."""
+    return self._get().labels(*args, **kwargs)
+
+  def inc(self, amount: float = 1) -> None:
+    """Increment the metric."""
+    self._get().inc(amount)
+
+  def set(self, value: float) -> None:
+    """Set the metric."""
+    self._get().set(value)
+
+  def observe(self, amount: float) -> None:
+    """Observe a value."""
+    self._get().observe(amount)
+
+
+TOKEN_BUCKETS = (100, 500, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000)
+
+TOOL_DURATION = _Metric(
+  "Histogram", "mcp_tool_duration_seconds", "MCP tool call latency", ["tool", "status"],
+)
+IB_REQUEST_DURATION = _Metric(
+  "Histogram", "ib_request_duration_seconds", "IB gateway request latency", ["request", "status"],
+)
+IB_PACING_VIOLATIONS = _Metric(
+  "Counter", "ib_pacing_violations_total", "IB gateway pacing violations", ["code"],
+)
+CACHE_REQUESTS = _Metric(
+  "Counter", "cache_requests_total", "Cache lookups, the hit ratio is hits over all", ["cache", "result"],
+)
+QUEUE_DEPTH = _Metric(
+  "Gauge", "execution_queue_depth", "Executions waiting in the queue", ["backend"],
+  multiprocess_mode="livemostrecent",
+)
+QUEUE_WAIT = _Metric(
+  "Histogram", "execution_queue_wait_seconds", "Time executions wait in the queue", ["backend"],
+  buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+SCHEDULER_LAG = _Metric(
+  "Histogram", "scheduler_lag_seconds", "Delay between the scheduled and the actual run time of jobs",
+  buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300),
+)
+EXECUTIONS = _Metric(
+  "Counter", "executions_total", "Finished prompt executions", ["status"],
+)
+LLM_TOKENS = _Metric(
+  "Counter", "llm_tokens_total", "Anthropic tokens used", ["model", "direction"],
+)
+EXECUTION_TOKENS = _Metric(
+  "Histogram", "llm_execution_tokens", "Anthropic tokens used per execution", ["direction"],
+  buckets=TOKEN_BUCKETS,
+)
+
+
+@contextmanager
+def timed(histogram: Any, **labels: str) -> Iterator[None]:
+  """Observe the duration of a block, with status "error" if it raises."""
+  start = time.perf_counter()
+  status = "ok"
+  try:
+    yield
+  except BaseException:
+    status = "error"
+    raise
+  finally:
+    histogram.labels(status=status, **labels).observe(time.perf_counter() - start)
+
+
+def metrics_available() -> bool:
+  """Check if prometheus_client is installed."""
+  return importlib.util.find_spec("prometheus_client") is not None
+
+
+def _registry() -> Any:
+  """Get the registry of the metrics of all processes, or of this one."""
+  from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+  if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    return REGISTRY
+  registry = CollectorRegistry()
+  multiprocess.MultiProcessCollector(registry)
+  return registry
+
+
+def generate_metrics() -> tuple[bytes, str]:
+  """Render the metrics of all processes.
+
+  Returns:
+    The metrics in the Prometheus text format and its content type.
+
+  """
+  from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+  return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def reset_metrics_dir() -> None:
+  """Remove the values of previous runs, before any process writes metrics."""
+  directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+  if directory:
+    shutil.rmtree(directory, ignore_errors=True)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+
+
+def mark_process_dead(pid: int) -> None:
+  """Drop the live gauges of an exited process."""
+  if metrics_available() and "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
+
+
+def start_metrics_server(port: int) -> None:
+  """Serve the metrics of all processes on a port, for processes without the web app."""
+  if not metrics_available():
+    return
+  from prometheus_client import start_http_server
+
+  start_http_server(port, registry=_registry())
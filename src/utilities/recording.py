@@ -0,0 +1,137 @@
+"""Recording of prompt executions, replayed offline by ``src.loadtest.replay``.
+
+A recording keeps what an execution received from outside its processes:
+the model responses and MCP tool results seen by the client and, from the
+MCP server process, the IB gateway and HTTP responses behind the tool
+results, each with its start offset and duration in seconds. It is stored
+as a gzipped JSON lines archive, one event per line, linked to the execution.
+"""
+import gzip
+import json
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+# File the MCP server process appends its events to, set by a recording client
+RECORDING_ENV = "EXECUTION_RECORDING_FILE"
+
+
+class Recorder:
+  """Events of one recorded execution.
+
+  The client records its events in memory, the MCP server process started by
+  the client appends its events to a file given in its environment, and both
+  are merged in start order when the archive is saved.
+
+  Available public methods:
+    - record: record an event of the client
+    - environment: get the environment variables recording a server process
+    - save: write the archive of the execution
+    - discard: remove the event file of the server process
+  """
+
+  def __init__(self) -> None:
+    """Initialize the recorder, the execution starts now."""
+    self.started = time.time()
+    self.events: list[dict[str, Any]] = []
+    fd, path = tempfile.mkstemp(prefix="recording-", suffix=".jsonl")
+    os.close(fd)
+    self.server_file = Path(path)
+
+  def record(self, kind: str, started: float, **data: object) -> None:
+    """Record an event of the client.
+
+    Args:
+      kind: "query", "llm", "tool" or "result".
+      started: Time the event started, from time.time().
+      data: Content of the event, with its duration in seconds if it took time.
+
+    """
+    self.events.append({"kind": kind, "start": started, **data})
+
+  def environment(self) -> dict[str, str]:
+    """Get the environment variables making a server process record its events."""
+    return {RECORDING_ENV: str(self.server_file)}
+
+  def save(self, path: str | Path) -> Path:
+    """Write the events of the client and of its server process to an archive.
+
+    The server process must have exited, its event file is removed even when
+    the archive could not be written.
+
+    Args:
+      path: Archive to write.
+
+    Returns:
+      Path of the archive.
+
+    """
+    events = self.events.copy()
+    try:
+      if self.server_file.exists():
+        with self.server_file.open() as f:
+          # A line cut short by a terminated server is left out
+          events.extend(json.loads(line) for line in f if line.endswith("\n"))
+    finally:
+      self.discard()
+    events.sort(key=lambda event: event["start"])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt") as f:
+      for event in events:
+        offset = round(event["start"] - self.started, 6)
+        f.write(json.dumps({**event, "start": offset}, default=str) + "\n")
+    return path
+
+  def discard(self) -> None:
+    """Remove the event file of the server process, when the execution is not saved."""
+    self.server_file.unlink(missing_ok=True)
+
+
+def load_recording(path: str | Path) -> list[dict[str, Any]]:
+  """Read the events of a recording archive, in start order."""
+  with gzip.open(path, "rt") as f:
+    return [json.loads(line) for line in f]
+
+
+@contextmanager
+def recorded(kind: str, **data: object) -> Iterator[dict[str, Any] | None]:
+  """Record an event of the MCP server process, if its client records.
+
+  The block adds the response to the yielded event, exceptions are recorded
+  as the error of the event.
+
+  Args:
+    kind: "ib" or "http".
+    data: Request of the event.
+
+  Yields:
+    The event, or None when not recording.
+
+  """
+  path = os.environ.get(RECORDING_ENV)
+  if not path:
+    yield None
+    return
+
+  event = {"kind": kind, "start": time.time(), **data}
+  try:
+    yield event
+  except Exception as e:
+    event["error"] = str(e)
+    raise
+  finally:
+    event["duration"] = round(time.time() - event["start"], 6)
+    try:
+      # One append per event, the file is read once the server exited
+      with Path(path).open("a") as f:
+        f.write(json.dumps(event, default=str) + "\n")
+    except OSError as e:
+      logger.warning("Error recording {} event: {}", kind, str(e))
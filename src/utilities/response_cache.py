@@ -0,0 +1,172 @@
+"""Cache of query answers, valid while the tool results they used are unchanged."""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytz
+from loguru import logger
+
+from src.utilities.settings import Settings
+
+# Tools placing orders, the reused tool results are dropped once they are called
+ORDER_TOOLS = {
+  "ibkr_trade_simple_contract",
+  "ibkr_trade_combo_contract",
+  "ibkr_trade_batch",
+}
+
+# Tools placing orders or changing server state, answers using them are not
+# cached and their results are never reused
+UNCACHEABLE_TOOLS = ORDER_TOOLS | {
+  "ibkr_get_scanner_updates",
+  "ibkr_stop_scanner_subscription",
+}
+
+# Tools reading the live account and market state, as the tools never
+# memoized by the MCP server. Answers using them are cached with their
+# fingerprints, but their results are never reused.
+LIVE_TOOLS = {"ibkr_get_positions", "ibkr_get_tickers"}
+
+# Tools whose results only matter per calendar day or per quote bucket, they
+# are fingerprinted from the clock without calling them
+DAY_TOOLS = {"calendar_current_datetime", "calendar_get_calendar", "fmp_get_events"}
+QUOTE_TOOLS = {"fmp_get_stock_quote", "fmp_get_stock_quotes_batch", "ibkr_get_tickers"}
+
+POSITIONS_TOOL = "ibkr_get_positions"
+
+
+class ResponseCache:
+  """Answers of repeated queries, keyed on the query and its tool dependencies.
+
+  An answer is stored with a fingerprint of every tool call it made. A
+  later run of the same query reuses the answer if it is younger than
+  ``ttl`` and every fingerprint is unchanged:
+    - calendar and events tools: the current day,
+    - quote tools: the current ``quote_bucket`` seconds window,
+    - positions: the held contracts and quantities, ignoring PnL updates,
+    - other tools: a hash of their result, calling them again.
+
+  Results of read-only tools, apart from the live positions and tickers,
+  are also reused for ``tool_ttl`` seconds, so repeated calls within and
+  across queries skip the gateway. They are dropped once an order is placed.
+
+  Available public methods:
+    - lookup: get the stored answer of a query
+    - store: store the answer of a query
+    - fingerprint: fingerprint a tool call
+    - cached_tool_result: get a recent result of a tool call
+    - remember_tool_result: keep the result of a tool call
+    - forget_tool_results: drop the kept results once an order tool is called
+  """
+
+  def __init__(self, directory: str, ttl: int, quote_bucket: int, tool_ttl: int) -> None:
+    """Initialize the cache.
+
+    Args:
+      directory: Directory of the answer files, shared between processes.
+      ttl: Maximum age of a reused answer in seconds.
+      quote_bucket: Seconds during which quotes are considered unchanged.
+      tool_ttl: Seconds during which a tool result is reused.
+
+    """
+    self.directory = Path(directory)
+    self.ttl = ttl
+    self.quote_bucket = quote_bucket
+    self.tool_ttl = tool_ttl
+    self._tool_results: dict[str, tuple[float, Any]] = {}
+
+  @staticmethod
+  def _key(*parts: object) -> str:
+    """Hash the parts of a key."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+  def lookup(self, model: str, query: str) -> dict | None:
+    """Get the stored answer of a query, if younger than the TTL.
+
+    Returns:
+      The entry with the "result" and its "dependencies", or None.
+
+    """
+    path = self.directory / f"{self._key(model, query)}.json"
+    try:
+      entry = json.loads(path.read_text())
+    except FileNotFoundError:
+      return None
+    except (OSError, ValueError) as e:
+      logger.warning("Error reading cached answer {}: {}", path, str(e))
+      return None
+    if time.time() - entry["created_at"] > self.ttl:
+      return None
+    return entry
+
+  def store(self, model: str, query: str, dependencies: list[dict], result: str) -> None:
+    """Store the answer of a query with the fingerprints of its tool calls."""
+    self.directory.mkdir(parents=True, exist_ok=True)
+    path = self.directory / f"{self._key(model, query)}.json"
+    entry = {"created_at": time.time(), "dependencies": dependencies, "result": result}
+    # Replace atomically, another process may read the entry meanwhile
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    temporary.write_text(json.dumps(entry))
+    temporary.replace(path)
+
+  def fingerprint(self, tool: str, result_text: str | None = None) -> str | None:
+    """Fingerprint a tool call.
+
+    Args:
+      tool: Name of the tool.
+      result_text: Result of the call, not needed for clock based tools.
+
+    Returns:
+      The fingerprint, or None if the result is needed and not given.
+
+    """
+    if tool in DAY_TOOLS:
+      timezone = pytz.timezone(Settings().server_timezone)
+      return datetime.now(timezone).date().isoformat()
+    if tool in QUOTE_TOOLS:
+      return str(int(time.time() // self.quote_bucket))
+    if result_text is None:
+      return None
+    if tool == POSITIONS_TOOL:
+      return self._key(_holdings(result_text))
+    return self._key(result_text)
+
+  def cached_tool_result(self, tool: str, arguments: dict) -> Any | None:
+    """Get the result of a read-only tool call made less than tool_ttl ago."""
+    cached = self._tool_results.get(self._key(tool, arguments))
+    if cached and time.monotonic() - cached[0] < self.tool_ttl:
+      return cached[1]
+    return None
+
+  def remember_tool_result(self, tool: str, arguments: dict, result: Any) -> None:
+    """Keep the result of a successful read-only tool call."""
+    if tool in UNCACHEABLE_TOOLS or tool in LIVE_TOOLS or getattr(result, "isError", False):
+      return
+    now = time.monotonic()
+    self._tool_results = {
+      key: value for key, value in self._tool_results.items() if now - value[0] < self.tool_ttl
+    }
+    self._tool_results[self._key(tool, arguments)] = (now, result)
+
+  def forget_tool_results(self, tool: str) -> None:
+    """Drop the kept tool results if the tool places orders, even if it failed."""
+    if tool in ORDER_TOOLS:
+      self._tool_results.clear()
+
+
+def _holdings(result_text: str) -> list | str:
+  """Get the held contracts and quantities from a positions tool result."""
+  try:
+    _, _, data = result_text.partition("Current Positions: ")
+    positions = json.loads(data)
+  except ValueError:
+    return result_text
+  # A contract held in several accounts has a record per account
+  return sorted(
+    (position.get("contractId"), position.get("contract"), position.get("position"), position.get("avgCost"))
+    for position in positions
+  )
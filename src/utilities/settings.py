@@ -14,17 +14,107 @@ class Settings(BaseSettings):
   database_host: str = "localhost"
   database_port: int = 5432
   web_port: int = 8000
+  executions_page_size: int = 50
+  prompts_page_size: int = 50
+  dropdown_cache_ttl: int = 60
+  execution_events_queue_size: int = 1000
+  result_storage: str = "database"  # database or files
+  result_storage_dir: str = "data/results"
+  result_inline_limit: int = 2000
+  execution_retention_days: int = 90
+  execution_retention_max_rows: int = 10000
+  execution_retention_interval: int = 3600
+
+  # Scheduler settings
+  max_concurrent_executions: int = 2
+  execution_queue_size: int = 50
+  max_concurrent_ib_requests: int = 2
+  max_concurrent_llm_requests: int = 4
+  leader_check_interval: int = 15
+  execution_queue_backend: str = "local"  # local or postgres
+  execution_max_attempts: int = 3
+  execution_retry_delay: int = 30
+  execution_visibility_timeout: int = 600
+  execution_poll_interval: float = 2
+
+  # Tracing settings
+  tracing_enabled: bool = True
+  tracing_file: str = "logs/traces.jsonl"  # one file per day, e.g. traces-2025-06-02.jsonl
+  tracing_retention_days: int = 14
+  tracing_otlp_endpoint: str | None = None
+
+  # Metrics settings
+  metrics_dir: str | None = "data/metrics"  # shared by all processes of a host
+  mcp_metrics_port: int | None = None  # standalone metrics of the MCP server
+
+  # Recording of executions for offline replay (python main.py --replay)
+  recording_enabled: bool = False
+  recording_dir: str = "data/recordings"
 
   # MCP server settings
+  mcp_server_transport: str = "stdio"  # stdio or sse
+  mcp_server_host: str = "127.0.0.1"
+  mcp_server_port: int = 8001
+  # SSE endpoint of a running MCP server, clients start their own stdio server if unset
+  mcp_server_url: str | None = None
+  mcp_max_concurrent_calls: int = 20
+  mcp_session_max_concurrent_calls: int = 4
   ib_gateway_host: str
   ib_gateway_port: str
   ib_command_server_port: str
   quotes_api_key: str
+  fmp_base_url: str = "https://financialmodelingprep.com/api/v3"
+  # Serve the IB tools from a simulated gateway, for load tests
+  ib_simulated: bool = False
+  ib_simulated_latency: float = 0.05
+  # Load test stub of the model and FMP APIs (python main.py --loadtest)
+  loadtest_port: int = 8790
+  loadtest_model_latency: float = 1.0
+
+  # Order handling settings
+  order_time_in_force: str = "DAY"
+  order_fill_timeout: int = 10
+  order_market_unfilled_policy: str = "cancel"
+  order_limit_unfilled_policy: str = "keep"
+  order_journal_file: str = "data/orders.jsonl"
+  what_if_cache_ttl: int = 30
+
+  # Scanner settings
+  scanner_params_file: str = "data/scanner_params.xml"
+  scanner_params_max_age: int = 86400
+  scanner_max_subscriptions: int = 10
+  scanner_market_data_timeout: float = 5
 
   # MCP client settings
   anthropic_api_key: str
+  anthropic_base_url: str | None = None
   chat_model: str = "claude-3-5-sonnet-20241022"
   chat_model_max_tokens: int = 1000
+  # Seconds of streamed model text sent as one progress event
+  chat_stream_flush_interval: float = 0.1
+  # Default budgets of a query, prompts can override them
+  query_max_tokens: int | None = 200000
+  query_max_iterations: int | None = 25
+  query_max_seconds: float | None = 600
+  # Prices in USD per million tokens
+  llm_input_price: float = 3.0
+  llm_output_price: float = 15.0
+  llm_cache_write_price: float = 3.75
+  llm_cache_read_price: float = 0.3
+  # Reuse answers of scheduled prompts while their tool inputs are unchanged,
+  # for at most this many seconds, 0 to disable
+  response_cache_ttl: int = 0
+  response_cache_dir: str = "data/response_cache"
+  # Seconds during which quotes are considered unchanged
+  response_cache_quote_bucket: int = 300
+  # Seconds during which results of read-only tools are reused
+  response_cache_tool_ttl: int = 60
+
+  # Memoization of read-only MCP tools, "memory" per MCP server process or
+  # "file" shared between executions
+  tool_memo_backend: str = "memory"
+  tool_memo_dir: str = "data/tool_memo"
+  tool_memo_max_entries: int = 1000
 
   # Telegram approval bot settings
   telegram_bot_token: str
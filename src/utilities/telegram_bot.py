@@ -2,9 +2,16 @@
 
 import json
 import asyncio
+from collections.abc import Awaitable
 from loguru import logger
 from uuid import UUID, uuid4
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+  CallbackQuery,
+  InlineKeyboardButton,
+  InlineKeyboardMarkup,
+  Message,
+  Update,
+)
 from telegram.ext import (
   Application,
   CallbackQueryHandler,
@@ -26,6 +33,10 @@ class TelegramApprovalBot:
     self.chat_id = self.settings.telegram_allowed_user_id
     self.approval_events: dict[UUID, asyncio.Event] = {}
     self.approval_results: dict[UUID, bool] = {}
+    self.batch_messages: dict[UUID, list[dict]] = {}
+    self.batch_decisions: dict[UUID, list[bool | None]] = {}
+    # Running tasks adding what-if details, referenced until they finish
+    self._detail_tasks: set[asyncio.Task] = set()
 
     # Initialize bot
     self.app = Application.builder().token(self.token).build()
@@ -81,6 +92,10 @@ class TelegramApprovalBot:
         return
 
       order_id = matching_orders[0]
+      if order_id in self.batch_decisions:
+        await self._batch_callback(query, order_id, data)
+        return
+
       approved = data["a"]
       logger.debug(
         "Trade {} for order {}",
@@ -108,8 +123,20 @@ class TelegramApprovalBot:
   async def request_approval(
     self,
     message: dict,
+    details: Awaitable[dict] | None = None,
   ) -> bool:
-    """Request approval for an order."""
+    """Request approval for an order.
+
+    Args:
+      message: Dictionary with the contract, order and held positions.
+      details: Optional pending what-if check, its margin and commission
+        impact is added to the message when it arrives. Orders blocked by the
+        check are rejected without waiting for the user.
+
+    Returns:
+      True if the order was approved.
+
+    """
     order_id = uuid4()
     self.approval_events[order_id] = asyncio.Event()
 
@@ -128,9 +155,17 @@ class TelegramApprovalBot:
       f"Action: {message['order']['action']}\n"
       f"Quantity: {message['order']['totalQuantity']}\n"
       f"Type: {order_type}{price_str}\n"
+      f"Time in force: {message['order'].get('tif', 'DAY')}\n"
       f"```"
     )
 
+    positions = message.get("positions")
+    if positions:
+      positions_str = "\n".join(
+        f"{con_id}: {quantity:g}" for con_id, quantity in positions.items()
+      )
+      message_text += f"\n\nCurrent position:\n```\n{positions_str}\n```"
+
     # Create inline keyboard with properly serialized UUID
     keyboard = [
       [
@@ -154,12 +189,18 @@ class TelegramApprovalBot:
 
     try:
       # Send message
-      await self.app.bot.send_message(
+      sent = await self.app.bot.send_message(
         chat_id=self.chat_id,
         text=message_text,
         reply_markup=reply_markup,
         parse_mode="Markdown",
       )
+      if details is not None:
+        task = asyncio.create_task(
+          self._append_details(order_id, sent, message_text, reply_markup, details),
+        )
+        self._detail_tasks.add(task)
+        task.add_done_callback(self._detail_tasks.discard)
 
       # Wait for response or timeout
       try:
@@ -182,6 +223,202 @@ class TelegramApprovalBot:
     else:
       return result
 
+  async def _append_details(
+    self,
+    order_id: UUID,
+    sent: Message,
+    message_text: str,
+    reply_markup: InlineKeyboardMarkup,
+    details: Awaitable[dict],
+  ) -> None:
+    """Add the what-if check to a pending approval request."""
+    try:
+      check = await details
+    except Exception as e:
+      logger.warning("What-if details unavailable: {}", str(e))
+      return
+
+    event = self.approval_events.get(order_id)
+    if event is None or event.is_set():
+      return
+
+    try:
+      await sent.edit_text(
+        text=f"{message_text}\n\nWhat-if:\n```\n{self._what_if_text(check)}\n```",
+        reply_markup=None if check.get("blocked") else reply_markup,
+        parse_mode="Markdown",
+      )
+    except Exception as e:
+      logger.error("Error adding what-if details: {}", str(e))
+
+    if check.get("blocked"):
+      self.approval_results[order_id] = False
+      event.set()
+
+  @staticmethod
+  def _what_if_text(check: dict) -> str:
+    """Format the margin and commission impact of a what-if check."""
+    if check.get("blocked"):
+      return f"⛔ Blocked: {check.get('reason')}"
+    if "commission" not in check:
+      return check.get("reason") or "What-if check unavailable"
+    text = (
+      f"Init margin change: {check['initMarginChange']}\n"
+      f"Maint margin change: {check['maintMarginChange']}\n"
+      f"Equity with loan after: {check['equityWithLoanAfter']}\n"
+      f"Commission: {check['commission']} {check['commissionCurrency']}"
+    )
+    if check.get("warningText"):
+      text += f"\nWarning: {check['warningText']}"
+    return text
+
+  async def _batch_callback(
+    self,
+    query: CallbackQuery,
+    batch_id: UUID,
+    data: dict,
+  ) -> None:
+    """Handle a per-order, all-orders or submit button of a batch."""
+    decisions = self.batch_decisions[batch_id]
+    submitted = data.get("s", False)
+
+    if not submitted:
+      index = data["i"]
+      if index < 0:
+        decisions[:] = [data["a"]] * len(decisions)
+        submitted = True
+      else:
+        decisions[index] = data["a"]
+
+    if submitted:
+      logger.debug("Batch {} submitted with decisions {}", batch_id, decisions)
+      self.approval_events[batch_id].set()
+
+    await query.edit_message_text(
+      text=self._batch_text(batch_id, final=submitted),
+      reply_markup=None if submitted else self._batch_keyboard(batch_id),
+      parse_mode="Markdown",
+    )
+    await query.answer("Batch submitted" if submitted else "Decision recorded")
+
+  def _batch_text(self, batch_id: UUID, *, final: bool = False) -> str:
+    """Format the batch approval message with the current decisions."""
+    marks = {True: "✅", False: "❌", None: "❌" if final else "⏳"}
+    lines = []
+    for index, (message, decision) in enumerate(
+      zip(
+        self.batch_messages[batch_id],
+        self.batch_decisions[batch_id],
+        strict=True,
+      ),
+    ):
+      contract = message["contract"]
+      order = message["order"]
+      legs = contract.get("legs")
+      instrument = (
+        ", ".join(f"{leg['action']} {leg['ratio']}x {leg['symbol']}" for leg in legs)
+        if legs
+        else f"{contract.get('symbol')} {contract.get('secType')} ({contract.get('conId')})"
+      )
+      price_str = (
+        f" at ${order['lmtPrice']:.2f}" if order["orderType"] == "LMT" else ""
+      )
+      line = (
+        f"{marks[decision]} *#{index + 1}* {order['action']} "
+        f"{order['totalQuantity']} {order['orderType']}{price_str} "
+        f"{order.get('tif', 'DAY')}\n`{instrument}`"
+      )
+      if message.get("what_if"):
+        line += f"\n```\n{self._what_if_text(message['what_if'])}\n```"
+      lines.append(line)
+
+    status = "\n\nStatus: submitted" if final else ""
+    return "🔔 *Batch Trade Approval Request*\n\n" + "\n\n".join(lines) + status
+
+  def _batch_keyboard(self, batch_id: UUID) -> InlineKeyboardMarkup:
+    """Create the per-order and batch-wide approval buttons."""
+    prefix = str(batch_id)[:8]
+    keyboard = [
+      [
+        InlineKeyboardButton(
+          f"✅ #{index + 1}",
+          callback_data=json.dumps({"id": prefix, "i": index, "a": True}),
+        ),
+        InlineKeyboardButton(
+          f"❌ #{index + 1}",
+          callback_data=json.dumps({"id": prefix, "i": index, "a": False}),
+        ),
+      ]
+      for index in range(len(self.batch_decisions[batch_id]))
+    ]
+    keyboard.append([
+      InlineKeyboardButton(
+        "✅ Approve all",
+        callback_data=json.dumps({"id": prefix, "i": -1, "a": True}),
+      ),
+      InlineKeyboardButton(
+        "❌ Reject all",
+        callback_data=json.dumps({"id": prefix, "i": -1, "a": False}),
+      ),
+    ])
+    keyboard.append([
+      InlineKeyboardButton(
+        "📨 Submit",
+        callback_data=json.dumps({"id": prefix, "s": True}),
+      ),
+    ])
+    return InlineKeyboardMarkup(keyboard)
+
+  async def request_batch_approval(
+    self,
+    messages: list[dict],
+  ) -> list[bool]:
+    """Request approval for a batch of orders in a single message.
+
+    Each order can be approved or rejected individually, orders without a
+    decision when the batch is submitted are rejected, as is the whole batch
+    when the request times out.
+
+    Args:
+      messages: List of approval messages, same format as request_approval,
+        with the result of the what-if check of the order as "what_if".
+
+    Returns:
+      List of approval decisions in the order of the messages.
+
+    """
+    batch_id = uuid4()
+    self.approval_events[batch_id] = asyncio.Event()
+    self.batch_messages[batch_id] = messages
+    self.batch_decisions[batch_id] = [None] * len(messages)
+
+    try:
+      await self.app.bot.send_message(
+        chat_id=self.chat_id,
+        text=self._batch_text(batch_id),
+        reply_markup=self._batch_keyboard(batch_id),
+        parse_mode="Markdown",
+      )
+
+      try:
+        await asyncio.wait_for(
+          self.approval_events[batch_id].wait(),
+          timeout=self.timeout,
+        )
+        result = [bool(decision) for decision in self.batch_decisions[batch_id]]
+      except TimeoutError:
+        result = [False] * len(messages)
+        logger.warning("Approval request timed out for batch {}", batch_id)
+    except Exception as e:
+      logger.error("Error requesting batch approval: {}", str(e))
+      return [False] * len(messages)
+    else:
+      return result
+    finally:
+      self.approval_events.pop(batch_id, None)
+      self.batch_messages.pop(batch_id, None)
+      self.batch_decisions.pop(batch_id, None)
+
   async def send_trade_confirmation(
     self,
     trade_message: str,
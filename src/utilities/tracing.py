@@ -0,0 +1,283 @@
+"""Tracing of prompt executions with OpenTelemetry.
+
+Spans are created through the OpenTelemetry API and exported by the SDK,
+both optional: without them every span is a no-op. Finished spans are
+written as JSON lines to a file per UTC day next to ``tracing_file``, which
+the web interface reads to show the waterfall of an execution, and sent to
+an OTLP collector when ``tracing_otlp_endpoint`` is set and the OTLP exporter
+is installed. Files older than ``tracing_retention_days`` are pruned with
+the execution history.
+"""
+import json
+import os
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+from loguru import logger
+
+from src.utilities.recording import recorded
+from src.utilities.settings import Settings
+
+try:
+  from opentelemetry import context, trace
+  from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+except ImportError:
+  trace = None
+
+try:
+  from opentelemetry.sdk.resources import Resource
+  from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+  from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+  )
+except ImportError:
+  SpanExporter = object
+  TracerProvider = None
+
+settings = Settings()
+
+
+def trace_file(day: date, path: str | None = None) -> Path:
+  """Get the file of the spans started on a UTC day.
+
+  Args:
+    day: Day the spans started.
+    path: Trace file setting, tracing_file by default.
+
+  """
+  path = Path(path or settings.tracing_file)
+  return path.with_name(f"{path.stem}-{day.isoformat()}{path.suffix}")
+
+
+def span_day(timestamp: int) -> date:
+  """Get the UTC day of a span time in nanoseconds."""
+  return datetime.fromtimestamp(timestamp / 1e9, timezone.utc).date()
+
+
+class JsonFileSpanExporter(SpanExporter):
+  """Append finished spans to a file per day, one JSON object per line.
+
+  The files are shared by the web, worker and MCP server processes, each
+  line is written with a single append. Spans are filed by their start day,
+  so the file of a day is complete once its traces ended.
+  """
+
+  def __init__(self, path: str) -> None:
+    """Initialize the exporter.
+
+    Args:
+      path: Trace file setting, the day is added to its name.
+
+    """
+    self.path = path
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+  def export(self, spans: Sequence["ReadableSpan"]) -> "SpanExportResult":
+    """Write the spans to the files of their days."""
+    lines: dict[date, str] = {}
+    for span in spans:
+      day = span_day(span.start_time)
+      lines[day] = lines.get(day, "") + json.dumps(span_to_dict(span), default=str) + "\n"
+    try:
+      for day, day_lines in lines.items():
+        with trace_file(day, self.path).open("a") as f:
+          f.write(day_lines)
+    except OSError as e:
+      logger.warning("Error writing spans: {}", str(e))
+      return SpanExportResult.FAILURE
+    return SpanExportResult.SUCCESS
+
+
+def span_to_dict(span: "ReadableSpan") -> dict[str, Any]:
+  """Convert a finished span to the trace file format."""
+  return {
+    "trace_id": trace.format_trace_id(span.context.trace_id),
+    "span_id": trace.format_span_id(span.context.span_id),
+    "parent_id": trace.format_span_id(span.parent.span_id) if span.parent else None,
+    "name": span.name,
+    "service": span.resource.attributes.get("service.name"),
+    "start": span.start_time,
+    "end": span.end_time,
+    "status": span.status.status_code.name,
+    "attributes": dict(span.attributes or {}),
+  }
+
+
+def setup_tracing(service_name: str) -> None:
+  """Export the spans of this process, if the OpenTelemetry SDK is installed.
+
+  A process started with a TRACEPARENT environment variable continues the
+  trace of its parent, this is how the MCP server spans join the execution.
+
+  Args:
+    service_name: Name of the process in the exported spans.
+
+  """
+  if not settings.tracing_enabled or trace is None or TracerProvider is None:
+    return
+
+  provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+  # Spans are written synchronously so none are lost when the MCP server
+  # process is terminated at the end of an execution
+  provider.add_span_processor(SimpleSpanProcessor(JsonFileSpanExporter(settings.tracing_file)))
+  if settings.tracing_otlp_endpoint:
+    try:
+      from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+      logger.warning("opentelemetry-exporter-otlp is not installed, not exporting to the collector")
+    else:
+      provider.add_span_processor(
+        BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)),
+      )
+  trace.set_tracer_provider(provider)
+
+  if "TRACEPARENT" in os.environ:
+    carrier = {"traceparent": os.environ["TRACEPARENT"]}
+    context.attach(TraceContextTextMapPropagator().extract(carrier))
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+  """Trace a block of code, recording exceptions raised in it.
+
+  Args:
+    name: Name of the span.
+    attributes: Span attributes, None values are left out.
+
+  Yields:
+    The span, or None without OpenTelemetry.
+
+  """
+  if trace is None:
+    yield None
+    return
+
+  attributes = {key: value for key, value in attributes.items() if value is not None}
+  with trace.get_tracer(__name__).start_as_current_span(name, attributes=attributes) as current:
+    yield current
+
+
+def current_trace_id() -> str | None:
+  """Get the ID of the trace being recorded, if any."""
+  if trace is None:
+    return None
+  span_context = trace.get_current_span().get_span_context()
+  if not span_context.is_valid or not span_context.trace_flags.sampled:
+    return None
+  return trace.format_trace_id(span_context.trace_id)
+
+
+def trace_environment() -> dict[str, str]:
+  """Get the environment variables continuing the current trace in a subprocess."""
+  if trace is None:
+    return {}
+  carrier: dict[str, str] = {}
+  TraceContextTextMapPropagator().inject(carrier)
+  return {"TRACEPARENT": carrier["traceparent"]} if "traceparent" in carrier else {}
+
+
+class TracedTransport(httpx.AsyncHTTPTransport):
+  """HTTP transport recording a span for every request, and its response when recording."""
+
+  async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+    """Send a request within a span."""
+    # The query holds the API keys
+    url = str(request.url.copy_with(query=None))
+    with (
+      span(f"HTTP {request.method}", **{"http.method": request.method, "http.url": url}) as current,
+      recorded(
+        "http",
+        method=request.method,
+        url=url,
+        params={key: value for key, value in request.url.params.items() if key != "apikey"},
+      ) as event,
+    ):
+      response = await super().handle_async_request(request)
+      if current is not None:
+        current.set_attribute("http.status_code", response.status_code)
+      if event is not None:
+        await response.aread()
+        event["status"] = response.status_code
+        event["body"] = response.text
+      return response
+
+
+def _read_spans(path: Path, trace_id: str) -> list[dict[str, Any]]:
+  """Read the spans of a trace from a trace file."""
+  if not path.exists():
+    return []
+  with path.open() as f:
+    spans = [json.loads(line) for line in f if trace_id in line]
+  return [s for s in spans if s["trace_id"] == trace_id]
+
+
+def read_trace(trace_id: str, started: datetime | None = None) -> list[dict[str, Any]]:
+  """Read the spans of a trace from the trace files, as a waterfall.
+
+  Args:
+    trace_id: ID of the trace.
+    started: UTC time the trace started at, to only read the files of its
+      days. Every kept file is read without it.
+
+  Returns:
+    Spans ordered by start time, with their depth in the trace and their
+    offset from the start of the trace and duration in milliseconds.
+
+  """
+  if started is None:
+    path = Path(settings.tracing_file)
+    spans = [
+      s
+      for day_file in sorted(path.parent.glob(f"{path.stem}-*{path.suffix}"))
+      for s in _read_spans(day_file, trace_id)
+    ]
+  else:
+    # The root span starts just before the execution is stored
+    day = (started - timedelta(minutes=1)).date()
+    spans = []
+    while True:
+      day_spans = _read_spans(trace_file(day), trace_id)
+      spans += day_spans
+      # Read the next day while the trace continues past midnight
+      if not day_spans or span_day(max(s["end"] for s in spans)) <= day:
+        break
+      day += timedelta(days=1)
+  if not spans:
+    return []
+
+  spans.sort(key=lambda s: s["start"])
+  parents = {s["span_id"]: s["parent_id"] for s in spans}
+  trace_start = spans[0]["start"]
+  for s in spans:
+    depth, parent = 0, s["parent_id"]
+    while parent in parents:
+      depth, parent = depth + 1, parents[parent]
+    s["depth"] = depth
+    s["offset_ms"] = (s["start"] - trace_start) / 1e6
+    s["duration_ms"] = (s["end"] - s["start"]) / 1e6
+  return spans
+
+
+def prune_traces() -> int:
+  """Delete the trace files older than tracing_retention_days.
+
+  Returns:
+    Number of deleted files.
+
+  """
+  path = Path(settings.tracing_file)
+  oldest = trace_file(datetime.now(timezone.utc).date() - timedelta(days=settings.tracing_retention_days))
+  deleted = 0
+  # ISO dates sort in day order
+  for day_file in path.parent.glob(f"{path.stem}-*{path.suffix}"):
+    if day_file.name < oldest.name:
+      day_file.unlink(missing_ok=True)
+      deleted += 1
+  return deleted
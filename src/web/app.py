@@ -1,54 +1,148 @@
 """Web application for the MCP client."""
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from datetime import datetime, timedelta
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import RedirectResponse, Response
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING, STATE_STOPPED
 from sqlalchemy import select
 
+from src.utilities.metrics import generate_metrics, metrics_available, setup_metrics
 from src.utilities.settings import Settings
+from src.utilities.tracing import setup_tracing
 from src.web.routes import prompts, schedules
-from src.web.scheduler import scheduler, schedule_async_job
-from src.web.database import async_session, DBSchedule
-from src.web.routes.schedules import execute_prompt_sync, parse_cron_expression
+from src.web.execution_events import execution_events
+from src.web.execution_queue import PRIORITY_ONE_TIME
+from src.web.leader import LeaderElection
+from src.web.retention import RETENTION_JOB_ID, apply_retention
+from src.web.scheduler import (
+  MISFIRE_GRACE_TIME,
+  SCHEDULER_LOCK_ID,
+  durable_queue,
+  execution_queue,
+  fired_one_time_jobs,
+  scheduler,
+  schedule_prompt,
+)
+from src.web.database import (
+  DBQueuedExecution,
+  DBSchedule,
+  DBScheduleExecution,
+  async_session,
+  engine,
+)
+from src.web.routes.schedules import parse_cron_expression
 
 settings = Settings()
 
 async def load_existing_schedules():
-  """Load existing schedules from database into scheduler."""
-  # Clear any existing jobs first
-  scheduler.remove_all_jobs()
+  """Reconcile the scheduler jobs with the schedules in the database.
 
+  Schedules created or deleted through another worker are picked up here,
+  existing jobs are kept so their next run time is not reset. One-time
+  schedules due within the misfire grace time still run, unless they
+  already ran on this or a previous leader.
+  """
+  late = datetime.utcnow() - timedelta(seconds=MISFIRE_GRACE_TIME)
   async with async_session() as db:
     result = await db.execute(select(DBSchedule))
     existing_schedules = result.scalars().all()
+    due_ids = [
+      schedule.id
+      for schedule in existing_schedules
+      if schedule.schedule_type == "one_time"
+      and schedule.run_at
+      and late < schedule.run_at <= datetime.utcnow()
+    ]
+    started = set()
+    if due_ids:
+      for model in (DBScheduleExecution, DBQueuedExecution):
+        started.update((await db.execute(
+          select(model.schedule_id).where(model.schedule_id.in_(due_ids)).distinct()
+        )).scalars())
+
+  job_ids = set()
+  for schedule in existing_schedules:
+    job_id = f"{schedule.schedule_type}_{schedule.id}"
+    job_ids.add(job_id)
+    if scheduler.get_job(job_id):
+      continue
+
+    if (
+      schedule.schedule_type == "one_time"
+      and schedule.run_at
+      and schedule.run_at > late
+      and schedule.id not in started
+      and job_id not in fired_one_time_jobs
+    ):
+      schedule_prompt(
+        "date",
+        schedule.prompt_id,
+        schedule.id,
+        priority=PRIORITY_ONE_TIME,
+        run_date=schedule.run_at,
+        id=job_id,  # Unique job ID
+        replace_existing=True  # Replace if exists
+      )
+    elif schedule.schedule_type == "recurring" and schedule.cron_expression:
+      schedule_prompt(
+        "cron",
+        schedule.prompt_id,
+        schedule.id,
+        id=job_id,  # Unique job ID
+        replace_existing=True,  # Replace if exists
+        **parse_cron_expression(schedule.cron_expression)
+      )
+
+  # Remove jobs of deleted schedules
+  for job in scheduler.get_jobs():
+    if job.id.startswith(("one_time_", "recurring_")) and job.id not in job_ids:
+      job.remove()
+
+async def lead():
+  """Fire scheduled jobs while this worker is the leader."""
+  await load_existing_schedules()
+  if not scheduler.get_job(RETENTION_JOB_ID):
+    scheduler.add_job(
+      apply_retention,
+      "interval",
+      seconds=settings.execution_retention_interval,
+      id=RETENTION_JOB_ID,
+    )
+  if scheduler.state == STATE_STOPPED:
+    scheduler.start()
+  elif scheduler.state == STATE_PAUSED:
+    scheduler.resume()
+
+async def follow():
+  """Stop firing scheduled jobs after losing leadership."""
+  if scheduler.state == STATE_RUNNING:
+    scheduler.pause()
+  scheduler.remove_all_jobs()
 
-    for schedule in existing_schedules:
-      if schedule.schedule_type == "one_time" and schedule.run_at:
-        schedule_async_job(
-          execute_prompt_sync,
-          "date",
-          run_date=schedule.run_at,
-          args=[schedule.prompt_id, schedule.id],
-          id=f"one_time_{schedule.id}",  # Unique job ID
-          replace_existing=True  # Replace if exists
-        )
-      elif schedule.schedule_type == "recurring" and schedule.cron_expression:
-        schedule_async_job(
-          execute_prompt_sync,
-          "cron",
-          args=[schedule.prompt_id, schedule.id],
-          id=f"recurring_{schedule.id}",  # Unique job ID
-          replace_existing=True,  # Replace if exists
-          **parse_cron_expression(schedule.cron_expression)
-        )
+# Only one worker fires the scheduled jobs, the others take over if it dies
+leader_election = LeaderElection(
+  engine,
+  SCHEDULER_LOCK_ID,
+  settings.leader_check_interval,
+  lead,
+  follow,
+)
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
   """Lifespan context manager for the web application."""
-  await load_existing_schedules()
-  scheduler.start()
+  setup_metrics()
+  setup_tracing("web")
+  execution_events.start()
+  execution_queue.start()
+  leader_election.start()
   yield
-  scheduler.shutdown()
+  await leader_election.stop()
+  if scheduler.state != STATE_STOPPED:
+    scheduler.shutdown()
+  await execution_queue.stop()
+  await execution_events.stop()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -59,3 +153,13 @@ app.include_router(schedules.router)
 async def root():
   """Redirect root to chats page."""
   return RedirectResponse(url="/prompts", status_code=303)
+
+@app.get("/metrics")
+async def metrics():
+  """Prometheus metrics of all processes of this host."""
+  if not metrics_available():
+    raise HTTPException(status_code=503, detail="prometheus_client is not installed")
+  if settings.execution_queue_backend == "postgres":
+    await durable_queue.depth()
+  content, content_type = generate_metrics()
+  return Response(content, media_type=content_type)
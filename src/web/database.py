@@ -2,8 +2,8 @@
 import os
 from collections.abc import AsyncGenerator
 from datetime import datetime
-from sqlalchemy import ForeignKey, Enum, String
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import Connection, ForeignKey, Enum, Index, LargeBinary, String, func, inspect, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, query_expression, relationship
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from src.utilities.settings import Settings
 
@@ -22,6 +22,10 @@ class DBPrompt(Base):
   id: Mapped[int] = mapped_column(primary_key=True)
   content: Mapped[str] = mapped_column(String(settings.max_prompt_length))
   created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+  # Budget overrides of the query_max_* settings
+  max_tokens: Mapped[int | None]
+  max_iterations: Mapped[int | None]
+  max_seconds: Mapped[float | None]
   schedules: Mapped[list["DBSchedule"]] = relationship(back_populates="prompt")
 
 class DBSchedule(Base):
@@ -40,6 +44,9 @@ class DBSchedule(Base):
   prompt: Mapped[DBPrompt] = relationship(back_populates="schedules")
   executions: Mapped[list["DBScheduleExecution"]] = relationship(back_populates="schedule", order_by="desc(DBScheduleExecution.executed_at)")
 
+  # Schedule counts of the prompts of a page
+  __table_args__ = (Index("ix_schedules_prompt_id", "prompt_id"),)
+
 class DBScheduleExecution(Base):
   """Schedule execution history model."""
 
@@ -51,9 +58,80 @@ class DBScheduleExecution(Base):
   status: Mapped[str] = mapped_column(Enum("pending", "success", "error", name="execution_status"))
   result: Mapped[str | None]
   error: Mapped[str | None]
+  trace_id: Mapped[str | None] = mapped_column(String(32))
+  input_tokens: Mapped[int | None]
+  output_tokens: Mapped[int | None]
+  cache_creation_tokens: Mapped[int | None]
+  cache_read_tokens: Mapped[int | None]
+  tool_calls: Mapped[int | None]
+  iterations: Mapped[int | None]
+  cost: Mapped[float | None]  # USD
+  recording: Mapped[str | None] = mapped_column(String(255))  # archive path, for replay
+  result_preview: Mapped[str | None] = query_expression()
   schedule: Mapped["DBSchedule | None"] = relationship(back_populates="executions")
   prompt: Mapped["DBPrompt | None"] = relationship(foreign_keys=[prompt_id])
 
+  # Keyset pagination on (executed_at, id), alone or after an equality filter
+  __table_args__ = (
+    Index("ix_executions_executed_at_id", "executed_at", "id"),
+    Index("ix_executions_status_executed_at_id", "status", "executed_at", "id"),
+    Index("ix_executions_prompt_executed_at_id", "prompt_id", "executed_at", "id"),
+    Index("ix_executions_schedule_executed_at_id", "schedule_id", "executed_at", "id"),
+  )
+
+# Tokens of an execution, including prompt cache reads and writes
+execution_tokens = (
+  func.coalesce(DBScheduleExecution.input_tokens, 0)
+  + func.coalesce(DBScheduleExecution.output_tokens, 0)
+  + func.coalesce(DBScheduleExecution.cache_creation_tokens, 0)
+  + func.coalesce(DBScheduleExecution.cache_read_tokens, 0)
+)
+
+class DBExecutionResult(Base):
+  """Compressed full result of an execution, kept off the executions table."""
+
+  __tablename__ = "execution_results"
+  execution_id: Mapped[int] = mapped_column(ForeignKey("executions.id", ondelete="CASCADE"), primary_key=True)
+  codec: Mapped[str] = mapped_column(String(8))
+  data: Mapped[bytes] = mapped_column(LargeBinary)
+  size: Mapped[int]
+
+class DBExecutionRollup(Base):
+  """Daily execution counts per prompt, kept after executions are pruned."""
+
+  __tablename__ = "execution_rollups"
+  day: Mapped[datetime] = mapped_column(primary_key=True)
+  prompt_id: Mapped[int] = mapped_column(primary_key=True)  # 0 for deleted prompts
+  success_count: Mapped[int] = mapped_column(default=0)
+  error_count: Mapped[int] = mapped_column(default=0)
+  total_count: Mapped[int] = mapped_column(default=0)
+  total_tokens: Mapped[int | None]
+  total_cost: Mapped[float | None]  # USD
+  last_executed_at: Mapped[datetime | None]
+
+class DBQueuedExecution(Base):
+  """Durable execution queue model, consumed by the executor workers."""
+
+  __tablename__ = "execution_queue"
+  id: Mapped[int] = mapped_column(primary_key=True)
+  prompt_id: Mapped[int] = mapped_column(ForeignKey("prompts.id", ondelete="CASCADE"))
+  schedule_id: Mapped[int | None] = mapped_column(ForeignKey("schedules.id", ondelete="SET NULL"), nullable=True)
+  priority: Mapped[int]
+  status: Mapped[str] = mapped_column(
+    Enum("queued", "running", "done", "dead", name="queue_status"),
+    default="queued",
+  )
+  attempts: Mapped[int] = mapped_column(default=0)
+  available_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+  locked_until: Mapped[datetime | None]
+  locked_by: Mapped[str | None]
+  last_error: Mapped[str | None]
+  created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+  __table_args__ = (
+    Index("ix_execution_queue_claim", "status", "priority", "available_at"),
+  )
+
 engine = create_async_engine(
   f"postgresql+asyncpg://postgres:postgres@{settings.database_host}:{settings.database_port}/ibkr_mcp",
   echo=False,
@@ -78,7 +156,23 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     finally:
       await session.close()
 
+def add_missing_columns(conn: Connection) -> None:
+  """Add the nullable columns introduced after a table was created."""
+  inspector = inspect(conn)
+  for table in Base.metadata.sorted_tables:
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+      if column.name not in existing and column.nullable:
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
 async def init_db() -> None:
   """Initialize the database. This is used in the init_db.sh script."""
   async with engine.begin() as conn:
     await conn.run_sync(Base.metadata.create_all)
+
+    # create_all skips existing tables, add columns and indexes introduced later
+    await conn.run_sync(add_missing_columns)
+    for table in Base.metadata.sorted_tables:
+      for index in table.indexes:
+        await conn.run_sync(index.create, checkfirst=True)
@@ -0,0 +1,311 @@
+"""Durable execution queue stored in Postgres."""
+import asyncio
+import os
+import socket
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from loguru import logger
+from sqlalchemy import and_, func, or_, select, update
+
+from src.utilities.metrics import QUEUE_DEPTH, QUEUE_WAIT
+from src.web.database import DBQueuedExecution, async_session
+from src.web.execution_queue import backoff_delay
+
+
+def _utcnow():
+  """Database time as naive UTC, matching the stored timestamps."""
+  return func.timezone("utc", func.now())
+
+
+class DurableExecutionQueue:
+  """Execution queue consumed by any number of executor worker processes.
+
+  Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+  workers never claim the same job. A claimed job stays invisible for
+  ``visibility_timeout`` seconds, extended while it runs, and becomes
+  visible again if its worker dies. A worker only updates a job while it
+  holds the lease of its claim, a job claimed again by another worker
+  belongs to that worker. Failed jobs are retried with
+  exponential backoff and dead-lettered after ``max_attempts``.
+
+  Available public methods:
+    - enqueue: add an execution to the queue
+    - claim: claim the next visible execution
+    - complete: mark a claimed execution as done
+    - fail: retry or dead-letter a claimed execution
+    - run: consume the queue until cancelled
+    - depth: count the waiting executions
+  """
+
+  def __init__(
+    self,
+    max_size: int,
+    max_attempts: int,
+    retry_delay: float,
+    visibility_timeout: int,
+    poll_interval: float,
+  ) -> None:
+    """Initialize the queue.
+
+    Args:
+      max_size: Maximum number of waiting executions.
+      max_attempts: Attempts before an execution is dead-lettered.
+      retry_delay: Delay before the first retry, doubled for every attempt.
+      visibility_timeout: Seconds a claimed execution stays invisible
+        without a heartbeat from its worker.
+      poll_interval: Seconds between polls of an empty queue.
+
+    """
+    self.max_size = max_size
+    self.max_attempts = max_attempts
+    self.retry_delay = retry_delay
+    self.visibility_timeout = visibility_timeout
+    self.poll_interval = poll_interval
+
+  async def enqueue(
+    self,
+    priority: int,
+    prompt_id: int,
+    schedule_id: int | None = None,
+  ) -> bool:
+    """Add an execution to the queue.
+
+    Args:
+      priority: Execution priority, lower values run first.
+      prompt_id: ID of the prompt to run.
+      schedule_id: ID of the schedule that triggered the run, if any.
+
+    Returns:
+      False if the queue is full and the execution was rejected.
+
+    """
+    async with async_session() as db:
+      waiting = await db.scalar(
+        select(func.count())
+        .select_from(DBQueuedExecution)
+        .where(DBQueuedExecution.status == "queued"),
+      )
+      if waiting >= self.max_size:
+        logger.warning(
+          "Execution queue full ({} waiting), rejecting prompt {}",
+          waiting,
+          prompt_id,
+        )
+        return False
+
+      db.add(DBQueuedExecution(
+        prompt_id=prompt_id,
+        schedule_id=schedule_id,
+        priority=priority,
+      ))
+      await db.commit()
+    QUEUE_DEPTH.labels(backend="postgres").set(waiting + 1)
+    logger.debug("Queued prompt {} with priority {}", prompt_id, priority)
+    return True
+
+  async def depth(self) -> int:
+    """Count the executions waiting in the queue."""
+    async with async_session() as db:
+      waiting = await db.scalar(
+        select(func.count())
+        .select_from(DBQueuedExecution)
+        .where(DBQueuedExecution.status == "queued"),
+      )
+    QUEUE_DEPTH.labels(backend="postgres").set(waiting)
+    return waiting
+
+  async def claim(self, worker_id: str) -> DBQueuedExecution | None:
+    """Claim the next visible execution.
+
+    Args:
+      worker_id: Identifier of the claiming worker.
+
+    Returns:
+      The claimed execution, or None if the queue is empty.
+
+    """
+    visible = or_(
+      and_(
+        DBQueuedExecution.status == "queued",
+        DBQueuedExecution.available_at <= _utcnow(),
+      ),
+      and_(
+        DBQueuedExecution.status == "running",
+        DBQueuedExecution.locked_until < _utcnow(),
+      ),
+    )
+    next_id = (
+      select(DBQueuedExecution.id)
+      .where(visible)
+      .order_by(
+        DBQueuedExecution.priority,
+        DBQueuedExecution.available_at,
+        DBQueuedExecution.id,
+      )
+      .limit(1)
+      .with_for_update(skip_locked=True)
+      .scalar_subquery()
+    )
+    async with async_session() as db:
+      job = await db.scalar(
+        update(DBQueuedExecution)
+        .where(DBQueuedExecution.id == next_id)
+        .values(
+          status="running",
+          attempts=DBQueuedExecution.attempts + 1,
+          locked_by=worker_id,
+          locked_until=_utcnow() + timedelta(seconds=self.visibility_timeout),
+        )
+        .returning(DBQueuedExecution)
+        .execution_options(synchronize_session=False),
+      )
+      await db.commit()
+    return job
+
+  async def complete(self, job: DBQueuedExecution) -> None:
+    """Mark a claimed execution as done."""
+    await self._update(job, status="done", locked_until=None)
+
+  async def fail(self, job: DBQueuedExecution, error: str) -> None:
+    """Retry a failed execution later, or dead-letter it.
+
+    Args:
+      job: Claimed execution that failed.
+      error: Reason of the failure.
+
+    """
+    if job.attempts >= self.max_attempts:
+      logger.error(
+        "Prompt {} failed {} times, moving to dead letters: {}",
+        job.prompt_id,
+        job.attempts,
+        error,
+      )
+      await self._update(job, status="dead", locked_until=None, last_error=error)
+      return
+
+    delay = backoff_delay(job.attempts, self.retry_delay)
+    logger.warning(
+      "Prompt {} failed (attempt {}), retrying in {} seconds: {}",
+      job.prompt_id,
+      job.attempts,
+      delay,
+      error,
+    )
+    await self._update(
+      job,
+      status="queued",
+      locked_until=None,
+      last_error=error,
+      available_at=_utcnow() + timedelta(seconds=delay),
+    )
+
+  async def run(
+    self,
+    execute: Callable[[int, int | None], Awaitable[bool]],
+    concurrency: int,
+  ) -> None:
+    """Consume the queue until cancelled.
+
+    Args:
+      execute: Coroutine function running a prompt, returns False on failure.
+      concurrency: Number of executions running at the same time.
+
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Executor worker {} started with {} slots", worker_id, concurrency)
+    await asyncio.gather(*(
+      self._consume(execute, worker_id) for _ in range(concurrency)
+    ))
+
+  async def _consume(
+    self,
+    execute: Callable[[int, int | None], Awaitable[bool]],
+    worker_id: str,
+  ) -> None:
+    """Claim and run executions one at a time."""
+    while True:
+      try:
+        job = await self.claim(worker_id)
+      except Exception as e:
+        logger.error("Error claiming execution: {}", str(e))
+        job = None
+
+      if job is None:
+        await asyncio.sleep(self.poll_interval)
+        continue
+
+      try:
+        await self._process(job, execute)
+      except Exception as e:
+        # The job becomes visible again after its visibility timeout
+        logger.error("Error processing execution {}: {}", job.id, str(e))
+
+  async def _process(
+    self,
+    job: DBQueuedExecution,
+    execute: Callable[[int, int | None], Awaitable[bool]],
+  ) -> None:
+    """Run a claimed execution and record the outcome."""
+    if job.attempts > self.max_attempts:
+      # Claimed again after its worker died on the last attempt
+      await self.fail(job, f"Worker {job.locked_by} stopped responding")
+      return
+
+    if job.available_at is not None:
+      waited = (datetime.utcnow() - job.available_at).total_seconds()
+      QUEUE_WAIT.labels(backend="postgres").observe(max(waited, 0))
+    heartbeat = asyncio.create_task(self._heartbeat(job))
+    try:
+      succeeded = await execute(job.prompt_id, job.schedule_id)
+      error = "Execution failed, see the execution history"
+    except Exception as e:
+      succeeded = False
+      error = str(e)
+    finally:
+      heartbeat.cancel()
+
+    if succeeded:
+      await self.complete(job)
+    else:
+      await self.fail(job, error)
+
+  async def _heartbeat(self, job: DBQueuedExecution) -> None:
+    """Keep a running execution invisible to other workers, while it holds the lease."""
+    while True:
+      await asyncio.sleep(self.visibility_timeout / 3)
+      try:
+        if not await self._update(
+          job,
+          locked_until=_utcnow() + timedelta(seconds=self.visibility_timeout),
+        ):
+          return
+      except Exception as e:
+        logger.error("Error extending execution {}: {}", job.id, str(e))
+
+  @staticmethod
+  async def _update(job: DBQueuedExecution, **values: object) -> bool:
+    """Update a claimed execution, if this claim still holds its lease.
+
+    Returns:
+      False if the lease was lost, the execution was claimed again after
+      its visibility timeout and is left to its new owner.
+
+    """
+    async with async_session() as db:
+      result = await db.execute(
+        update(DBQueuedExecution)
+        .where(
+          DBQueuedExecution.id == job.id,
+          DBQueuedExecution.status == "running",
+          DBQueuedExecution.locked_by == job.locked_by,
+          DBQueuedExecution.attempts == job.attempts,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False),
+      )
+      await db.commit()
+    if result.rowcount == 0:
+      logger.warning("Lost the lease of execution {}, claimed again by another worker", job.id)
+      return False
+    return True
@@ -0,0 +1,166 @@
+"""Live execution events shared between processes through Postgres NOTIFY."""
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.web.database import engine
+from src.utilities.settings import Settings
+
+settings = Settings()
+
+CHANNEL = "execution_events"
+
+# NOTIFY payloads are limited to 8000 bytes
+MAX_TEXT_LENGTH = 4000
+
+
+class ExecutionEventBroker:
+  """Publish execution events and fan them out to subscribers in any process.
+
+  Every process keeps one dedicated connection which sends events with
+  NOTIFY and LISTENs to the events of all processes, so a stream can be
+  served by a web worker other than the one running the execution. Events
+  are delivered at most once: subscribers that fall behind lose their
+  oldest events.
+
+  Available public methods:
+    - start: start listening for events
+    - stop: stop listening and close the connection
+    - publish: send an event of an execution
+    - subscribe: receive the events of one or all executions
+  """
+
+  def __init__(self, engine: AsyncEngine, queue_size: int, reconnect_delay: float = 5) -> None:
+    """Initialize the broker.
+
+    Args:
+      engine: Database engine.
+      queue_size: Maximum events buffered for a subscriber.
+      reconnect_delay: Seconds to wait before reconnecting a lost connection.
+
+    """
+    self.engine = engine
+    self.queue_size = queue_size
+    self.reconnect_delay = reconnect_delay
+    self._connection: AsyncConnection | None = None
+    self._lock = asyncio.Lock()
+    self._listening = False
+    self._subscribers: set[tuple[int | None, asyncio.Queue]] = set()
+    self._task: asyncio.Task | None = None
+
+  def start(self) -> None:
+    """Start listening for events."""
+    if self._task is None:
+      self._task = asyncio.create_task(self._run(), name="execution-events")
+
+  async def stop(self) -> None:
+    """Stop listening and close the connection."""
+    if self._task is not None:
+      self._task.cancel()
+      await asyncio.gather(self._task, return_exceptions=True)
+      self._task = None
+    await self._close()
+
+  async def publish(self, execution_id: int, event: dict) -> None:
+    """Send an event of an execution to all processes.
+
+    Publishing never fails the execution, errors are logged and the event
+    is dropped.
+
+    Args:
+      execution_id: Execution the event belongs to.
+      event: JSON serializable event with a "type" key.
+
+    """
+    event = {"execution_id": execution_id, **event}
+    if isinstance(event.get("text"), str):
+      event["text"] = event["text"][:MAX_TEXT_LENGTH]
+    try:
+      async with self._lock:
+        driver = await self._driver()
+        await driver.execute("SELECT pg_notify($1, $2)", CHANNEL, json.dumps(event, default=str))
+    except Exception as e:
+      logger.warning("Error publishing execution event: {}", str(e))
+      await self._close()
+
+  @asynccontextmanager
+  async def subscribe(self, execution_id: int | None = None) -> AsyncIterator[asyncio.Queue]:
+    """Receive the events of an execution, or of all executions.
+
+    Args:
+      execution_id: Execution to receive the events of, None for all.
+
+    Yields:
+      Queue the events are put in.
+
+    """
+    subscriber = (execution_id, asyncio.Queue(self.queue_size))
+    self._subscribers.add(subscriber)
+    try:
+      yield subscriber[1]
+    finally:
+      self._subscribers.discard(subscriber)
+
+  def dispatch(self, event: dict) -> None:
+    """Put an event in the queues of its subscribers."""
+    for execution_id, queue in list(self._subscribers):
+      if execution_id is not None and execution_id != event.get("execution_id"):
+        continue
+      if queue.full():
+        queue.get_nowait()
+      queue.put_nowait(event)
+
+  def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+    """Handle a notification from the listening connection."""
+    try:
+      self.dispatch(json.loads(payload))
+    except ValueError:
+      logger.warning("Invalid execution event payload: {}", payload)
+
+  async def _driver(self):
+    """Get the asyncpg connection, connecting if needed."""
+    if self._connection is None:
+      self._connection = await self.engine.connect()
+    raw = await self._connection.get_raw_connection()
+    return raw.driver_connection
+
+  async def _run(self) -> None:
+    """Listen for events, reconnecting when the connection is lost."""
+    while True:
+      try:
+        async with self._lock:
+          driver = await self._driver()
+          await driver.add_listener(CHANNEL, self._on_notify)
+          self._listening = True
+        lost = asyncio.Event()
+        driver.add_termination_listener(lambda connection: lost.set())
+        await lost.wait()
+        logger.warning("Execution events connection lost, reconnecting")
+      except asyncio.CancelledError:
+        raise
+      except Exception as e:
+        logger.error("Error listening for execution events: {}", str(e))
+      await self._close()
+      await asyncio.sleep(self.reconnect_delay)
+
+  async def _close(self) -> None:
+    """Discard the dedicated connection."""
+    if self._connection is None:
+      return
+    connection, self._connection = self._connection, None
+    try:
+      if self._listening:
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.remove_listener(CHANNEL, self._on_notify)
+      # Invalidate instead of returning a listening session to the pool
+      await connection.invalidate()
+      await connection.close()
+    except Exception as e:
+      logger.debug("Error closing execution events connection: {}", str(e))
+    self._listening = False
+
+
+execution_events = ExecutionEventBroker(engine, settings.execution_events_queue_size)
@@ -0,0 +1,105 @@
+"""Priority queue for prompt executions."""
+import asyncio
+import itertools
+import time
+from collections.abc import Awaitable, Callable
+from loguru import logger
+
+from src.utilities.metrics import QUEUE_DEPTH, QUEUE_WAIT
+
+# Lower values run first
+PRIORITY_MANUAL = 0
+PRIORITY_ONE_TIME = 1
+PRIORITY_RECURRING = 2
+
+
+def backoff_delay(attempt: int, base: float) -> float:
+  """Exponential backoff delay before retrying after the given attempt."""
+  return base * 2 ** (attempt - 1)
+
+
+class ExecutionQueue:
+  """Bounded priority queue drained by a fixed number of workers.
+
+  Scheduled jobs only enqueue their execution, so a burst of cron triggers
+  runs at most ``max_concurrent`` prompts at a time, highest priority first.
+  When the queue is full new executions are rejected instead of piling up.
+
+  Available public methods:
+    - start: start the workers
+    - stop: cancel the workers
+    - submit: enqueue an execution
+  """
+
+  def __init__(self, max_concurrent: int, max_size: int) -> None:
+    """Initialize the queue.
+
+    Args:
+      max_concurrent: Number of executions running at the same time.
+      max_size: Maximum number of waiting executions.
+
+    """
+    self.max_concurrent = max_concurrent
+    self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_size)
+    self.workers: list[asyncio.Task] = []
+    self._sequence = itertools.count()
+
+  def start(self) -> None:
+    """Start the workers."""
+    if self.workers:
+      return
+    self.workers = [
+      asyncio.create_task(self._worker(), name=f"execution-worker-{index}")
+      for index in range(self.max_concurrent)
+    ]
+
+  async def stop(self) -> None:
+    """Cancel the workers, waiting executions are dropped."""
+    for worker in self.workers:
+      worker.cancel()
+    await asyncio.gather(*self.workers, return_exceptions=True)
+    self.workers = []
+
+  def submit(
+    self,
+    priority: int,
+    func: Callable[..., Awaitable[None]],
+    *args: object,
+  ) -> bool:
+    """Enqueue an execution.
+
+    Args:
+      priority: Execution priority, lower values run first.
+      func: Coroutine function running the execution.
+      args: Arguments of the coroutine function.
+
+    Returns:
+      False if the queue is full and the execution was rejected.
+
+    """
+    try:
+      self.queue.put_nowait((priority, next(self._sequence), time.monotonic(), func, args))
+    except asyncio.QueueFull:
+      logger.warning(
+        "Execution queue full ({} waiting), rejecting {}{}",
+        self.queue.qsize(),
+        func.__name__,
+        args,
+      )
+      return False
+    QUEUE_DEPTH.labels(backend="local").set(self.queue.qsize())
+    logger.debug("Queued {}{} with priority {}", func.__name__, args, priority)
+    return True
+
+  async def _worker(self) -> None:
+    """Run queued executions one at a time."""
+    while True:
+      _, _, queued_at, func, args = await self.queue.get()
+      QUEUE_DEPTH.labels(backend="local").set(self.queue.qsize())
+      QUEUE_WAIT.labels(backend="local").observe(time.monotonic() - queued_at)
+      try:
+        await func(*args)
+      except Exception:
+        logger.exception("Error running {}{}", func.__name__, args)
+      finally:
+        self.queue.task_done()
@@ -0,0 +1,152 @@
+"""Prompt executions for scheduled and manual runs."""
+import asyncio
+from functools import partial
+from pathlib import Path
+from loguru import logger
+from sqlalchemy import select
+
+from mcp_client import BudgetExceededError, MCPClient, QueryBudget
+from src.web.database import DBSchedule, DBPrompt, DBScheduleExecution, async_session
+from src.web.execution_events import execution_events
+from src.web.result_store import result_store
+from src.utilities.metrics import EXECUTION_TOKENS, EXECUTIONS
+from src.utilities.recording import Recorder
+from src.utilities.response_cache import ResponseCache
+from src.utilities.settings import Settings
+from src.utilities.tracing import current_trace_id, span
+
+settings = Settings()
+
+# Limits shared by all executions of this process, keyed by MCP server name,
+# plus the LLM API
+resource_limits = {
+  "ibkr": asyncio.Semaphore(settings.max_concurrent_ib_requests),
+  "llm": asyncio.Semaphore(settings.max_concurrent_llm_requests),
+}
+
+# Answers of repeated prompts, reused while their tool inputs are unchanged
+response_cache = ResponseCache(
+  settings.response_cache_dir,
+  settings.response_cache_ttl,
+  settings.response_cache_quote_bucket,
+  settings.response_cache_tool_ttl,
+) if settings.response_cache_ttl > 0 else None
+
+
+def prompt_budget(prompt: DBPrompt) -> QueryBudget:
+  """Get the budget of a prompt, its overrides or the query_max_* settings."""
+  return QueryBudget(
+    prompt.max_tokens or settings.query_max_tokens,
+    prompt.max_iterations or settings.query_max_iterations,
+    prompt.max_seconds or settings.query_max_seconds,
+  )
+
+
+def record_usage(execution: DBScheduleExecution, usage: dict[str, int]) -> None:
+  """Store the token usage, tool calls and cost of a query on its execution."""
+  execution.input_tokens = usage["input_tokens"]
+  execution.output_tokens = usage["output_tokens"]
+  execution.cache_creation_tokens = usage["cache_creation_input_tokens"]
+  execution.cache_read_tokens = usage["cache_read_input_tokens"]
+  execution.tool_calls = usage["tool_calls"]
+  execution.iterations = usage["iterations"]
+  execution.cost = (
+    usage["input_tokens"] * settings.llm_input_price
+    + usage["output_tokens"] * settings.llm_output_price
+    + usage["cache_creation_input_tokens"] * settings.llm_cache_write_price
+    + usage["cache_read_input_tokens"] * settings.llm_cache_read_price
+  ) / 1_000_000
+
+
+async def save_recording(execution: DBScheduleExecution, recorder: Recorder) -> None:
+  """Write the recording of a finished execution and link it to the execution."""
+  path = Path(settings.recording_dir) / f"{execution.id}.jsonl.gz"
+  try:
+    execution.recording = str(await asyncio.to_thread(recorder.save, path))
+  except OSError as e:
+    logger.warning("Error saving the recording of execution {}: {}", execution.id, str(e))
+
+
+async def execute_prompt_sync(prompt_id: int, schedule_id: int | None = None) -> bool:
+  """Run a prompt and record the execution.
+
+  Args:
+    prompt_id: ID of the prompt to run.
+    schedule_id: ID of the schedule that triggered the run, if any.
+
+  Returns:
+    False if the execution failed and may be retried. Executions stopped by
+    their budget, or that called an order tool, are not retried, so a
+    failure after an order never places it again.
+
+  """
+  async with async_session() as db:
+    # Get the prompt
+    prompt = await db.get(DBPrompt, prompt_id)
+    if not prompt:
+      logger.warning("Prompt {} not found, skipping execution", prompt_id)
+      return True
+
+    # Get the schedule if schedule_id is provided
+    schedule = None
+    if schedule_id:
+      query = select(DBSchedule).filter(DBSchedule.id == schedule_id)
+      result = await db.execute(query)
+      schedule = result.scalar_one_or_none()
+
+    with span("execution", prompt_id=prompt_id, schedule_id=schedule_id):
+      # Create execution record with initial status
+      execution = DBScheduleExecution(
+        schedule_id=schedule.id if schedule else None,
+        prompt=prompt,
+        status="pending",  # Set initial status
+        trace_id=current_trace_id(),
+      )
+      db.add(execution)
+      # Commit the pending execution so it is listed while it runs
+      await db.commit()
+      publish = partial(execution_events.publish, execution.id)
+      await publish({"type": "status", "status": execution.status})
+
+      recorder = Recorder() if settings.recording_enabled else None
+      mcp_client = MCPClient(
+        settings,
+        resource_limits,
+        on_event=publish,
+        response_cache=response_cache,
+        recorder=recorder,
+      )
+      retry = True
+      try:
+        await mcp_client.connect_to_server()
+        result = await mcp_client.process_query(prompt.content, prompt_budget(prompt))
+        execution.status = "success"
+        await result_store.save(db, execution, str(result))
+      except BudgetExceededError as e:
+        logger.warning("Prompt {} stopped: {}", prompt_id, str(e))
+        execution.status = "error"
+        execution.error = str(e)
+        await result_store.save(db, execution, e.partial_result)
+        retry = False
+      except Exception as e:
+        logger.error("Error executing prompt {}: {}", prompt_id, str(e))
+        execution.status = "error"
+        execution.error = str(e)
+        if mcp_client.called_order_tool:
+          logger.warning("Prompt {} called an order tool, not retrying", prompt_id)
+          retry = False
+      finally:
+        try:
+          await mcp_client.cleanup()
+        finally:
+          # Saved once the server exited, also removing its event file
+          if recorder is not None:
+            await save_recording(execution, recorder)
+        record_usage(execution, mcp_client.usage)
+        await db.commit()
+        await publish({"type": "status", "status": execution.status})
+        EXECUTIONS.labels(status=execution.status).inc()
+        for direction in ("input", "output"):
+          EXECUTION_TOKENS.labels(direction=direction).observe(mcp_client.usage[f"{direction}_tokens"])
+
+  return execution.status == "success" or not retry
@@ -6,7 +6,7 @@ import os
 bind = "0.0.0.0:8000"  # Listen on all interfaces
 backlog = 2048
 
-# Worker processes
+# Worker processes, scheduled jobs fire in the elected leader only (src/web/leader.py)
 workers = multiprocessing.cpu_count() * 2 + 1  # Recommended formula for CPU-bound apps
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
@@ -47,6 +47,16 @@ proxy_allow_ips = "*"  # Trust proxy protocol from Nginx
 def on_starting(server):
   """Log when server starts."""
   server.log.info("Starting IBKR MCP Server")
+  # Imported in the hooks, the project is on the path once gunicorn started
+  from src.utilities.metrics import reset_metrics_dir, setup_metrics
+  # The workers inherit the metrics directory
+  setup_metrics()
+  reset_metrics_dir()
+
+def child_exit(server, worker):
+  """Drop the live metrics of an exited worker."""
+  from src.utilities.metrics import mark_process_dead
+  mark_process_dead(worker.pid)
 
 def on_exit(server):
   """Log when server exits."""
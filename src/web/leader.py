@@ -0,0 +1,115 @@
+"""Leader election between web workers through a Postgres advisory lock."""
+import asyncio
+from collections.abc import Awaitable, Callable
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+class LeaderElection:
+  """Elect a single leader among processes sharing a database.
+
+  The leader holds a session-level advisory lock on a dedicated connection.
+  If the leader process dies its session ends, the lock is released and
+  another process takes over on its next check.
+
+  Available public methods:
+    - start: start competing for leadership
+    - stop: stop and release leadership
+  """
+
+  def __init__(
+    self,
+    engine: AsyncEngine,
+    lock_id: int,
+    interval: float,
+    lead: Callable[[], Awaitable[None]],
+    follow: Callable[[], Awaitable[None]],
+  ) -> None:
+    """Initialize the election.
+
+    Args:
+      engine: Database engine.
+      lock_id: Advisory lock key, identical for all competing processes.
+      interval: Seconds between leadership checks.
+      lead: Called after every check while this process is the leader.
+      follow: Called once when this process loses leadership.
+
+    """
+    self.engine = engine
+    self.lock_id = lock_id
+    self.interval = interval
+    self.lead = lead
+    self.follow = follow
+    self.is_leader = False
+    self._connection: AsyncConnection | None = None
+    self._task: asyncio.Task | None = None
+
+  def start(self) -> None:
+    """Start competing for leadership."""
+    if self._task is None:
+      self._task = asyncio.create_task(self._run(), name="leader-election")
+
+  async def stop(self) -> None:
+    """Stop competing and release leadership."""
+    if self._task is not None:
+      self._task.cancel()
+      await asyncio.gather(self._task, return_exceptions=True)
+      self._task = None
+    if self.is_leader:
+      await self._step_down()
+    await self._close()
+
+  async def _run(self) -> None:
+    """Check leadership every interval."""
+    while True:
+      try:
+        await self._check()
+        if self.is_leader:
+          await self.lead()
+      except Exception as e:
+        logger.error("Leader election error: {}", str(e))
+        if self.is_leader:
+          await self._step_down()
+        await self._close()
+      await asyncio.sleep(self.interval)
+
+  async def _check(self) -> None:
+    """Acquire the lock, or make sure the session holding it is alive."""
+    if self._connection is None:
+      self._connection = await self.engine.connect()
+
+    if self.is_leader:
+      await self._connection.execute(text("SELECT 1"))
+      await self._connection.commit()
+      return
+
+    result = await self._connection.execute(
+      text("SELECT pg_try_advisory_lock(:lock_id)"),
+      {"lock_id": self.lock_id},
+    )
+    await self._connection.commit()
+    if result.scalar():
+      logger.info("Elected leader for advisory lock {}", self.lock_id)
+      self.is_leader = True
+
+  async def _step_down(self) -> None:
+    """Give up leadership."""
+    logger.info("Stepping down as leader for advisory lock {}", self.lock_id)
+    self.is_leader = False
+    try:
+      await self.follow()
+    except Exception as e:
+      logger.error("Error stepping down: {}", str(e))
+
+  async def _close(self) -> None:
+    """Discard the lock connection, ending the session releases the lock."""
+    if self._connection is None:
+      return
+    try:
+      # Invalidate instead of returning the session to the pool with the lock
+      await self._connection.invalidate()
+      await self._connection.close()
+    except Exception as e:
+      logger.debug("Error closing leader connection: {}", str(e))
+    self._connection = None
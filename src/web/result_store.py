@@ -0,0 +1,123 @@
+"""Compressed storage of large execution results."""
+import asyncio
+import zlib
+from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.web.database import DBExecutionResult, DBScheduleExecution
+from src.utilities.settings import Settings
+
+# zstd from the standard library (Python 3.14+) or the zstandard package,
+# zlib otherwise; stored results keep their codec so both can be read back
+try:
+  from compression import zstd
+except ImportError:
+  try:
+    import zstandard as zstd
+  except ImportError:
+    zstd = None
+
+settings = Settings()
+
+
+class ResultStore:
+  """Keep large execution results out of the executions table.
+
+  Results up to ``inline_limit`` characters stay in the executions table.
+  Larger results are compressed and stored in the execution_results table
+  or in files, and only their beginning is kept inline as a preview.
+
+  Available public methods:
+    - save: store the result of an execution
+    - load: get the full result of an execution
+    - delete_files: delete the result files of deleted executions
+  """
+
+  def __init__(self, backend: str, directory: str, inline_limit: int) -> None:
+    """Initialize the store.
+
+    Args:
+      backend: Where large results go, "database" or "files".
+      directory: Directory of the result files.
+      inline_limit: Maximum length of a result kept in the executions table.
+
+    """
+    self.backend = backend
+    self.directory = Path(directory)
+    self.inline_limit = inline_limit
+
+  @staticmethod
+  def compress(text: str) -> tuple[str, bytes]:
+    """Compress a result, returning the codec and the compressed data."""
+    data = text.encode()
+    if zstd is not None:
+      return "zstd", zstd.compress(data)
+    return "zlib", zlib.compress(data)
+
+  @staticmethod
+  def decompress(codec: str, data: bytes) -> str:
+    """Decompress a result stored with the given codec."""
+    if codec == "zstd":
+      if zstd is None:
+        msg = "Result is zstd compressed, install zstandard to read it"
+        raise RuntimeError(msg)
+      return zstd.decompress(data).decode()
+    return zlib.decompress(data).decode()
+
+  async def save(
+    self,
+    db: AsyncSession,
+    execution: DBScheduleExecution,
+    text: str,
+  ) -> None:
+    """Store the result of a flushed execution.
+
+    Args:
+      db: Session of the execution, committed by the caller.
+      execution: Execution the result belongs to.
+      text: Full result.
+
+    """
+    if len(text) <= self.inline_limit:
+      execution.result = text
+      return
+
+    execution.result = text[:self.inline_limit]
+    codec, data = self.compress(text)
+    if self.backend == "files":
+      self.directory.mkdir(parents=True, exist_ok=True)
+      path = self.directory / f"{execution.id}.{codec}"
+      await asyncio.to_thread(path.write_bytes, data)
+    else:
+      db.add(DBExecutionResult(
+        execution_id=execution.id,
+        codec=codec,
+        data=data,
+        size=len(text),
+      ))
+
+  async def load(self, db: AsyncSession, execution: DBScheduleExecution) -> str | None:
+    """Get the full result of an execution."""
+    for codec in ("zstd", "zlib"):
+      path = self.directory / f"{execution.id}.{codec}"
+      if path.exists():
+        data = await asyncio.to_thread(path.read_bytes)
+        return self.decompress(codec, data)
+
+    stored = await db.get(DBExecutionResult, execution.id)
+    if stored is not None:
+      return self.decompress(stored.codec, stored.data)
+    return execution.result
+
+  def delete_files(self, execution_ids: list[int]) -> None:
+    """Delete the result files of deleted executions."""
+    for execution_id in execution_ids:
+      for codec in ("zstd", "zlib"):
+        (self.directory / f"{execution_id}.{codec}").unlink(missing_ok=True)
+
+
+result_store = ResultStore(
+  settings.result_storage,
+  settings.result_storage_dir,
+  settings.result_inline_limit,
+)
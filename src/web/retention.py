@@ -0,0 +1,119 @@
+"""Retention of the execution history."""
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from loguru import logger
+from sqlalchemy import and_, delete, desc, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from src.web.database import (
+  DBExecutionRollup,
+  DBQueuedExecution,
+  DBScheduleExecution,
+  async_session,
+  execution_tokens,
+)
+from src.web.result_store import result_store
+from src.utilities.settings import Settings
+from src.utilities.tracing import prune_traces
+
+settings = Settings()
+
+RETENTION_JOB_ID = "execution_retention"
+
+
+async def apply_retention() -> int:
+  """Roll up and delete executions beyond the retention limits.
+
+  Executions older than execution_retention_days, or beyond the newest
+  execution_retention_max_rows, are counted per day and prompt, with their
+  tokens and cost, into the execution_rollups table read by the prompt
+  statistics and usage totals, and then deleted with their stored results and
+  recordings. Finished rows of the durable execution queue are deleted, and
+  dead-lettered ones after execution_retention_days. Trace files older than
+  tracing_retention_days are deleted too.
+
+  Returns:
+    Number of deleted executions.
+
+  """
+  key = tuple_(DBScheduleExecution.executed_at, DBScheduleExecution.id)
+  cutoff = datetime.utcnow() - timedelta(days=settings.execution_retention_days)
+  async with async_session() as db:
+    expired = [DBScheduleExecution.executed_at < cutoff]
+    # Position of the first execution beyond the row limit
+    boundary = (await db.execute(
+      select(DBScheduleExecution.executed_at, DBScheduleExecution.id)
+      .order_by(desc(DBScheduleExecution.executed_at), desc(DBScheduleExecution.id))
+      .offset(settings.execution_retention_max_rows)
+      .limit(1)
+    )).first()
+    if boundary is not None:
+      expired.append(key <= tuple_(*boundary))
+    condition = or_(*expired)
+
+    day = func.date_trunc("day", DBScheduleExecution.executed_at)
+    prompt_id = func.coalesce(DBScheduleExecution.prompt_id, 0)
+    rollup = insert(DBExecutionRollup).from_select(
+      [
+        "day", "prompt_id", "success_count", "error_count", "total_count",
+        "total_tokens", "total_cost", "last_executed_at",
+      ],
+      select(
+        day,
+        prompt_id,
+        func.count().filter(DBScheduleExecution.status == "success"),
+        func.count().filter(DBScheduleExecution.status == "error"),
+        func.count(),
+        func.sum(execution_tokens),
+        func.coalesce(func.sum(DBScheduleExecution.cost), 0),
+        func.max(DBScheduleExecution.executed_at),
+      ).where(condition).group_by(day, prompt_id),
+    )
+    await db.execute(rollup.on_conflict_do_update(
+      index_elements=["day", "prompt_id"],
+      set_={
+        "success_count": DBExecutionRollup.success_count + rollup.excluded.success_count,
+        "error_count": DBExecutionRollup.error_count + rollup.excluded.error_count,
+        "total_count": DBExecutionRollup.total_count + rollup.excluded.total_count,
+        # Rollups written before tokens and cost were kept have none
+        "total_tokens": func.coalesce(DBExecutionRollup.total_tokens, 0) + rollup.excluded.total_tokens,
+        "total_cost": func.coalesce(DBExecutionRollup.total_cost, 0) + rollup.excluded.total_cost,
+        "last_executed_at": func.greatest(DBExecutionRollup.last_executed_at, rollup.excluded.last_executed_at),
+      },
+    ))
+
+    # Stored results are deleted by the foreign key cascade
+    result = await db.execute(
+      delete(DBScheduleExecution)
+      .where(condition)
+      .returning(DBScheduleExecution.id, DBScheduleExecution.recording)
+    )
+    rows = result.all()
+
+    # The execution history keeps the outcome of the queued executions
+    dequeued = await db.execute(
+      delete(DBQueuedExecution)
+      .where(or_(
+        DBQueuedExecution.status == "done",
+        and_(
+          DBQueuedExecution.status == "dead",
+          DBQueuedExecution.created_at < cutoff,
+        ),
+      )),
+    )
+    await db.commit()
+
+  deleted = [row.id for row in rows]
+  result_store.delete_files(deleted)
+  for row in rows:
+    if row.recording:
+      Path(row.recording).unlink(missing_ok=True)
+  if deleted:
+    logger.info("Retention deleted {} executions", len(deleted))
+  if dequeued.rowcount:
+    logger.info("Retention deleted {} finished queue entries", dequeued.rowcount)
+  pruned = await asyncio.to_thread(prune_traces)
+  if pruned:
+    logger.info("Retention deleted {} trace files", pruned)
+  return len(deleted)
@@ -1,45 +1,228 @@
 """Routes for the prompts."""
+from datetime import datetime, timedelta
 from loguru import logger
-from fastapi import APIRouter, Depends, HTTPException, Request, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy import select
+from sqlalchemy import Float, cast, desc, func, select, true, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from src.web.database import DBPrompt, DBSchedule, get_db
+from src.web.database import DBExecutionRollup, DBPrompt, DBSchedule, DBScheduleExecution, execution_tokens, get_db
+from src.web.routes.schedules import decode_cursor
 from src.web.templating import templates
-from src.web.routes.schedules import execute_prompt_sync
-import asyncio
+from src.web.execution_queue import PRIORITY_MANUAL
+from src.web.scheduler import enqueue_execution
+from src.utilities.settings import Settings
+
+settings = Settings()
 
 router = APIRouter()
 
+# Periods of the usage totals on the dashboard
+USAGE_PERIODS = {"day": timedelta(days=1), "month": timedelta(days=30)}
+
+
+def start_of_day(moment: datetime) -> datetime:
+  """Get the start of the day of a time, as rollup days are stored."""
+  return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def encode_prompt_cursor(prompt_id: int, created_at: datetime) -> str:
+  """Encode the keyset position of a prompt."""
+  return f"{created_at.isoformat()}_{prompt_id}"
+
+
+async def fetch_prompt_summaries(
+  db: AsyncSession,
+  cursor: str | None = None,
+  prompt_id: int | None = None,
+) -> tuple[list[dict], str | None]:
+  """Fetch a page of prompts with their schedule and execution statistics.
+
+  The page of prompts is selected first, then schedule counts, last
+  execution time, success rate, tokens and cost of each of its prompts are
+  aggregated by LATERAL subqueries using the prompt_id indexes, so a page is
+  a single query reading only the rows of its prompts. Executions pruned by
+  retention are added from their daily rollups. The success rate only counts
+  finished executions.
+
+  Args:
+    db: Database session.
+    cursor: Keyset position on (created_at, id) of the previous page.
+    prompt_id: Only fetch this prompt.
+
+  Returns:
+    The prompt summaries of the page and the cursor of the next page, if any.
+
+  """
+  page_size = settings.prompts_page_size
+  page = select(DBPrompt)
+  if prompt_id is not None:
+    page = page.filter(DBPrompt.id == prompt_id)
+  if cursor:
+    page = page.filter(tuple_(DBPrompt.created_at, DBPrompt.id) < tuple_(*decode_cursor(cursor)))
+  page = page.order_by(desc(DBPrompt.created_at), desc(DBPrompt.id)).limit(page_size + 1).subquery()
+
+  schedules = (
+    select(func.count().label("schedule_count"))
+    .where(DBSchedule.prompt_id == page.c.id)
+    .lateral()
+  )
+  executions = (
+    select(
+      func.max(DBScheduleExecution.executed_at).label("last_executed_at"),
+      func.count().filter(DBScheduleExecution.status == "success").label("success_count"),
+      func.count().filter(DBScheduleExecution.status.in_(("success", "error"))).label("finished_count"),
+      func.sum(execution_tokens).label("total_tokens"),
+      func.sum(DBScheduleExecution.cost).label("total_cost"),
+    )
+    .where(DBScheduleExecution.prompt_id == page.c.id)
+    .lateral()
+  )
+  rollups = (
+    select(
+      func.max(DBExecutionRollup.last_executed_at).label("last_executed_at"),
+      func.coalesce(func.sum(DBExecutionRollup.success_count), 0).label("success_count"),
+      func.coalesce(
+        func.sum(DBExecutionRollup.success_count + DBExecutionRollup.error_count), 0,
+      ).label("finished_count"),
+      func.sum(DBExecutionRollup.total_tokens).label("total_tokens"),
+      func.sum(DBExecutionRollup.total_cost).label("total_cost"),
+    )
+    .where(DBExecutionRollup.prompt_id == page.c.id)
+    .lateral()
+  )
+  finished_count = executions.c.finished_count + rollups.c.finished_count
+
+  query = (
+    select(
+      page.c.id,
+      page.c.content,
+      page.c.created_at,
+      page.c.max_tokens,
+      page.c.max_iterations,
+      page.c.max_seconds,
+      schedules.c.schedule_count,
+      # Retention prunes the oldest executions first
+      func.coalesce(executions.c.last_executed_at, rollups.c.last_executed_at).label("last_executed_at"),
+      (
+        cast(executions.c.success_count + rollups.c.success_count, Float)
+        / func.nullif(finished_count, 0)
+      ).label("success_rate"),
+      (
+        func.coalesce(executions.c.total_tokens, 0) + func.coalesce(rollups.c.total_tokens, 0)
+      ).label("total_tokens"),
+      (
+        func.coalesce(executions.c.total_cost, 0) + func.coalesce(rollups.c.total_cost, 0)
+      ).label("total_cost"),
+    )
+    .select_from(page)
+    .join(schedules, true())
+    .join(executions, true())
+    .join(rollups, true())
+    .order_by(desc(page.c.created_at), desc(page.c.id))
+  )
+
+  result = await db.execute(query)
+  rows = result.all()
+  next_cursor = None
+  if len(rows) > page_size:
+    last = rows[page_size - 1]
+    next_cursor = encode_prompt_cursor(last.id, last.created_at)
+
+  summaries = [
+    {
+      "id": row.id,
+      "content": row.content,
+      "created_at": row.created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+      "schedule_count": row.schedule_count,
+      "last_executed_at": (
+        row.last_executed_at.strftime("%Y-%m-%dT%H:%M:%SZ") if row.last_executed_at else None
+      ),
+      "success_rate": round(float(row.success_rate), 3) if row.success_rate is not None else None,
+      "total_tokens": int(row.total_tokens),
+      "total_cost": round(float(row.total_cost), 4),
+      "max_tokens": row.max_tokens,
+      "max_iterations": row.max_iterations,
+      "max_seconds": row.max_seconds,
+    }
+    for row in rows[:page_size]
+  ]
+  return summaries, next_cursor
+
+
+async def fetch_usage_totals(db: AsyncSession) -> dict[str, dict]:
+  """Fetch the executions, tokens and cost of the last day and month in one query.
+
+  Executions pruned by retention are added from their daily rollups, counted
+  by whole days.
+  """
+  now = datetime.utcnow()
+  columns = []
+  rollup_columns = []
+  for name, period in USAGE_PERIODS.items():
+    recent = DBScheduleExecution.executed_at >= now - period
+    columns += [
+      func.count().filter(recent).label(f"{name}_executions"),
+      func.coalesce(func.sum(execution_tokens).filter(recent), 0).label(f"{name}_tokens"),
+      func.coalesce(func.sum(DBScheduleExecution.cost).filter(recent), 0).label(f"{name}_cost"),
+    ]
+    recent_days = DBExecutionRollup.day >= start_of_day(now - period)
+    rollup_columns += [
+      func.coalesce(func.sum(DBExecutionRollup.total_count).filter(recent_days), 0)
+      .label(f"rollup_{name}_executions"),
+      func.coalesce(func.sum(DBExecutionRollup.total_tokens).filter(recent_days), 0)
+      .label(f"rollup_{name}_tokens"),
+      func.coalesce(func.sum(DBExecutionRollup.total_cost).filter(recent_days), 0)
+      .label(f"rollup_{name}_cost"),
+    ]
+  oldest = now - max(USAGE_PERIODS.values())
+  executions = select(*columns).filter(DBScheduleExecution.executed_at >= oldest).subquery()
+  rollups = select(*rollup_columns).filter(DBExecutionRollup.day >= start_of_day(oldest)).subquery()
+  result = await db.execute(select(executions, rollups))
+  row = result.one()._mapping
+  return {
+    name: {
+      "executions": int(row[f"{name}_executions"] + row[f"rollup_{name}_executions"]),
+      "tokens": int(row[f"{name}_tokens"] + row[f"rollup_{name}_tokens"]),
+      "cost": round(float(row[f"{name}_cost"] + row[f"rollup_{name}_cost"]), 4),
+    }
+    for name in USAGE_PERIODS
+  }
+
+
+@router.get("/api/usage")
+async def usage_api(db: AsyncSession = Depends(get_db)):
+  """Get the usage totals of the last day and month as JSON."""
+  return await fetch_usage_totals(db)
+
+
+@router.get("/api/prompts")
+async def list_prompts_api(
+  cursor: str | None = Query(None),
+  db: AsyncSession = Depends(get_db),
+):
+  """List prompts with their statistics as JSON."""
+  prompts, next_cursor = await fetch_prompt_summaries(db, cursor)
+  return {"prompts": prompts, "next_cursor": next_cursor}
+
+
 @router.get("/prompts", response_class=HTMLResponse)
-async def list_prompts(request: Request, db: AsyncSession = Depends(get_db)):
+async def list_prompts(
+  request: Request,
+  cursor: str | None = Query(None),
+  db: AsyncSession = Depends(get_db),
+):
   """List all prompts."""
   try:
-    # Use select() with schedule count
-    result = await db.execute(
-      select(DBPrompt)
-      .options(selectinload(DBPrompt.schedules))
-      .order_by(DBPrompt.created_at.desc())
-    )
-    prompts = result.scalars().all()
+    prompts, next_cursor = await fetch_prompt_summaries(db, cursor)
     logger.info(f"Found {len(prompts)} prompts")
-
-    # Convert SQLAlchemy models to dictionaries with schedule count
-    serialized_prompts = [
-      {
-        "id": prompt.id,
-        "content": prompt.content,
-        "created_at": prompt.created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "schedule_count": len(prompt.schedules),
-      }
-      for prompt in prompts
-    ]
+    usage = await fetch_usage_totals(db)
     return templates.TemplateResponse(
       "prompts.html",
       {
         "request": request,
-        "prompts": serialized_prompts,
+        "prompts": prompts,
+        "next_cursor": next_cursor,
+        "usage": usage,
         "error": request.query_params.get("error"),
       },
     )
@@ -50,14 +233,23 @@ async def list_prompts(request: Request, db: AsyncSession = Depends(get_db)):
 
 @router.post("/prompts/form", response_class=RedirectResponse)
 async def create_prompt_form(
-  content: str = Form(...), db: AsyncSession = Depends(get_db)
+  content: str = Form(...),
+  max_tokens: int | None = Form(None),
+  max_iterations: int | None = Form(None),
+  max_seconds: float | None = Form(None),
+  db: AsyncSession = Depends(get_db),
 ):
   """Create a new prompt from form data."""
   try:
     logger.info(f"Creating new prompt with content length: {len(content)}")
 
     # Create the database model directly from form data
-    db_prompt = DBPrompt(content=content)
+    db_prompt = DBPrompt(
+      content=content,
+      max_tokens=max_tokens,
+      max_iterations=max_iterations,
+      max_seconds=max_seconds,
+    )
     db.add(db_prompt)
     await db.flush()  # Flush to get the ID
     logger.info(f"Created prompt with ID: {db_prompt.id}")
@@ -77,25 +269,13 @@ async def create_prompt_form(
 @router.get("/prompts/{prompt_id}", response_class=HTMLResponse)
 async def get_prompt(prompt_id: int, request: Request, db: AsyncSession = Depends(get_db)):
   """Get a prompt by ID."""
-  prompt = await db.get(DBPrompt, prompt_id)
-  if prompt is None:
+  prompts, _ = await fetch_prompt_summaries(db, prompt_id=prompt_id)
+  if not prompts:
     raise HTTPException(status_code=404, detail="Prompt not found")
 
-  # Get schedule count
-  result = await db.execute(select(DBSchedule).filter(DBSchedule.prompt_id == prompt_id))
-  schedule_count = len(result.scalars().all())
-
-  # Convert to dict with schedule count
-  prompt_dict = {
-    "id": prompt.id,
-    "content": prompt.content,
-    "created_at": prompt.created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
-    "schedule_count": schedule_count
-  }
-
   return templates.TemplateResponse(
     "prompt_detail.html",
-    {"request": request, "prompt": prompt_dict}
+    {"request": request, "prompt": prompts[0]}
   )
 
 
@@ -105,21 +285,16 @@ async def delete_prompt(prompt_id: int, db: AsyncSession = Depends(get_db)):
   try:
     logger.info(f"Attempting to delete prompt {prompt_id}")
 
-    # Load prompt with its schedules
-    result = await db.execute(
-      select(DBPrompt)
-      .options(selectinload(DBPrompt.schedules))
-      .where(DBPrompt.id == prompt_id)
-    )
-    prompt = result.scalar_one_or_none()
-
+    prompt = await db.get(DBPrompt, prompt_id)
     if prompt is None:
       logger.warning(f"Prompt {prompt_id} not found")
       raise HTTPException(status_code=404, detail="Prompt not found")
 
     # Check if prompt has any schedules
-    if prompt.schedules:
-      schedule_count = len(prompt.schedules)
+    schedule_count = await db.scalar(
+      select(func.count()).select_from(DBSchedule).where(DBSchedule.prompt_id == prompt_id)
+    )
+    if schedule_count:
       logger.warning(
         f"Cannot delete prompt {prompt_id} - it has {schedule_count} attached schedules"
       )
@@ -148,8 +323,9 @@ async def run_prompt_once(prompt_id: int, db: AsyncSession = Depends(get_db)):
     if prompt is None:
       raise HTTPException(status_code=404, detail="Prompt not found")
 
-    # Run the execution in the background
-    asyncio.create_task(execute_prompt_sync(prompt_id))
+    # Run the execution in the background, ahead of scheduled runs
+    if not await enqueue_execution(PRIORITY_MANUAL, prompt_id):
+      raise HTTPException(status_code=503, detail="Execution queue is full")
 
     return RedirectResponse(url="/executions", status_code=303)
   except Exception as e:
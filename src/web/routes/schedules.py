@@ -1,18 +1,26 @@
 """Routes for the schedules."""
 import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from apscheduler.schedulers.base import STATE_RUNNING
 from croniter import croniter
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Request, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy import select, text, desc, asc
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import func, select, text, desc, asc, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import defer, joinedload, selectinload, with_expression
 
-from mcp_client import MCPClient
-from src.web.database import DBSchedule, DBPrompt, DBScheduleExecution, async_session, get_db, Base
-from src.web.scheduler import scheduler
+from src.web.database import DBSchedule, DBPrompt, DBScheduleExecution, async_session, get_db
+from src.web.execution_events import execution_events
+from src.web.execution_queue import PRIORITY_ONE_TIME
+from src.web.result_store import result_store
+from src.web.scheduler import scheduler, schedule_prompt
 from src.web.templating import templates
+from src.utilities.metrics import CACHE_REQUESTS
 from src.utilities.settings import Settings
+from src.utilities.tracing import read_trace
 
 settings = Settings()
 
@@ -33,63 +41,6 @@ def parse_cron_expression(cron_expr: str) -> dict:
   }
 
 
-async def execute_prompt_sync(prompt_id: int, schedule_id: int | None = None):
-  """Asynchronous version of execute_prompt_sync for scheduler jobs."""
-  max_retries = 3
-  retry_delay = 1  # seconds
-
-  for attempt in range(max_retries):
-    try:
-      async with async_session() as db:
-        # Get the prompt
-        prompt = await db.get(DBPrompt, prompt_id)
-        if not prompt:
-          return
-
-        # Get the schedule if schedule_id is provided
-        schedule = None
-        if schedule_id:
-          query = select(DBSchedule).filter(DBSchedule.id == schedule_id)
-          result = await db.execute(query)
-          schedule = result.scalar_one_or_none()
-
-        # Create execution record with initial status
-        execution = DBScheduleExecution(
-          schedule_id=schedule.id if schedule else None,
-          prompt=prompt,
-          status="pending"  # Set initial status
-        )
-        db.add(execution)
-        await db.flush()
-
-        try:
-          mcp_client = MCPClient(settings)
-          try:
-            await mcp_client.connect_to_server()
-            result = await mcp_client.process_query(prompt.content)
-            execution.status = "success"
-            execution.result = str(result)
-          except Exception as e:
-            execution.status = "error"
-            execution.error = str(e)
-            raise
-          finally:
-            await mcp_client.cleanup()
-        except Exception as e:
-          execution.status = "error"
-          execution.error = str(e)
-          raise
-        finally:
-          await db.commit()
-          return  # Success - exit the retry loop
-
-    except Exception as e:
-      if attempt < max_retries - 1:
-        await asyncio.sleep(retry_delay)
-        continue
-      raise  # Re-raise the exception if all retries failed
-
-
 @router.get("/schedules", response_class=HTMLResponse)
 async def list_schedules(request: Request, db: AsyncSession = Depends(get_db)):
   """List all schedules."""
@@ -171,25 +122,28 @@ async def create_schedule_form(
   await db.commit()
   await db.refresh(db_schedule)
 
-  # Add to scheduler
-  if schedule_type == "one_time":
-    scheduler.add_job(
-      execute_prompt_sync,
-      "date",
-      run_date=run_at_datetime,
-      args=[db_schedule.prompt_id, db_schedule.id],
-      id=f"one_time_{db_schedule.id}",  # Unique job ID
-      replace_existing=True  # Replace if exists
-    )
-  else:
-    scheduler.add_job(
-      execute_prompt_sync,
-      "cron",
-      args=[db_schedule.prompt_id, db_schedule.id],
-      id=f"recurring_{db_schedule.id}",  # Unique job ID
-      replace_existing=True,  # Replace if exists
-      **parse_cron_expression(cron_expression)
-    )
+  # Add to scheduler if this worker is the leader, otherwise the leader
+  # picks the schedule up on its next reconcile
+  if scheduler.state == STATE_RUNNING:
+    if schedule_type == "one_time":
+      schedule_prompt(
+        "date",
+        db_schedule.prompt_id,
+        db_schedule.id,
+        priority=PRIORITY_ONE_TIME,
+        run_date=run_at_datetime,
+        id=f"one_time_{db_schedule.id}",  # Unique job ID
+        replace_existing=True  # Replace if exists
+      )
+    else:
+      schedule_prompt(
+        "cron",
+        db_schedule.prompt_id,
+        db_schedule.id,
+        id=f"recurring_{db_schedule.id}",  # Unique job ID
+        replace_existing=True,  # Replace if exists
+        **parse_cron_expression(cron_expression)
+      )
 
   return RedirectResponse("/schedules", status_code=303)
 
@@ -227,47 +181,125 @@ async def delete_schedule(schedule_id: int, db: AsyncSession = Depends(get_db)):
       raise HTTPException(status_code=500, detail=str(e))
 
 
+# Execution statuses, read from the model instead of a DISTINCT query
+EXECUTION_STATUSES = list(DBScheduleExecution.__table__.c.status.type.enums)
+
+# Prompt filter dropdown, cached as (loaded_at, options)
+_prompt_options: tuple[float, list[dict]] | None = None
+
+
+async def get_prompt_options(db: AsyncSession) -> list[dict]:
+  """Get the prompts for the filter dropdown, cached for a short time."""
+  global _prompt_options
+  if _prompt_options and time.monotonic() - _prompt_options[0] < settings.dropdown_cache_ttl:
+    CACHE_REQUESTS.labels(cache="prompt_options", result="hit").inc()
+    return _prompt_options[1]
+  CACHE_REQUESTS.labels(cache="prompt_options", result="miss").inc()
+
+  # Only the beginning of the content is shown in the dropdown
+  result = await db.execute(
+    select(DBPrompt.id, func.left(DBPrompt.content, 51)).order_by(DBPrompt.id)
+  )
+  options = [{"id": prompt_id, "content": content} for prompt_id, content in result.all()]
+  _prompt_options = (time.monotonic(), options)
+  return options
+
+
+def encode_cursor(execution: DBScheduleExecution) -> str:
+  """Encode the keyset position of an execution."""
+  return f"{execution.executed_at.isoformat()}_{execution.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+  """Decode a keyset position into its executed_at and id."""
+  try:
+    executed_at, execution_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(executed_at), int(execution_id)
+  except ValueError:
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def fetch_executions_page(
+  db: AsyncSession,
+  filters: list,
+  cursor: str | None,
+  sort_order: str,
+) -> tuple[list[DBScheduleExecution], str | None]:
+  """Fetch a page of executions with keyset pagination on (executed_at, id).
+
+  The result and error columns are not loaded, only a short preview of the
+  result for the table.
+
+  Returns:
+    The executions of the page and the cursor of the next page, if any.
+
+  """
+  page_size = settings.executions_page_size
+  key = tuple_(DBScheduleExecution.executed_at, DBScheduleExecution.id)
+  ascending = sort_order.lower() == "asc"
+
+  query = (
+    select(DBScheduleExecution)
+    .options(
+      defer(DBScheduleExecution.result),
+      defer(DBScheduleExecution.error),
+      with_expression(
+        DBScheduleExecution.result_preview,
+        func.left(DBScheduleExecution.result, 200),
+      ),
+      joinedload(DBScheduleExecution.schedule),
+      joinedload(DBScheduleExecution.prompt),
+    )
+    .filter(*filters)
+  )
+  if cursor:
+    position = tuple_(*decode_cursor(cursor))
+    query = query.filter(key > position if ascending else key < position)
+
+  direction = asc if ascending else desc
+  query = query.order_by(
+    direction(DBScheduleExecution.executed_at),
+    direction(DBScheduleExecution.id),
+  ).limit(page_size + 1)
+
+  result = await db.execute(query)
+  executions = result.unique().scalars().all()
+  next_cursor = encode_cursor(executions[page_size - 1]) if len(executions) > page_size else None
+  return executions[:page_size], next_cursor
+
+
 @router.get("/schedules/{schedule_id}/executions", response_class=HTMLResponse)
 async def list_schedule_executions(
   request: Request,
   schedule_id: int,
+  cursor: str | None = Query(None),
   db: AsyncSession = Depends(get_db)
 ):
   """List execution history for a schedule."""
-  # Load schedule with its executions
-  result = await db.execute(
-    select(DBSchedule)
-    .filter(DBSchedule.id == schedule_id)
-    .options(selectinload(DBSchedule.executions))
-  )
-  schedule = result.scalar_one_or_none()
-
+  schedule = await db.get(DBSchedule, schedule_id)
   if not schedule:
     raise HTTPException(status_code=404, detail="Schedule not found")
 
-  # Get all prompts for the filter dropdown
-  prompt_result = await db.execute(select(DBPrompt))
-  prompts = prompt_result.scalars().all()
-
-  # Get unique statuses for the filter dropdown
-  status_result = await db.execute(
-    select(DBScheduleExecution.status).distinct()
+  executions, next_cursor = await fetch_executions_page(
+    db,
+    [DBScheduleExecution.schedule_id == schedule_id],
+    cursor,
+    "desc",
   )
-  statuses = [row[0] for row in status_result.all()]
 
   return templates.TemplateResponse(
     "executions.html",
     {
       "request": request,
-      "executions": schedule.executions,
-      "prompts": prompts,
-      "current_prompt_id": str(schedule.prompt_id),  # Convert to string to match the form value
+      "executions": executions,
+      "next_cursor": next_cursor,
+      "prompts": await get_prompt_options(db),
+      "current_prompt_id": schedule.prompt_id,
       "current_status": None,
       "current_start_date": None,
       "current_end_date": None,
-      "current_sort_by": "executed_at",
       "current_sort_order": "desc",
-      "statuses": statuses,
+      "statuses": EXECUTION_STATUSES,
       "schedule": schedule,  # Pass the schedule for context
     }
   )
@@ -280,77 +312,106 @@ async def list_all_executions(
   status: str | None = Query(None),
   start_date: str | None = Query(None),
   end_date: str | None = Query(None),
-  sort_by: str = Query("executed_at", description="Field to sort by (executed_at, status, prompt_id)"),
-  sort_order: str = Query("desc", description="Sort order (asc or desc)"),
+  sort_order: str = Query("desc", description="Sort order of the execution time (asc or desc)"),
+  cursor: str | None = Query(None, description="Position of the page, from the previous page"),
   db: AsyncSession = Depends(get_db)
 ):
-  """List all executions with filtering and sorting options."""
-  # Build the base query
-  query = select(DBScheduleExecution).options(
-    joinedload(DBScheduleExecution.schedule).joinedload(DBSchedule.prompt)
-  )
-
-  # Apply filters
+  """List executions with filtering, one page at a time."""
+  filters = []
+  prompt_id_int = None
   if prompt_id and prompt_id.strip():  # Only apply filter if prompt_id is not empty
     try:
       prompt_id_int = int(prompt_id)
-      query = query.join(DBSchedule).filter(DBSchedule.prompt_id == prompt_id_int)
+      filters.append(DBScheduleExecution.prompt_id == prompt_id_int)
     except ValueError:
       # If prompt_id is not a valid integer, ignore the filter
       pass
   if status:
-    query = query.filter(DBScheduleExecution.status == status)
+    filters.append(DBScheduleExecution.status == status)
   if start_date:
     try:
       start_datetime = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-      query = query.filter(DBScheduleExecution.executed_at >= start_datetime)
+      filters.append(DBScheduleExecution.executed_at >= start_datetime)
     except ValueError:
       raise HTTPException(status_code=400, detail="Invalid start_date format")
   if end_date:
     try:
       end_datetime = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-      query = query.filter(DBScheduleExecution.executed_at <= end_datetime)
+      filters.append(DBScheduleExecution.executed_at <= end_datetime)
     except ValueError:
       raise HTTPException(status_code=400, detail="Invalid end_date format")
 
-  # Apply sorting
-  sort_field = getattr(DBScheduleExecution, sort_by, DBScheduleExecution.executed_at)
-  if sort_order.lower() == "asc":
-    query = query.order_by(asc(sort_field))
-  else:
-    query = query.order_by(desc(sort_field))
-
-  # Execute query
-  result = await db.execute(query)
-  executions = result.unique().scalars().all()
-
-  # Get all prompts for the filter dropdown
-  prompt_result = await db.execute(select(DBPrompt))
-  prompts = prompt_result.scalars().all()
-
-  # Get unique statuses for the filter dropdown
-  status_result = await db.execute(
-    select(DBScheduleExecution.status).distinct()
-  )
-  statuses = [row[0] for row in status_result.all()]
+  executions, next_cursor = await fetch_executions_page(db, filters, cursor, sort_order)
 
   return templates.TemplateResponse(
     "executions.html",
     {
       "request": request,
       "executions": executions,
-      "prompts": prompts,
-      "current_prompt_id": prompt_id,
+      "next_cursor": next_cursor,
+      "prompts": await get_prompt_options(db),
+      "current_prompt_id": prompt_id_int,
       "current_status": status,
       "current_start_date": start_date,
       "current_end_date": end_date,
-      "current_sort_by": sort_by,
       "current_sort_order": sort_order,
-      "statuses": statuses,
+      "statuses": EXECUTION_STATUSES,
     }
   )
 
 
+# Seconds between comments keeping idle event streams open through proxies
+EVENTS_KEEPALIVE_INTERVAL = 15
+
+
+def format_event(event: dict) -> str:
+  """Format an execution event as a server-sent event."""
+  return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def stream_execution_events(execution_id: int | None = None) -> AsyncIterator[str]:
+  """Stream the events of an execution, or of all executions.
+
+  The stream of a single execution starts with its current status and ends
+  once it has finished.
+  """
+  async with execution_events.subscribe(execution_id) as queue:
+    # Read the status after subscribing so no change is missed in between
+    if execution_id is not None:
+      async with async_session() as db:
+        status = await db.scalar(
+          select(DBScheduleExecution.status).filter(DBScheduleExecution.id == execution_id)
+        )
+      queue.put_nowait({"execution_id": execution_id, "type": "status", "status": status})
+
+    while True:
+      try:
+        event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_INTERVAL)
+      except TimeoutError:
+        yield ": keepalive\n\n"
+        continue
+      yield format_event(event)
+      if execution_id is not None and event["type"] == "status" and event["status"] != "pending":
+        return
+
+
+@router.get("/executions/events")
+async def execution_events_stream():
+  """Stream the status changes and progress of all executions."""
+  return StreamingResponse(stream_execution_events(), media_type="text/event-stream")
+
+
+@router.get("/executions/{execution_id}/events")
+async def execution_events_stream_one(execution_id: int, db: AsyncSession = Depends(get_db)):
+  """Stream the status changes and progress of an execution."""
+  exists = await db.scalar(
+    select(DBScheduleExecution.id).filter(DBScheduleExecution.id == execution_id)
+  )
+  if exists is None:
+    raise HTTPException(status_code=404, detail="Execution not found")
+  return StreamingResponse(stream_execution_events(execution_id), media_type="text/event-stream")
+
+
 @router.get("/executions/{execution_id}", response_class=HTMLResponse)
 async def get_execution(
   execution_id: int,
@@ -374,9 +435,22 @@ async def get_execution(
     "id": execution.id,
     "executed_at": execution.executed_at.strftime("%Y-%m-%d %H:%M:%S") if execution.executed_at else "N/A",
     "status": execution.status,
-    "result": execution.result,
+    "result": await result_store.load(db, execution),
     "error": execution.error,
-    "schedule": execution.schedule
+    "schedule": execution.schedule,
+    "trace_id": execution.trace_id,
+    "recording": execution.recording,
+    "input_tokens": execution.input_tokens,
+    "output_tokens": execution.output_tokens,
+    "cache_creation_tokens": execution.cache_creation_tokens,
+    "cache_read_tokens": execution.cache_read_tokens,
+    "tool_calls": execution.tool_calls,
+    "iterations": execution.iterations,
+    "cost": execution.cost,
+    "spans": (
+      await asyncio.to_thread(read_trace, execution.trace_id, execution.executed_at)
+      if execution.trace_id else []
+    ),
   }
 
   return templates.TemplateResponse(
@@ -1,43 +1,111 @@
 """Scheduler module for the web application."""
+import asyncio
+from datetime import datetime, timezone
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.asyncio import AsyncIOExecutor
+from loguru import logger
+from src.utilities.metrics import SCHEDULER_LAG
 from src.utilities.settings import Settings
+from src.web.durable_queue import DurableExecutionQueue
+from src.web.execution_queue import ExecutionQueue, PRIORITY_RECURRING, backoff_delay
+from src.web.executions import execute_prompt_sync
 
 settings = Settings()
 
+# Advisory lock key held by the worker that fires the scheduled jobs
+SCHEDULER_LOCK_ID = 7_310_421
+
 # Configure the scheduler to use AsyncIOExecutor
 executors = {
   'default': AsyncIOExecutor()
 }
 
-# Configure job stores to use PostgreSQL with synchronous connection
-# Convert async URL to sync URL by removing +asyncpg
-database_url = f"postgresql://postgres:postgres@{settings.database_host}:{settings.database_port}/ibkr_mcp"
+# Jobs are kept in memory, the schedules table is the source of truth and
+# the jobs are rebuilt from it on startup, so no blocking job store I/O
 jobstores = {
-  'default': SQLAlchemyJobStore(url=database_url)
+  'default': MemoryJobStore()
 }
 
+# Seconds a job may fire late. A schedule created on another worker is
+# picked up by the leader's next reconcile and a new leader takes over
+# within two leader checks, jobs due meanwhile still fire
+MISFIRE_GRACE_TIME = 2 * settings.leader_check_interval
+
 # Create the scheduler with our configuration
 scheduler = AsyncIOScheduler(
   jobstores=jobstores,
   executors=executors,
+  job_defaults={'coalesce': True, 'misfire_grace_time': MISFIRE_GRACE_TIME},
   timezone='UTC'
 )
 
-async def run_async_job(func, *args, **kwargs):
-  """Run an async job in the scheduler."""
-  try:
-    await func(*args, **kwargs)
-  except Exception as e:
-    # Log the error but don't let it crash the scheduler
-    print(f"Error running job: {str(e)}")
+# One-time jobs fired by this worker, not scheduled again while late
+fired_one_time_jobs: set[str] = set()
+
+def record_lag(event: JobSubmissionEvent) -> None:
+  """Observe how late a job was submitted after its scheduled run time."""
+  now = datetime.now(timezone.utc)
+  for run_time in event.scheduled_run_times:
+    SCHEDULER_LAG.observe(max((now - run_time).total_seconds(), 0))
+  if event.job_id.startswith("one_time_"):
+    fired_one_time_jobs.add(event.job_id)
+
+scheduler.add_listener(record_lag, EVENT_JOB_SUBMITTED)
+
+# Prompt executions run through a bounded priority queue, in this process
+# or in Postgres for separate executor workers (python main.py --worker)
+execution_queue = ExecutionQueue(
+  settings.max_concurrent_executions,
+  settings.execution_queue_size,
+)
+durable_queue = DurableExecutionQueue(
+  settings.execution_queue_size,
+  settings.execution_max_attempts,
+  settings.execution_retry_delay,
+  settings.execution_visibility_timeout,
+  settings.execution_poll_interval,
+)
+
+async def run_execution(prompt_id, schedule_id, priority, attempt=1):
+  """Run a prompt from the local queue, retrying failures with backoff."""
+  if await execute_prompt_sync(prompt_id, schedule_id):
+    return
+  if attempt >= settings.execution_max_attempts:
+    logger.error("Prompt {} failed {} times, giving up", prompt_id, attempt)
+    return
+
+  delay = backoff_delay(attempt, settings.execution_retry_delay)
+  logger.warning("Prompt {} failed, retrying in {} seconds", prompt_id, delay)
+  asyncio.get_running_loop().call_later(
+    delay,
+    execution_queue.submit,
+    priority,
+    run_execution,
+    prompt_id,
+    schedule_id,
+    priority,
+    attempt + 1,
+  )
+
+async def enqueue_execution(priority, prompt_id, schedule_id=None):
+  """Queue a prompt execution on the configured backend."""
+  if settings.execution_queue_backend == 'postgres':
+    queued = await durable_queue.enqueue(priority, prompt_id, schedule_id)
+  else:
+    queued = execution_queue.submit(
+      priority, run_execution, prompt_id, schedule_id, priority,
+    )
+  if not queued:
+    logger.error("Skipped execution of prompt {}, queue is full", prompt_id)
+  return queued
 
-def schedule_async_job(func, trigger, **kwargs):
-  """Schedule an async job with proper error handling."""
+def schedule_prompt(trigger, prompt_id, schedule_id, priority=PRIORITY_RECURRING, **kwargs):
+  """Schedule a prompt, the scheduler only queues its executions."""
   return scheduler.add_job(
-    run_async_job,
+    enqueue_execution,
     trigger=trigger,
-    args=[func] + list(kwargs.pop('args', [])),
+    args=[priority, prompt_id, schedule_id],
     **kwargs
   )
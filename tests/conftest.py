@@ -0,0 +1,10 @@
+"""Shared configuration of the tests."""
+import os
+import tempfile
+
+# Keep the logs and traces of the tested processes, and of the MCP servers
+# they start, out of the repository. Settings are read when the tested
+# modules are imported, after this file.
+_output_dir = tempfile.TemporaryDirectory(prefix="ibkr-tests-")
+os.environ.setdefault("LOG_FILE", os.path.join(_output_dir.name, "app.log"))
+os.environ.setdefault("TRACING_FILE", os.path.join(_output_dir.name, "traces.jsonl"))
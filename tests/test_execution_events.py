@@ -0,0 +1,68 @@
+"""Tests for the live execution events."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from mcp_client import MCPClient
+from src.utilities import Settings
+from src.web.execution_events import ExecutionEventBroker
+from src.web.routes.schedules import stream_execution_events
+
+@pytest.mark.asyncio
+async def test_dispatch_filters_and_drops_oldest() -> None:
+  """Test that subscribers get the events of their execution and keep the newest."""
+  broker = ExecutionEventBroker(MagicMock(), queue_size=2)
+
+  async with broker.subscribe(1) as one, broker.subscribe() as everything:
+    for index in range(3):
+      broker.dispatch({"execution_id": 1, "type": "text", "text": str(index)})
+    broker.dispatch({"execution_id": 2, "type": "status", "status": "pending"})
+
+    assert [one.get_nowait()["text"] for _ in range(one.qsize())] == ["1", "2"]
+    assert [everything.get_nowait()["execution_id"] for _ in range(2)] == [1, 2]
+
+  assert not broker._subscribers
+
+@pytest.mark.asyncio
+async def test_stream_ends_when_execution_finishes(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that the stream of an execution starts with its status and ends when it finishes."""
+  broker = ExecutionEventBroker(MagicMock(), queue_size=10)
+  monkeypatch.setattr("src.web.routes.schedules.execution_events", broker)
+  db = AsyncMock()
+  db.scalar.return_value = "pending"
+  session = MagicMock()
+  session.return_value.__aenter__.return_value = db
+  monkeypatch.setattr("src.web.routes.schedules.async_session", session)
+
+  stream = stream_execution_events(5)
+  assert await anext(stream) == (
+    'event: status\ndata: {"execution_id": 5, "type": "status", "status": "pending"}\n\n'
+  )
+
+  broker.dispatch({"execution_id": 5, "type": "tool_start", "tool": "ibkr_get_positions"})
+  broker.dispatch({"execution_id": 5, "type": "status", "status": "success"})
+  events = [event async for event in stream]
+
+  assert [event.split("\n")[0] for event in events] == ["event: tool_start", "event: status"]
+
+@pytest.mark.asyncio
+async def test_text_deltas_are_coalesced() -> None:
+  """Test that streamed text is published in batches instead of per delta."""
+  events = []
+  client = MCPClient(
+    Settings(chat_stream_flush_interval=0.05),
+    on_event=AsyncMock(side_effect=events.append),
+  )
+
+  async def deltas():
+    for index in range(10):
+      yield str(index)
+    await asyncio.sleep(0.06)
+    yield "a"
+    yield "b"
+
+  await client._emit_text(deltas())
+
+  assert events == [
+    {"type": "text", "text": "0123456789a"},
+    {"type": "text", "text": "b"},
+  ]
@@ -0,0 +1,127 @@
+"""Tests for the execution queue."""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from mcp_client import MCPClient
+from src.utilities import Settings
+from src.web.database import DBQueuedExecution
+from src.web.durable_queue import DurableExecutionQueue
+from src.web.execution_queue import ExecutionQueue, backoff_delay
+
+@pytest.mark.asyncio
+async def test_queue_runs_by_priority_with_limit() -> None:
+  """Test that executions run highest priority first, within the limit."""
+  queue = ExecutionQueue(max_concurrent=1, max_size=3)
+  order = []
+  running = 0
+  max_running = 0
+
+  async def execute(name: str) -> None:
+    nonlocal running, max_running
+    running += 1
+    max_running = max(max_running, running)
+    await asyncio.sleep(0)
+    order.append(name)
+    running -= 1
+
+  assert queue.submit(2, execute, "recurring")
+  assert queue.submit(1, execute, "one_time")
+  assert queue.submit(0, execute, "manual")
+  assert not queue.submit(0, execute, "rejected")
+
+  queue.start()
+  await queue.queue.join()
+  await queue.stop()
+
+  assert order == ["manual", "one_time", "recurring"]
+  assert max_running == 1
+
+@pytest.mark.asyncio
+async def test_queue_survives_failed_execution() -> None:
+  """Test that a failing execution does not stop the worker."""
+  queue = ExecutionQueue(max_concurrent=1, max_size=2)
+  done = []
+
+  async def fail() -> None:
+    msg = "LLM API unavailable"
+    raise RuntimeError(msg)
+
+  async def succeed() -> None:
+    done.append(True)
+
+  queue.submit(0, fail)
+  queue.submit(1, succeed)
+  queue.start()
+  await queue.queue.join()
+  await queue.stop()
+
+  assert done == [True]
+
+@pytest.mark.asyncio
+async def test_durable_queue_retries_then_dead_letters() -> None:
+  """Test that failed executions back off exponentially and end as dead letters."""
+  queue = DurableExecutionQueue(10, 3, 30, 600, 1)
+  queue._update = AsyncMock()
+  execute = AsyncMock(return_value=False)
+
+  await queue._process(DBQueuedExecution(id=1, prompt_id=5, attempts=1), execute)
+  execute.assert_awaited_once_with(5, None)
+  assert queue._update.call_args.kwargs["status"] == "queued"
+  assert backoff_delay(2, 30) == 60
+
+  await queue._process(DBQueuedExecution(id=1, prompt_id=5, attempts=3), execute)
+  assert queue._update.call_args.kwargs["status"] == "dead"
+
+  execute.reset_mock()
+  await queue._process(
+    DBQueuedExecution(id=1, prompt_id=5, attempts=4, locked_by="host:1"),
+    execute,
+  )
+  execute.assert_not_awaited()
+  assert queue._update.call_args.kwargs["status"] == "dead"
+
+@pytest.mark.asyncio
+async def test_durable_queue_heartbeat_stops_without_lease() -> None:
+  """Test that a worker stops extending an execution claimed again by another worker."""
+  queue = DurableExecutionQueue(10, 3, 30, 0.03, 1)
+  queue._update = AsyncMock(side_effect=[True, False])
+
+  await asyncio.wait_for(
+    queue._heartbeat(DBQueuedExecution(id=1, prompt_id=5, attempts=1, locked_by="host:1")),
+    timeout=1,
+  )
+  assert queue._update.await_count == 2
+
+@pytest.mark.asyncio
+async def test_order_tools_do_not_hold_the_ib_limit() -> None:
+  """Test that an order waiting for approval does not block other IB tools."""
+  approval = asyncio.Event()
+
+  async def call_tool(tool_name: str, _: dict) -> SimpleNamespace:
+    if tool_name == "ibkr_trade_simple_contract":
+      await approval.wait()
+    return SimpleNamespace(content="[]", isError=False)
+
+  client = MCPClient(Settings(), resource_limits={"ibkr": asyncio.Semaphore(1)})
+  client.session = AsyncMock()
+  client.session.call_tool.side_effect = call_tool
+
+  order = asyncio.create_task(client._call_tool("ibkr_trade_simple_contract", {}))
+  await asyncio.sleep(0)
+  await asyncio.wait_for(client._call_tool("ibkr_get_positions", {}), timeout=1)
+  approval.set()
+  await order
+
+@pytest.mark.asyncio
+async def test_failed_order_tool_call_is_tracked() -> None:
+  """Test that a failing order tool call still marks the query as ordering."""
+  client = MCPClient(Settings())
+  client.session = AsyncMock()
+
+  await client._call_tool("ibkr_get_positions", {})
+  assert not client.called_order_tool
+  client.session.call_tool.side_effect = TimeoutError
+  with pytest.raises(TimeoutError):
+    await client._call_tool("ibkr_trade_batch", {"orders": []})
+  assert client.called_order_tool
@@ -0,0 +1,41 @@
+"""Tests for the paginated executions listing."""
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+from src.web.database import DBScheduleExecution
+from src.web.routes.schedules import decode_cursor, encode_cursor, fetch_executions_page
+
+def make_execution(execution_id: int) -> DBScheduleExecution:
+  """Create an execution."""
+  return DBScheduleExecution(id=execution_id, executed_at=datetime(2025, 6, 2, 14, 30, execution_id))
+
+def test_cursor_round_trip() -> None:
+  """Test that a cursor decodes to the executed_at and id it was made from."""
+  execution = make_execution(7)
+  assert decode_cursor(encode_cursor(execution)) == (execution.executed_at, 7)
+
+@pytest.mark.asyncio
+async def test_fetch_page_uses_keyset_and_defers_result(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that a page is fetched after the cursor without the result column."""
+  monkeypatch.setattr("src.web.routes.schedules.settings.executions_page_size", 2)
+  result = MagicMock()
+  result.unique.return_value.scalars.return_value.all.return_value = [
+    make_execution(3), make_execution(2), make_execution(1),
+  ]
+  db = AsyncMock()
+  db.execute.return_value = result
+
+  executions, next_cursor = await fetch_executions_page(
+    db, [], encode_cursor(make_execution(4)), "desc",
+  )
+
+  assert [execution.id for execution in executions] == [3, 2]
+  assert next_cursor == encode_cursor(make_execution(2))
+
+  sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+  assert "(executions.executed_at, executions.id) < (" in sql
+  assert "left(executions.result," in sql
+  assert ", executions.result," not in sql
+  assert "executions.error" not in sql
+  assert "LIMIT" in sql
@@ -0,0 +1,47 @@
+"""Tests for the leader election."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.web.leader import LeaderElection
+
+@pytest.mark.asyncio
+async def test_leader_steps_down_when_session_is_lost() -> None:
+  """Test that the lock holder leads and steps down when its session dies."""
+  connection = AsyncMock()
+  connection.execute.return_value = MagicMock(scalar=MagicMock(return_value=True))
+  engine = MagicMock()
+  engine.connect = AsyncMock(return_value=connection)
+  lead = AsyncMock()
+  follow = AsyncMock()
+
+  election = LeaderElection(engine, 1, 0.01, lead, follow)
+  election.start()
+  await asyncio.sleep(0.05)
+  assert election.is_leader
+  lead.assert_awaited()
+  follow.assert_not_awaited()
+
+  connection.execute.side_effect = ConnectionError("server closed the connection")
+  await asyncio.sleep(0.05)
+  assert not election.is_leader
+  follow.assert_awaited_once()
+  connection.invalidate.assert_awaited()
+
+  await election.stop()
+
+@pytest.mark.asyncio
+async def test_follower_does_not_lead() -> None:
+  """Test that a process that does not get the lock never leads."""
+  connection = AsyncMock()
+  connection.execute.return_value = MagicMock(scalar=MagicMock(return_value=False))
+  engine = MagicMock()
+  engine.connect = AsyncMock(return_value=connection)
+  lead = AsyncMock()
+
+  election = LeaderElection(engine, 1, 0.01, lead, AsyncMock())
+  election.start()
+  await asyncio.sleep(0.03)
+  await election.stop()
+
+  assert not election.is_leader
+  lead.assert_not_awaited()
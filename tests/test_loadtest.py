@@ -0,0 +1,63 @@
+"""Tests for the load test stubs and report."""
+import os
+import httpx
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from anthropic import AsyncAnthropic
+from mcp_client import MCPClient
+from src.loadtest.runner import LoadTest, percentiles
+from src.loadtest.stub_server import FINAL_ANSWER, SCRIPT, create_stub_app
+from src.utilities import Settings
+
+@pytest.mark.asyncio
+async def test_scripted_model_drives_the_tool_loop() -> None:
+  """Test that the stub model streams the scripted tool calls to the client."""
+  client = MCPClient(Settings())
+  client.anthropic = AsyncAnthropic(
+    api_key="loadtest",
+    base_url="http://stub",
+    http_client=httpx.AsyncClient(transport=httpx.ASGITransport(create_stub_app(0))),
+  )
+  client.session = AsyncMock()
+  client.session.list_tools.return_value = SimpleNamespace(tools=[])
+  client.session.call_tool.return_value = SimpleNamespace(content="ok", isError=False)
+
+  result = await client.process_query("Load test")
+
+  assert [call.args for call in client.session.call_tool.await_args_list] == SCRIPT
+  assert result.endswith(FINAL_ANSWER)
+  assert client.usage["iterations"] == len(SCRIPT) + 1
+  assert client.usage["input_tokens"] > 0
+
+def test_stub_environment_bypasses_shared_mcp_server(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that executions start their own MCP server against the stubs."""
+  for name in ("ANTHROPIC_BASE_URL", "FMP_BASE_URL", "IB_SIMULATED", "RESPONSE_CACHE_TTL"):
+    monkeypatch.delenv(name, raising=False)
+  monkeypatch.setenv("MCP_SERVER_URL", "http://shared:8000/sse")
+
+  LoadTest(1, 1.0, Settings(loadtest_port=8765))._stub_environment()
+
+  assert "MCP_SERVER_URL" not in os.environ
+  assert Settings().mcp_server_url is None
+  assert os.environ["ANTHROPIC_BASE_URL"] == "http://127.0.0.1:8765"
+
+@pytest.mark.asyncio
+async def test_stub_server_start_and_stop() -> None:
+  """Test that the stub server is awaited until it accepts connections."""
+  load_test = LoadTest(1, 1.0, Settings(loadtest_port=8766, loadtest_model_latency=0))
+  stub, stub_task = await load_test._start_stub()
+  try:
+    async with httpx.AsyncClient() as client:
+      response = await client.get("http://127.0.0.1:8766/fmp/quote/SPY")
+    assert response.json()[0]["symbol"] == "SPY"
+  finally:
+    stub.should_exit = True
+    await stub_task
+
+def test_percentiles() -> None:
+  """Test the latency percentiles of the report."""
+  result = percentiles([float(value) for value in range(1, 101)])
+
+  assert result == {"count": 100, "p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0}
+  assert percentiles([])["count"] == 0
@@ -0,0 +1,72 @@
+"""Tests for the client sessions of a shared MCP server."""
+import asyncio
+import gc
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from mcp.server.lowlevel.server import request_ctx
+from src.ib_helper.client import IBClient
+from src.mcp_servers.sessions import SessionRegistry
+
+class FakeSession:
+  """Client session, only used as a weak reference key."""
+
+def test_names_scoped_and_released_per_session() -> None:
+  """Test that sessions get separate names, released when the session ends."""
+  registry = SessionRegistry(max_calls=10, max_session_calls=2)
+  released = []
+  first, second = FakeSession(), FakeSession()
+
+  token = request_ctx.set(SimpleNamespace(session=first))
+  first_name = registry.scoped("gainers", release=released.append)
+  assert registry.scoped(first_name) == first_name
+  request_ctx.reset(token)
+
+  token = request_ctx.set(SimpleNamespace(session=second))
+  assert registry.scoped("gainers") != first_name
+  request_ctx.reset(token)
+
+  del first
+  gc.collect()
+  assert released == [first_name]
+
+@pytest.mark.asyncio
+async def test_tool_calls_limited_per_session() -> None:
+  """Test that a session can not use more than its share of concurrent calls."""
+  registry = SessionRegistry(max_calls=10, max_session_calls=2)
+  running = []
+  peak = {}
+
+  async def call(session: FakeSession) -> None:
+    request_ctx.set(SimpleNamespace(session=session))
+    async with registry.limit():
+      running.append(session)
+      peak[session] = max(peak.get(session, 0), running.count(session))
+      await asyncio.sleep(0.01)
+      running.remove(session)
+
+  busy, other = FakeSession(), FakeSession()
+  await asyncio.gather(*(call(busy) for _ in range(5)), call(other))
+
+  assert peak == {busy: 2, other: 1}
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_connect_once() -> None:
+  """Test that the first tool calls of concurrent sessions connect the shared client once."""
+  client = IBClient()
+  connected = False
+
+  async def connect(**kwargs: object) -> None:
+    nonlocal connected
+    await asyncio.sleep(0.01)
+    connected = True
+
+  client.ib = MagicMock()
+  client.ib.isConnected.side_effect = lambda: connected
+  client.ib.connectAsync.side_effect = connect
+  client.position_book = MagicMock()
+
+  await asyncio.gather(*(client._connect() for _ in range(5)))
+
+  client.ib.connectAsync.assert_called_once()
+  client.position_book.attach.assert_called_once_with(client.ib)
@@ -0,0 +1,50 @@
+"""Tests for the Prometheus metrics."""
+import os
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+from mcp_client import MCPClient
+from src.utilities import Settings, metrics
+
+pytest.importorskip("prometheus_client")
+
+def test_timed_labels_errors_and_metrics_are_aggregated() -> None:
+  """Test that timed observations are labelled by outcome and exported for all processes."""
+  with metrics.timed(metrics.TOOL_DURATION, tool="calendar_current_datetime"):
+    pass
+  with pytest.raises(RuntimeError), metrics.timed(metrics.TOOL_DURATION, tool="ibkr_get_positions"):
+    raise RuntimeError("Gateway down")
+  metrics.CACHE_REQUESTS.labels(cache="what_if", result="hit").inc()
+
+  content, content_type = metrics.generate_metrics()
+  text = content.decode()
+
+  assert content_type.startswith("text/plain")
+  assert 'mcp_tool_duration_seconds_count{status="ok",tool="calendar_current_datetime"}' in text
+  assert 'mcp_tool_duration_seconds_count{status="error",tool="ibkr_get_positions"}' in text
+  assert 'cache_requests_total{cache="what_if",result="hit"}' in text
+
+def test_setup_metrics_shares_values(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that the metrics directory is only set up by the process entry points."""
+  monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "")
+  monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+  monkeypatch.setattr(metrics.settings, "metrics_dir", str(tmp_path / "metrics"))
+
+  metrics.setup_metrics()
+
+  assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == str(tmp_path / "metrics")
+  assert (tmp_path / "metrics").is_dir()
+
+@pytest.mark.asyncio
+async def test_stdio_servers_do_not_share_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that a per-execution stdio server keeps its metrics out of the shared directory."""
+  monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "data/metrics")
+  stdio_client = MagicMock(side_effect=RuntimeError("Not started"))
+  monkeypatch.setattr("mcp_client.stdio_client", stdio_client)
+  client = MCPClient(Settings(mcp_server_url=None))
+
+  with pytest.raises(RuntimeError):
+    await client.connect_to_server()
+
+  assert "PROMETHEUS_MULTIPROC_DIR" not in stdio_client.call_args[0][0].env
+  assert client.time_tools
@@ -0,0 +1,69 @@
+"""Tests for the position book."""
+import pytest
+from unittest.mock import MagicMock
+from ib_async.contract import Contract
+from ib_async.objects import PnLSingle, Position
+from src.ib_helper.position_book import PositionBook
+
+@pytest.fixture
+def book() -> PositionBook:
+  """Create a position book attached to a mocked IB instance."""
+  position_book = PositionBook()
+  position_book.attach(MagicMock())
+  return position_book
+
+def make_position(con_id: int, quantity: float, avg_cost: float) -> Position:
+  """Create a position for an option contract."""
+  contract = Contract(conId=con_id, localSymbol=f"OPT{con_id}", multiplier="100")
+  return Position("U1", contract, quantity, avg_cost)
+
+def test_position_update_and_close(book: PositionBook) -> None:
+  """Test that positions are added, updated and removed by conId."""
+  book.on_position(make_position(1, 2, 150.0))
+  assert book.net_position(1) == 2
+  assert book.get(1)[0].avg_cost == 1.5
+
+  book.on_position(make_position(1, 5, 200.0))
+  assert book.net_position(1) == 5
+  assert len(book.records()) == 1
+
+  book.on_position(make_position(1, 0, 0.0))
+  assert book.net_position(1) == 0
+  assert book.records() == []
+
+def test_pnl_single_updates_entry(book: PositionBook) -> None:
+  """Test that PnL updates are stored on the matching entry."""
+  book.on_position(make_position(1, 2, 150.0))
+  book.on_pnl_single(PnLSingle("U1", "", 1, 10.0, 5.0, float("nan"), 2, 300.0))
+
+  record = book.records()[0]
+  assert record["dailyPnL"] == 10.0
+  assert record["realizedPnL"] is None
+  assert record["marketValue"] == 300.0
+  assert "account" not in record
+
+def test_execution_marks_entry_stale(book: PositionBook) -> None:
+  """Test that a fill marks the entry stale until the next position update."""
+  book.on_position(make_position(1, 2, 150.0))
+  fill = MagicMock()
+  fill.contract.conId = 1
+  fill.execution.acctNumber = "U1"
+
+  book.on_exec_details(MagicMock(), fill)
+  assert book.records()[0]["stale"] is True
+
+  book.on_position(make_position(1, 3, 150.0))
+  assert book.records()[0]["stale"] is False
+
+def test_sync_drops_positions_closed_while_disconnected(book: PositionBook) -> None:
+  """Test that a reconnect sync removes the entries the gateway no longer reports."""
+  book.on_position(make_position(1, 2, 150.0))
+  book.on_position(make_position(2, 1, 100.0))
+  book.on_disconnected()
+
+  book.ib.positions.return_value = [make_position(2, 1, 100.0)]
+  book.sync()
+
+  assert book.net_position(1) == 0
+  assert [record["contractId"] for record in book.records()] == [2]
+  assert book.records()[0]["stale"] is False
@@ -0,0 +1,77 @@
+"""Tests for the prompt summaries query."""
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+from src.web.routes.prompts import encode_prompt_cursor, fetch_prompt_summaries, fetch_usage_totals
+
+def make_row(prompt_id: int) -> SimpleNamespace:
+  """Create a prompt summary row."""
+  return SimpleNamespace(
+    id=prompt_id,
+    content=f"Prompt {prompt_id}",
+    created_at=datetime(2025, 6, 2, 14, 30, prompt_id),
+    schedule_count=prompt_id,
+    last_executed_at=datetime(2025, 6, 3) if prompt_id % 2 else None,
+    success_rate=0.6667 if prompt_id % 2 else None,
+    total_tokens=1000 * prompt_id,
+    total_cost=0.01 * prompt_id,
+    max_tokens=None,
+    max_iterations=5,
+    max_seconds=None,
+  )
+
+@pytest.mark.asyncio
+async def test_fetch_summaries_aggregates_in_one_query(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that a page of prompts and their statistics comes from one query."""
+  monkeypatch.setattr("src.web.routes.prompts.settings.prompts_page_size", 2)
+  result = MagicMock()
+  result.all.return_value = [make_row(3), make_row(2), make_row(1)]
+  db = AsyncMock()
+  db.execute.return_value = result
+
+  cursor = encode_prompt_cursor(4, datetime(2025, 6, 2, 14, 30, 4))
+  prompts, next_cursor = await fetch_prompt_summaries(db, cursor)
+
+  assert db.execute.await_count == 1
+  assert [prompt["id"] for prompt in prompts] == [3, 2]
+  assert prompts[0]["schedule_count"] == 3
+  assert prompts[0]["last_executed_at"] == "2025-06-03T00:00:00Z"
+  assert prompts[0]["success_rate"] == 0.667
+  assert prompts[1]["success_rate"] is None
+  assert prompts[0]["total_tokens"] == 3000
+  assert prompts[0]["max_iterations"] == 5
+  assert next_cursor == encode_prompt_cursor(2, datetime(2025, 6, 2, 14, 30, 2))
+
+  sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+  # Only the prompts of the page are aggregated
+  assert sql.count("LATERAL") == 3
+  assert "GROUP BY" not in sql
+  assert "executions.prompt_id = anon_1.id" in sql
+  # Pruned executions are counted from their rollups
+  assert "execution_rollups.prompt_id = anon_1.id" in sql
+  assert "sum(executions.cost)" in sql
+  assert "(prompts.created_at, prompts.id) < (" in sql
+  assert sql.index("LIMIT") < sql.index("LATERAL")
+
+@pytest.mark.asyncio
+async def test_usage_totals_include_rollups() -> None:
+  """Test that the usage totals add the executions pruned into rollups."""
+  result = MagicMock()
+  result.one.return_value._mapping = {
+    "day_executions": 2, "day_tokens": 300, "day_cost": 0.02,
+    "month_executions": 10, "month_tokens": 1500, "month_cost": 0.1,
+    "rollup_day_executions": 0, "rollup_day_tokens": 0, "rollup_day_cost": 0,
+    "rollup_month_executions": 5, "rollup_month_tokens": 700, "rollup_month_cost": 0.05,
+  }
+  db = AsyncMock()
+  db.execute.return_value = result
+
+  usage = await fetch_usage_totals(db)
+
+  assert db.execute.await_count == 1
+  assert usage["day"] == {"executions": 2, "tokens": 300, "cost": 0.02}
+  assert usage["month"] == {"executions": 15, "tokens": 2200, "cost": 0.15}
+  sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+  assert "sum(execution_rollups.total_tokens)" in sql
@@ -0,0 +1,85 @@
+"""Tests for the query budgets and usage accounting."""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from mcp_client import BudgetExceededError, MCPClient, QueryBudget
+from src.utilities import Settings
+from src.web.database import DBScheduleExecution
+from src.web.executions import record_usage
+
+class ToolLoopStream:
+  """Message stream always asking for another tool call."""
+
+  async def __aenter__(self) -> "ToolLoopStream":
+    """Open the stream."""
+    self.text_stream = self._text()
+    return self
+
+  async def __aexit__(self, *args: object) -> None:
+    """Close the stream."""
+
+  async def _text(self):
+    """Stream the text of the message."""
+    yield "Checking positions"
+
+  async def get_final_message(self) -> SimpleNamespace:
+    """Get the message with its usage."""
+    return SimpleNamespace(
+      content=[
+        SimpleNamespace(type="text", text="Checking positions"),
+        SimpleNamespace(type="tool_use", id="call", name="ibkr_get_positions", input={}),
+      ],
+      usage=SimpleNamespace(
+        input_tokens=1000,
+        output_tokens=100,
+        cache_creation_input_tokens=None,
+        cache_read_input_tokens=500,
+      ),
+    )
+
+@pytest.mark.asyncio
+async def test_runaway_tool_loop_is_stopped() -> None:
+  """Test that a query asking for tools forever stops at its iteration limit."""
+  client = MCPClient(Settings())
+  client.anthropic = MagicMock()
+  client.anthropic.messages.stream = lambda **kwargs: ToolLoopStream()
+  client.session = AsyncMock()
+  client.session.list_tools.return_value = SimpleNamespace(tools=[])
+  client.session.call_tool.return_value = SimpleNamespace(content="[]", isError=False)
+
+  with pytest.raises(BudgetExceededError) as error:
+    await client.process_query("Rebalance", QueryBudget(max_iterations=3))
+
+  assert error.value.limit == "3 iterations"
+  assert error.value.partial_result.startswith("Checking positions")
+  assert client.usage == {
+    "input_tokens": 3000,
+    "output_tokens": 300,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 1500,
+    "tool_calls": 3,
+    "iterations": 3,
+  }
+
+  with pytest.raises(BudgetExceededError, match="3000 tokens"):
+    await client.process_query("Rebalance", QueryBudget(max_tokens=3000))
+  assert client.usage["iterations"] == 2
+
+def test_usage_is_recorded_with_cost(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that the usage of a query is stored with its cost on the execution."""
+  monkeypatch.setattr("src.web.executions.settings.llm_input_price", 3.0)
+  monkeypatch.setattr("src.web.executions.settings.llm_output_price", 15.0)
+  monkeypatch.setattr("src.web.executions.settings.llm_cache_read_price", 0.3)
+  execution = DBScheduleExecution()
+
+  record_usage(execution, {
+    "input_tokens": 1_000_000,
+    "output_tokens": 100_000,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 1_000_000,
+    "tool_calls": 4,
+    "iterations": 3,
+  })
+
+  assert execution.tool_calls == 4
+  assert execution.cost == pytest.approx(3.0 + 1.5 + 0.3)
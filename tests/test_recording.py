@@ -0,0 +1,82 @@
+"""Tests for the recording and offline replay of executions."""
+import gzip
+import json
+import os
+import httpx
+import pytest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+from anthropic import AsyncAnthropic
+from mcp.types import CallToolResult, ListToolsResult, TextContent
+from mcp_client import MCPClient
+from src.loadtest.replay import ReplayMismatchError, replay
+from src.loadtest.stub_server import FINAL_ANSWER, SCRIPT, create_stub_app
+from src.utilities import Settings
+from src.utilities.recording import Recorder, load_recording, recorded
+
+async def record_query(path: Path) -> str:
+  """Record a query of the scripted model, with an IB request of the server."""
+  recorder = Recorder()
+  client = MCPClient(Settings(), recorder=recorder)
+  client.anthropic = AsyncAnthropic(
+    api_key="test",
+    base_url="http://stub",
+    http_client=httpx.AsyncClient(transport=httpx.ASGITransport(create_stub_app(0))),
+  )
+  client.session = AsyncMock()
+  client.session.list_tools.return_value = ListToolsResult(tools=[])
+
+  async def call_tool(name: str, arguments: dict) -> CallToolResult:
+    # As the MCP server process started with the recorder environment
+    with patch.dict(os.environ, recorder.environment()), recorded("ib", request="reqPositions") as event:
+      event["response"] = []
+    return CallToolResult(content=[TextContent(type="text", text=f"{name} done")], isError=False)
+
+  client.session.call_tool.side_effect = call_tool
+  result = await client.process_query("Check the positions")
+  recorder.save(path)
+  return result
+
+@pytest.mark.asyncio
+async def test_replay_reproduces_recorded_query(tmp_path: Path) -> None:
+  """Test that a recorded query replays offline to the same result."""
+  path = tmp_path / "1.jsonl.gz"
+  result = await record_query(path)
+
+  events = load_recording(path)
+  assert [event["kind"] for event in events[:4]] == ["query", "llm", "tool", "ib"]
+  assert [event["start"] for event in events] == sorted(event["start"] for event in events)
+  assert events[-1] == {"kind": "result", "start": events[-1]["start"], "result": result}
+
+  report = await replay(path, 0, Settings())
+
+  assert report["matches"]
+  assert report["result"].endswith(FINAL_ANSWER)
+  assert report["usage"]["tool_calls"] == len(SCRIPT)
+  assert report["stages"]["ib reqPositions"]["count"] == len(SCRIPT)
+
+@pytest.mark.asyncio
+async def test_replay_detects_diverging_query(tmp_path: Path) -> None:
+  """Test that a replay fails when the query makes calls that were not recorded."""
+  path = tmp_path / "1.jsonl.gz"
+  await record_query(path)
+  events = [event for event in load_recording(path) if event.get("tool") != SCRIPT[2][0]]
+  with gzip.open(path, "wt") as f:
+    f.writelines(json.dumps(event) + "\n" for event in events)
+
+  with pytest.raises(ReplayMismatchError):
+    await replay(path, 0, Settings())
+
+def test_recorder_removes_server_file(tmp_path: Path) -> None:
+  """Test that the event file of the server is removed, saved or not."""
+  discarded = Recorder()
+  discarded.discard()
+  assert not discarded.server_file.exists()
+
+  # An unreadable event file is removed, though the archive is not written
+  failed = Recorder()
+  failed.server_file.write_text("not json\n")
+  with pytest.raises(json.JSONDecodeError):
+    failed.save(tmp_path / "1.jsonl.gz")
+  assert not failed.server_file.exists()
+  assert not (tmp_path / "1.jsonl.gz").exists()
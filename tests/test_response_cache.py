@@ -0,0 +1,106 @@
+"""Tests for the response cache of repeated queries."""
+import json
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from mcp_client import MCPClient
+from src.utilities import Settings
+from src.utilities.response_cache import ResponseCache
+
+USAGE = SimpleNamespace(
+  input_tokens=100, output_tokens=10, cache_creation_input_tokens=0, cache_read_input_tokens=0,
+)
+
+class ScriptedStream:
+  """Message stream returning a given message."""
+
+  def __init__(self, content: list[SimpleNamespace]) -> None:
+    """Initialize the stream with the content of the message."""
+    self.content = content
+
+  async def __aenter__(self) -> "ScriptedStream":
+    """Open the stream."""
+    self.text_stream = self._text()
+    return self
+
+  async def __aexit__(self, *args: object) -> None:
+    """Close the stream."""
+
+  async def _text(self):
+    """Stream no text deltas."""
+    for _ in ():
+      yield
+
+  async def get_final_message(self) -> SimpleNamespace:
+    """Get the message with its usage."""
+    return SimpleNamespace(content=self.content, usage=USAGE)
+
+def positions(quantity: int) -> SimpleNamespace:
+  """Create a positions tool result."""
+  data = [
+    {"contract": "AAPL", "position": quantity, "avgCost": 150.0, "contractId": 265598, "unrealizedPnL": 12.5},
+  ]
+  return SimpleNamespace(
+    content=[SimpleNamespace(type="text", text=f"Current Positions: {json.dumps(data)}")],
+    isError=False,
+  )
+
+def client_calling(tool_name: str, cache: ResponseCache, tool_result: SimpleNamespace) -> MCPClient:
+  """Create a client whose model calls one tool and then answers."""
+  messages = iter([
+    [SimpleNamespace(type="tool_use", id="call", name=tool_name, input={})],
+    [SimpleNamespace(type="text", text="Hold AAPL")],
+  ])
+  client = MCPClient(Settings(), response_cache=cache)
+  client.anthropic = MagicMock()
+  client.anthropic.messages.stream = MagicMock(side_effect=lambda **kwargs: ScriptedStream(next(messages)))
+  client.session = AsyncMock()
+  client.session.list_tools.return_value = SimpleNamespace(tools=[])
+  client.session.call_tool.return_value = tool_result
+  return client
+
+@pytest.mark.asyncio
+async def test_answer_reused_while_positions_unchanged(tmp_path: Path) -> None:
+  """Test that an answer is reused until the held positions change."""
+  cache = ResponseCache(str(tmp_path), ttl=3600, quote_bucket=300, tool_ttl=0)
+  first = client_calling("ibkr_get_positions", cache, positions(10))
+  answer = await first.process_query("Review my portfolio")
+
+  # PnL updates do not invalidate the answer, no LLM call is made
+  changed_pnl = positions(10)
+  changed_pnl.content[0].text = changed_pnl.content[0].text.replace("12.5", "20.0")
+  second = client_calling("ibkr_get_positions", cache, changed_pnl)
+  assert await second.process_query("Review my portfolio") == answer
+  second.anthropic.messages.stream.assert_not_called()
+  assert second.usage["tool_calls"] == 1
+
+  third = client_calling("ibkr_get_positions", cache, positions(20))
+  await third.process_query("Review my portfolio")
+  assert third.anthropic.messages.stream.call_count == 2
+
+@pytest.mark.asyncio
+async def test_trading_answers_not_cached(tmp_path: Path) -> None:
+  """Test that answers of queries placing orders are never stored."""
+  cache = ResponseCache(str(tmp_path), ttl=3600, quote_bucket=300, tool_ttl=60)
+  order = SimpleNamespace(content=[SimpleNamespace(type="text", text="Order placed")], isError=False)
+  client = client_calling("ibkr_trade_simple_contract", cache, order)
+
+  await client.process_query("Buy 10 AAPL")
+
+  assert cache.lookup(Settings().chat_model, "Buy 10 AAPL") is None
+  assert cache.cached_tool_result("ibkr_trade_simple_contract", {}) is None
+
+def test_live_results_not_reused_and_dropped_after_orders(tmp_path: Path) -> None:
+  """Test that positions are never reused and other results are dropped once an order is placed."""
+  cache = ResponseCache(str(tmp_path), ttl=0, quote_bucket=300, tool_ttl=60)
+  details = SimpleNamespace(content=[], isError=False)
+  cache.remember_tool_result("ibkr_get_positions", {}, positions(10))
+  cache.remember_tool_result("ibkr_get_contract_details", {"symbol": "AAPL"}, details)
+  assert cache.cached_tool_result("ibkr_get_positions", {}) is None
+  assert cache.cached_tool_result("ibkr_get_contract_details", {"symbol": "AAPL"}) is details
+
+  cache.forget_tool_results("fmp_get_stock_quote")
+  assert cache.cached_tool_result("ibkr_get_contract_details", {"symbol": "AAPL"}) is details
+  cache.forget_tool_results("ibkr_trade_batch")
+  assert cache.cached_tool_result("ibkr_get_contract_details", {"symbol": "AAPL"}) is None
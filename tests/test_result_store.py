@@ -0,0 +1,54 @@
+"""Tests for the execution result store."""
+import pytest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+from src.web.database import DBExecutionResult, DBScheduleExecution
+from src.web.result_store import ResultStore
+
+LONG_RESULT = "[tool][yellow]" + "position " * 500 + "[/yellow][/tool]"
+
+@pytest.mark.asyncio
+async def test_small_result_stays_inline(tmp_path: Path) -> None:
+  """Test that short results are stored in the executions table."""
+  store = ResultStore("database", str(tmp_path), inline_limit=100)
+  db = MagicMock()
+  execution = DBScheduleExecution(id=1)
+
+  await store.save(db, execution, "Done")
+
+  assert execution.result == "Done"
+  db.add.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_large_result_in_database(tmp_path: Path) -> None:
+  """Test that large results are compressed into the result table."""
+  store = ResultStore("database", str(tmp_path), inline_limit=100)
+  db = MagicMock()
+  execution = DBScheduleExecution(id=1)
+
+  await store.save(db, execution, LONG_RESULT)
+
+  assert execution.result == LONG_RESULT[:100]
+  stored = db.add.call_args.args[0]
+  assert isinstance(stored, DBExecutionResult)
+  assert stored.size == len(LONG_RESULT)
+  assert len(stored.data) < len(LONG_RESULT) / 10
+
+  db.get = AsyncMock(return_value=stored)
+  assert await store.load(db, execution) == LONG_RESULT
+
+@pytest.mark.asyncio
+async def test_large_result_in_files(tmp_path: Path) -> None:
+  """Test that large results can be kept in files and deleted with retention."""
+  store = ResultStore("files", str(tmp_path), inline_limit=100)
+  db = MagicMock()
+  db.get = AsyncMock(return_value=None)
+  execution = DBScheduleExecution(id=7)
+
+  await store.save(db, execution, LONG_RESULT)
+  db.add.assert_not_called()
+  assert await store.load(db, execution) == LONG_RESULT
+
+  store.delete_files([7])
+  assert list(tmp_path.iterdir()) == []
+  assert await store.load(db, execution) == LONG_RESULT[:100]
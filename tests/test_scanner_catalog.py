@@ -0,0 +1,116 @@
+"""Tests for the scanner parameters catalog."""
+import pytest
+from pathlib import Path
+from unittest.mock import AsyncMock
+from src.ib_helper.scanner_catalog import ScannerCatalog
+
+SCANNER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<ScanParameterResponse>
+  <InstrumentList varName="fullInstrumentList">
+    <Instrument>
+      <name>US Stocks</name>
+      <type>STK</type>
+      <filters>PRICE,VOLUME</filters>
+    </Instrument>
+    <Instrument>
+      <name>US Futures</name>
+      <type>FUT.US</type>
+      <filters>PRICE</filters>
+    </Instrument>
+  </InstrumentList>
+  <LocationTree varName="locationTree">
+    <Location>
+      <displayName>US Stocks</displayName>
+      <locationCode>STK.US</locationCode>
+      <instruments>STK</instruments>
+      <LocationTree>
+        <Location>
+          <displayName>NYSE</displayName>
+          <locationCode>STK.NYSE</locationCode>
+          <instruments>STK</instruments>
+        </Location>
+      </LocationTree>
+    </Location>
+  </LocationTree>
+  <ScanTypeList varName="scanTypeList">
+    <ScanType>
+      <displayName>Top % Gainers</displayName>
+      <scanCode>TOP_PERC_GAIN</scanCode>
+      <instruments>STK,FUT.US</instruments>
+    </ScanType>
+    <ScanType>
+      <displayName>Most Active</displayName>
+      <scanCode>MOST_ACTIVE</scanCode>
+      <instruments>STK</instruments>
+    </ScanType>
+  </ScanTypeList>
+  <FilterList varName="filterList">
+    <RangeFilter>
+      <id>PRICE</id>
+      <category>PriceVolume</category>
+      <AbstractField type="DoubleField">
+        <code>priceAbove</code>
+        <displayName>Price Above</displayName>
+      </AbstractField>
+      <AbstractField type="DoubleField">
+        <code>priceBelow</code>
+        <displayName>Price Below</displayName>
+      </AbstractField>
+    </RangeFilter>
+    <RangeFilter>
+      <id>VOLUME</id>
+      <category>PriceVolume</category>
+      <AbstractField type="IntField">
+        <code>volumeAbove</code>
+        <displayName>Volume Above</displayName>
+      </AbstractField>
+    </RangeFilter>
+  </FilterList>
+</ScanParameterResponse>
+"""
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> ScannerCatalog:
+  """Create a catalog with its on-disk copy in a temporary directory."""
+  return ScannerCatalog(str(tmp_path / "scanner_params.xml"), max_age=3600)
+
+@pytest.mark.asyncio
+async def test_load_parses_indexes(catalog: ScannerCatalog) -> None:
+  """Test that all codes are indexed, including nested locations."""
+  await catalog.load(AsyncMock(return_value=SCANNER_XML))
+
+  assert list(catalog.instruments) == ["STK", "FUT.US"]
+  assert list(catalog.locations) == ["STK.US", "STK.NYSE"]
+  assert list(catalog.filters) == ["priceAbove", "priceBelow", "volumeAbove"]
+  assert list(catalog.scan_codes) == ["TOP_PERC_GAIN", "MOST_ACTIVE"]
+  assert catalog.filters_for("FUT.US") == {"priceAbove", "priceBelow"}
+
+@pytest.mark.asyncio
+async def test_load_downloads_once(catalog: ScannerCatalog) -> None:
+  """Test that the XML is downloaded once and reused from disk."""
+  fetch = AsyncMock(return_value=SCANNER_XML)
+  await catalog.load(fetch)
+  await catalog.load(fetch)
+
+  reloaded = ScannerCatalog(str(catalog.cache_file), max_age=3600)
+  await reloaded.load(fetch)
+
+  fetch.assert_called_once()
+  assert reloaded.scan_codes == catalog.scan_codes
+
+@pytest.mark.asyncio
+async def test_search_by_substring_and_instrument(catalog: ScannerCatalog) -> None:
+  """Test substring search restricted to an instrument."""
+  await catalog.load(AsyncMock(return_value=SCANNER_XML))
+
+  assert catalog.search("scan_code", "gain") == [
+    {"code": "TOP_PERC_GAIN", "name": "Top % Gainers"},
+  ]
+  assert catalog.search("scan_code", "", instrument_code="FUT.US") == [
+    {"code": "TOP_PERC_GAIN", "name": "Top % Gainers"},
+  ]
+  assert catalog.search("filter", "above", instrument_code="FUT.US") == [
+    {"code": "priceAbove", "name": "Price Above"},
+  ]
+  with pytest.raises(ValueError, match="Unknown scanner code kind"):
+    catalog.search("exchange", "")
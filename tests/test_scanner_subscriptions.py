@@ -0,0 +1,90 @@
+"""Tests for the scanner subscription manager."""
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from ib_async.contract import Contract, ContractDetails
+from ib_async.objects import ScanData, ScanDataList, ScannerSubscription
+from src.ib_helper.scanner_subscriptions import (
+  ScannerSubscriptionManager,
+  diff_scan_rows,
+)
+
+def make_row(con_id: int, rank: int) -> dict:
+  """Create a scan row."""
+  return {"conId": con_id, "symbol": f"S{con_id}", "rank": rank}
+
+def make_scan_data(con_id: int, rank: int) -> ScanData:
+  """Create scan data for a stock."""
+  details = ContractDetails(contract=Contract(conId=con_id, symbol=f"S{con_id}"))
+  return ScanData(rank, details, "", "", "", "")
+
+def test_diff_scan_rows() -> None:
+  """Test that added, removed and re-ranked rows are reported."""
+  previous = {1: make_row(1, 0), 2: make_row(2, 1), 3: make_row(3, 2)}
+  current = {2: make_row(2, 0), 3: make_row(3, 2), 4: make_row(4, 1)}
+
+  diff = diff_scan_rows(previous, current)
+  assert [row["conId"] for row in diff["added"]] == [4]
+  assert [row["conId"] for row in diff["removed"]] == [1]
+  assert diff["moved"] == [{**make_row(2, 0), "previousRank": 1}]
+  assert diff["unchanged"] == 1
+
+@pytest.mark.asyncio
+async def test_updates_reuse_running_scan() -> None:
+  """Test that repeated calls read the running scan instead of starting a new one."""
+  data_list = ScanDataList()
+  data_list.append(make_scan_data(1, 0))
+
+  def start_scan(*_: object) -> ScanDataList:
+    asyncio.get_running_loop().call_soon(data_list.updateEvent.emit, data_list)
+    return data_list
+
+  ib = MagicMock()
+  ib.reqScannerSubscription.side_effect = start_scan
+  manager = ScannerSubscriptionManager(max_subscriptions=1)
+  manager.attach(ib)
+  subscription = ScannerSubscription(instrument="STK", scanCode="TOP_PERC_GAIN")
+
+  first = await manager.updates("gainers", subscription, [], timeout=1)
+  assert [row["conId"] for row in first["added"]] == [1]
+
+  data_list.append(make_scan_data(2, 1))
+  data_list.updateEvent.emit(data_list)
+  second = await manager.updates("gainers", subscription, [], timeout=1)
+  assert [row["conId"] for row in second["added"]] == [2]
+  assert second["unchanged"] == 1
+  assert ib.reqScannerSubscription.call_count == 1
+
+  with pytest.raises(RuntimeError):
+    await manager.updates("other", subscription, [], timeout=1)
+
+  assert manager.stop("gainers") is True
+  ib.cancelScannerSubscription.assert_called_once_with(data_list)
+
+@pytest.mark.asyncio
+async def test_failed_and_disconnected_scans_released() -> None:
+  """Test that a scan without a result and the scans of a lost connection are released."""
+  data_lists = []
+
+  def start_scan(*_: object) -> ScanDataList:
+    data_lists.append(ScanDataList())
+    return data_lists[-1]
+
+  ib = MagicMock()
+  ib.reqScannerSubscription.side_effect = start_scan
+  manager = ScannerSubscriptionManager(max_subscriptions=1)
+  manager.attach(ib)
+  subscription = ScannerSubscription(instrument="STK", scanCode="TOP_PERC_GAIN")
+
+  with pytest.raises(TimeoutError):
+    await manager.updates("gainers", subscription, [], timeout=0.01)
+  assert manager.names() == []
+  ib.cancelScannerSubscription.assert_called_once_with(data_lists[0])
+
+  task = asyncio.create_task(manager.updates("losers", subscription, [], timeout=1))
+  await asyncio.sleep(0)
+  manager.on_disconnected()
+  assert manager.names() == []
+  assert len(data_lists[1].updateEvent) == 0
+  task.cancel()
+  await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,113 @@
+"""Tests for the scanner client."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from ib_async.contract import Contract, ContractDetails
+from ib_async.objects import ScanData
+from ib_async.ticker import Ticker
+from src.ib_helper.scanner_subscriptions import ScannerSubscriptionManager
+from src.ib_helper.scanners import ScanSpec, ScannerClient
+
+@pytest.fixture
+def scanner_client() -> ScannerClient:
+  """Create a ScannerClient with a mocked IB connection."""
+  client = ScannerClient()
+  client.ib = MagicMock()
+  client.ib.isConnected.return_value = True
+  client._is_market_open = MagicMock(return_value=True)
+  return client
+
+def make_scan_data(con_id: int, rank: int) -> ScanData:
+  """Create scan data for a stock."""
+  details = ContractDetails(contract=Contract(conId=con_id, symbol=f"S{con_id}"))
+  return ScanData(rank, details, "", "", "", "")
+
+@pytest.mark.asyncio
+async def test_scanner_market_data_in_one_batch(scanner_client: ScannerClient) -> None:
+  """Test that scan rows are enriched with a single batched ticker request."""
+  rows = [make_scan_data(1, 0), make_scan_data(2, 1)]
+  tickers = [
+    Ticker(contract=rows[0].contractDetails.contract, last=11.0, close=10.0, volume=500),
+    Ticker(contract=rows[1].contractDetails.contract, close=20.0),
+  ]
+  scanner_client.ib.reqScannerDataAsync = AsyncMock(return_value=rows)
+  scanner_client.ib.reqTickersAsync = AsyncMock(return_value=tickers)
+
+  result = await scanner_client.get_scanner_market_data(
+    ScanSpec("STK", "STK.US", ["priceAbove=10"]),
+  )
+
+  scanner_client.ib.reqTickersAsync.assert_awaited_once_with(
+    rows[0].contractDetails.contract,
+    rows[1].contractDetails.contract,
+  )
+  scanner_client.ib.qualifyContractsAsync.assert_not_called()
+  assert result[0] == {
+    "rank": 0,
+    "conId": 1,
+    "symbol": "S1",
+    "price": 11.0,
+    "changePercent": 10.0,
+    "volume": 500,
+    "impliedVol": None,
+  }
+  assert result[1]["price"] == 20.0
+  assert result[1]["changePercent"] == 0.0
+
+@pytest.mark.asyncio
+async def test_multi_scanner_merges_on_con_id(scanner_client: ScannerClient) -> None:
+  """Test that scans run concurrently and are merged into one ranking."""
+  scans = {
+    "TOP_PERC_GAIN": [make_scan_data(1, 0), make_scan_data(2, 1)],
+    "MOST_ACTIVE": [make_scan_data(2, 0), make_scan_data(3, 1)],
+  }
+
+  async def scan(subscription: object, *_: object) -> list[ScanData]:
+    if subscription.scanCode == "HOT_BY_VOLUME":
+      msg = "Scanner subscription cancelled"
+      raise RuntimeError(msg)
+    return scans[subscription.scanCode]
+
+  scanner_client.ib.reqScannerDataAsync = AsyncMock(side_effect=scan)
+
+  result = await scanner_client.get_multi_scanner_results(
+    "STK",
+    "STK.US",
+    ["TOP_PERC_GAIN", "MOST_ACTIVE", "HOT_BY_VOLUME"],
+    [],
+  )
+
+  assert [row["conId"] for row in result["results"]] == [2, 1, 3]
+  assert result["results"][0]["ranks"] == {"TOP_PERC_GAIN": 1, "MOST_ACTIVE": 0}
+  assert result["results"][0]["score"] == 1.5
+  assert list(result["errors"]) == ["HOT_BY_VOLUME"]
+
+@pytest.mark.asyncio
+async def test_concurrent_scans_share_gateway_slots(scanner_client: ScannerClient) -> None:
+  """Test that concurrent callers together stay within the scanner limit."""
+  scanner_client.scanner_subscriptions = ScannerSubscriptionManager(max_subscriptions=2)
+  running = 0
+  peak = 0
+
+  async def scan(*_: object) -> list[ScanData]:
+    nonlocal running, peak
+    running += 1
+    peak = max(peak, running)
+    await asyncio.sleep(0.01)
+    running -= 1
+    return [make_scan_data(1, 0)]
+
+  scanner_client.ib.reqScannerDataAsync = AsyncMock(side_effect=scan)
+
+  await asyncio.gather(*(
+    scanner_client.get_multi_scanner_results(
+      "STK",
+      "STK.US",
+      ["TOP_PERC_GAIN", "MOST_ACTIVE"],
+      [],
+    )
+    for _ in range(3)
+  ))
+
+  assert scanner_client.ib.reqScannerDataAsync.await_count == 6
+  assert peak == 2
@@ -0,0 +1,38 @@
+"""Tests for the memoization of read-only MCP tools."""
+import pytest
+from pathlib import Path
+from src.mcp_servers import memoize as memo
+from src.mcp_servers.memoize import FileBackend, MemoryBackend, memoize
+
+@pytest.mark.asyncio
+async def test_results_memoized_by_normalized_arguments(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that calls with equivalent arguments share a result and errors are not stored."""
+  monkeypatch.setattr(memo, "backend", MemoryBackend(max_entries=10))
+  calls = []
+
+  @memoize(ttl=60)
+  async def get_calendar(num_days: int = 5) -> str:
+    calls.append(num_days)
+    return "Error getting calendar" if len(calls) == 1 else f"{num_days} days"
+
+  assert await get_calendar() == "Error getting calendar"
+  assert await get_calendar(num_days=5) == "5 days"
+  assert await get_calendar(5) == "5 days"
+  assert await get_calendar(3) == "3 days"
+  assert calls == [5, 5, 3]
+
+  with pytest.raises(ValueError, match="trade_batch"):
+    @memoize(ttl=60)
+    async def trade_batch(orders: list[dict]) -> str:
+      return "Order placed"
+
+def test_backends_evict_beyond_max_entries(tmp_path: Path) -> None:
+  """Test that the memory and file backends keep at most max_entries results."""
+  for backend in (MemoryBackend(max_entries=2), FileBackend(str(tmp_path), max_entries=2)):
+    backend.set("a", "A", ttl=60)
+    backend.set("b", "B", ttl=60)
+    backend.set("expired", "E", ttl=-1)
+
+    assert backend.get("a") is None
+    assert backend.get("b") == "B"
+    assert backend.get("expired") is None
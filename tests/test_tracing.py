@@ -0,0 +1,50 @@
+"""Tests for the execution tracing."""
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from src.utilities import tracing
+
+pytest.importorskip("opentelemetry.sdk.trace")
+
+def test_spans_are_read_back_as_waterfall(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that nested spans are exported to the trace file and read back in order."""
+  trace_file = tmp_path / "traces.jsonl"
+  monkeypatch.setattr(tracing.settings, "tracing_file", str(trace_file))
+  monkeypatch.delenv("TRACEPARENT", raising=False)
+  tracing.setup_tracing("test")
+
+  with tracing.span("execution", prompt_id=1, schedule_id=None):
+    trace_id = tracing.current_trace_id()
+    environment = tracing.trace_environment()
+    with tracing.span("llm.messages", iteration=1):
+      pass
+    with pytest.raises(ValueError), tracing.span("tool.ibkr_get_positions"):
+      raise ValueError("Gateway down")
+
+  assert environment["TRACEPARENT"].split("-")[1] == trace_id
+
+  spans = tracing.read_trace(trace_id)
+  assert tracing.read_trace(trace_id, datetime.now(timezone.utc).replace(tzinfo=None)) == spans
+  assert [(span["name"], span["depth"]) for span in spans] == [
+    ("execution", 0), ("llm.messages", 1), ("tool.ibkr_get_positions", 1),
+  ]
+  assert spans[0]["attributes"] == {"prompt_id": 1}
+  assert spans[0]["service"] == "test"
+  assert spans[2]["status"] == "ERROR"
+  assert spans[0]["offset_ms"] == 0
+  assert spans[0]["duration_ms"] >= spans[1]["duration_ms"]
+  assert tracing.read_trace("0" * 32) == []
+
+def test_old_trace_files_pruned(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+  """Test that the trace files beyond the retention are deleted."""
+  monkeypatch.setattr(tracing.settings, "tracing_file", str(tmp_path / "traces.jsonl"))
+  monkeypatch.setattr(tracing.settings, "tracing_retention_days", 7)
+  today = datetime.now(timezone.utc).date()
+  for days in (0, 7, 8, 30):
+    tracing.trace_file(today - timedelta(days=days)).write_text("")
+
+  assert tracing.prune_traces() == 2
+  assert sorted(path.name for path in tmp_path.iterdir()) == [
+    tracing.trace_file(today - timedelta(days=7)).name, tracing.trace_file(today).name,
+  ]
+  assert tracing.trace_file(date(2025, 6, 2)).name == "traces-2025-06-02.jsonl"
@@ -1,10 +1,11 @@
 """Tests for the trading client."""
+import asyncio
 import pytest
 import json
 from unittest.mock import AsyncMock, MagicMock
-from ib_async.contract import Contract
-from ib_async.order import Order
-from src.ib_helper.trading import TradingClient
+from ib_async.contract import ComboLeg, Contract
+from ib_async.order import Order, OrderState, OrderStatus, Trade
+from src.ib_helper.trading import OrderSpec, TradingClient
 
 @pytest.fixture
 def mock_ib() -> AsyncMock:
@@ -12,6 +13,7 @@ def mock_ib() -> AsyncMock:
   mock = AsyncMock()
   mock.placeOrder = MagicMock()
   mock.cancelOrder = AsyncMock()
+  mock.whatIfOrderAsync = AsyncMock(return_value=OrderState())
   return mock
 
 @pytest.fixture
@@ -28,7 +30,9 @@ def trading_client(mock_ib: AsyncMock, mock_notification_bot: AsyncMock) -> Trad
   client = TradingClient()
   client.ib = mock_ib
   client.notification_bot = mock_notification_bot
+  client.order_journal = MagicMock()
   client._bot_started = True
+  client.config.order_fill_timeout = 1
   return client
 
 @pytest.mark.asyncio
@@ -42,21 +46,21 @@ async def test_execute_order_success(trading_client: TradingClient, mock_ib: Asy
 
   # Mock trade object
   mock_trade = MagicMock()
-  mock_trade.orderStatus.status = "Filled"
-  mock_trade.orderStatus.avgFillPrice = 150.0
-  mock_trade.dict.return_value = {
-    "orderId": 1,
-    "status": "Filled",
-    "avgFillPrice": 150.0,
-  }
+  mock_trade.contract = contract
+  mock_trade.order = Order(orderId=1, action=action, totalQuantity=quantity)
+  mock_trade.orderStatus = OrderStatus(
+    orderId=1,
+    status="Filled",
+    filled=quantity,
+    avgFillPrice=150.0,
+  )
+  mock_trade.fills = []
   mock_ib.placeOrder.return_value = mock_trade
 
   # Execute
   result_str = await trading_client._execute_order(
     contract=contract,
-    action=action,
-    quantity=quantity,
-    order_type=order_type,
+    spec=OrderSpec(action, quantity, order_type),
   )
   result = json.loads(result_str)
 
@@ -64,8 +68,8 @@ async def test_execute_order_success(trading_client: TradingClient, mock_ib: Asy
   assert "trade" in result
   assert "error" in result
   assert result["error"] is None
-  assert result["trade"]["status"] == "Filled"
-  assert result["trade"]["avgFillPrice"] == 150.0
+  assert result["trade"]["orderStatus"]["status"] == "Filled"
+  assert result["trade"]["orderStatus"]["avgFillPrice"] == 150.0
 
   # Verify order was placed with correct parameters
   mock_ib.placeOrder.assert_called_once()
@@ -88,9 +92,7 @@ async def test_execute_order_not_approved(
   # Execute
   result_str = await trading_client._execute_order(
     contract=contract,
-    action="BUY",
-    quantity=100,
-    order_type="MKT",
+    spec=OrderSpec("BUY", 100, "MKT"),
   )
   result = json.loads(result_str)
 
@@ -110,15 +112,13 @@ async def test_execute_order_timeout(
 
   # Mock trade object that stays in "Submitted" state
   mock_trade = MagicMock()
-  mock_trade.orderStatus.status = "Submitted"
+  mock_trade.orderStatus = OrderStatus(status="Submitted")
   mock_ib.placeOrder.return_value = mock_trade
 
   # Execute
   result_str = await trading_client._execute_order(
     contract=contract,
-    action="BUY",
-    quantity=100,
-    order_type="MKT",
+    spec=OrderSpec("BUY", 100, "MKT"),
   )
   result = json.loads(result_str)
 
@@ -126,3 +126,157 @@ async def test_execute_order_timeout(
   assert result["trade"] is None
   assert result["error"] == "Order not filled"
   mock_ib.cancelOrder.assert_called_once_with(mock_trade.order)
+
+@pytest.mark.asyncio
+async def test_execute_order_fills_on_status_event(
+  trading_client: TradingClient,
+  mock_ib: AsyncMock,
+) -> None:
+  """Test that a fill reported through the status event completes the order."""
+  contract = Contract(conId=123, symbol="AAPL", secType="STK", exchange="SMART", currency="USD")
+  trade = Trade(
+    contract=contract,
+    order=Order(orderId=1, action="BUY", totalQuantity=100, orderType="LMT"),
+    orderStatus=OrderStatus(orderId=1, status="Submitted"),
+  )
+  mock_ib.placeOrder.return_value = trade
+
+  def fill_later() -> None:
+    trade.orderStatus.status = "Filled"
+    trade.orderStatus.filled = 100
+    trade.statusEvent.emit(trade)
+
+  asyncio.get_running_loop().call_later(0.05, fill_later)
+  result = json.loads(await trading_client._execute_order(
+    contract=contract,
+    spec=OrderSpec("BUY", 100, "LMT", 150.0),
+  ))
+
+  assert result["error"] is None
+  assert result["trade"]["orderStatus"]["status"] == "Filled"
+  mock_ib.cancelOrder.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_execute_limit_order_kept_working(
+  trading_client: TradingClient,
+  mock_ib: AsyncMock,
+) -> None:
+  """Test that an unfilled limit order is kept working by default."""
+  contract = Contract(conId=123, symbol="AAPL", secType="STK", exchange="SMART", currency="USD")
+  trade = Trade(
+    contract=contract,
+    order=Order(orderId=1, action="BUY", totalQuantity=100, orderType="LMT"),
+    orderStatus=OrderStatus(orderId=1, status="Submitted", remaining=100),
+  )
+  mock_ib.placeOrder.return_value = trade
+
+  result = json.loads(await trading_client._execute_order(
+    contract=contract,
+    spec=OrderSpec("BUY", 100, "LMT", 150.0, "GTC"),
+  ))
+
+  assert result["error"] is None
+  assert result["trade"]["orderStatus"]["status"] == "Submitted"
+  assert mock_ib.placeOrder.call_args[0][1].tif == "GTC"
+  mock_ib.cancelOrder.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_trade_batch_single_approval(
+  trading_client: TradingClient,
+  mock_ib: AsyncMock,
+  mock_notification_bot: AsyncMock,
+) -> None:
+  """Test that a batch is approved once and only approved orders are placed."""
+  mock_ib.isConnected = MagicMock(return_value=True)
+  mock_ib.qualifyContractsAsync.side_effect = lambda *contracts: list(contracts)
+  mock_notification_bot.request_batch_approval = AsyncMock(return_value=[True, False])
+  # The third order exceeds the margin
+  mock_ib.whatIfOrderAsync.side_effect = lambda contract, order: (
+    OrderState(initMarginAfter="50000", equityWithLoanAfter="20000")
+    if contract.conId == 3
+    else OrderState()
+  )
+
+  def place_order(contract: Contract, order: Order) -> Trade:
+    return Trade(
+      contract=contract,
+      order=order,
+      orderStatus=OrderStatus(status="Filled", filled=order.totalQuantity),
+    )
+
+  mock_ib.placeOrder.side_effect = place_order
+
+  result = json.loads(await trading_client.trade_batch([
+    {"con_id": 1, "action": "BUY", "quantity": 10, "order_type": "MKT"},
+    {"con_id": 2, "action": "SELL", "quantity": 5, "order_type": "MKT"},
+    {"con_id": 3, "action": "BUY", "quantity": 500, "order_type": "MKT"},
+  ]))
+
+  mock_notification_bot.request_batch_approval.assert_called_once()
+  mock_notification_bot.request_approval.assert_not_called()
+  messages = mock_notification_bot.request_batch_approval.call_args[0][0]
+  assert len(messages) == 2
+  assert all("what_if" in message for message in messages)
+  mock_ib.placeOrder.assert_called_once()
+  assert result["results"][0]["trade"]["orderStatus"]["status"] == "Filled"
+  assert result["results"][1]["error"] == "Order not approved"
+  assert result["results"][2]["error"] == "Order blocked: Insufficient margin"
+  assert result["summary"] == {"orders": 3, "filled": 1, "working": 0, "failed": 2}
+
+@pytest.mark.asyncio
+async def test_execute_order_blocked_by_margin(
+  trading_client: TradingClient,
+  mock_ib: AsyncMock,
+) -> None:
+  """Test that an approved order failing the margin check is not placed."""
+  contract = Contract(conId=123, symbol="AAPL", secType="STK", exchange="SMART", currency="USD")
+  mock_ib.whatIfOrderAsync.return_value = OrderState(
+    initMarginAfter="50000",
+    equityWithLoanAfter="20000",
+  )
+
+  result = json.loads(await trading_client._execute_order(
+    contract=contract,
+    spec=OrderSpec("BUY", 100, "MKT"),
+  ))
+
+  assert result["error"] == "Order blocked: Insufficient margin"
+  mock_ib.placeOrder.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_what_if_cached(
+  trading_client: TradingClient,
+  mock_ib: AsyncMock,
+) -> None:
+  """Test that a repeated identical order reuses the what-if result."""
+  contract = Contract(conId=123, symbol="AAPL", secType="STK", exchange="SMART", currency="USD")
+  order = trading_client._create_order(OrderSpec("BUY", 100, "LMT", 150.0))
+
+  first = await trading_client._what_if(contract, order)
+  second = await trading_client._what_if(contract, order)
+
+  assert first == second
+  mock_ib.whatIfOrderAsync.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_serialize_combo_qualifies_legs_once(
+  trading_client: TradingClient,
+  mock_ib: AsyncMock,
+) -> None:
+  """Test that combo legs are qualified in one batch and cached afterwards."""
+  def qualify(*contracts: Contract) -> list[Contract]:
+    for contract in contracts:
+      contract.localSymbol = f"SPXW {contract.conId}"
+    return list(contracts)
+
+  mock_ib.qualifyContractsAsync.side_effect = qualify
+  combo = Contract(secType="BAG", symbol="SPX", comboLegs=[
+    ComboLeg(conId=con_id, ratio=1, action="BUY") for con_id in (1, 2, 3, 4)
+  ])
+
+  first = await trading_client._serialize_contract(combo)
+  second = await trading_client._serialize_contract(combo)
+
+  assert first == second
+  assert [leg["symbol"] for leg in first["legs"]] == ["SPXW1", "SPXW2", "SPXW3", "SPXW4"]
+  mock_ib.qualifyContractsAsync.assert_called_once()